@@ -1,16 +1,18 @@
 from lux.game import Game
 from lux.game_map import Position
-import lux.game_objects as go
 import sys
 # print("SOME RANDOM NUMBER:", random.random(), file=sys.stderr)
-from lux.constants import ValidActions, log, print, StrategyTypes, LogicGlobals, ALL_DIRECTIONS, ResourceTypes, STRATEGY_HYPERPARAMETERS, GAME_CONSTANTS
+from lux.constants import ValidActions, log, print, StrategyTypes, LogicGlobals, ALL_DIRECTIONS, ResourceTypes, STRATEGY_HYPERPARAMETERS, GAME_CONSTANTS, DETERMINISTIC
 from lux.strategies import starter_strategy, time_based_strategy, research_based_strategy, set_unit_task, set_unit_strategy
-from lux.strategy_utils import resolve_unit_movement, switch_builds_if_needed, select_movement_direction_for_unit
+from lux.strategy_utils import resolve_unit_movement, switch_builds_if_needed, select_movement_direction_for_unit, plan_unit_movement
+from lux.cooperative import CooperativePlanner
+from lux.budget import TurnBudget
+from lux.instrumentation import INSTRUMENTATION
+from lux.context import GameContext
 from collections import deque, Counter, UserDict
 from itertools import chain
-from lux.annotate import add_annotations
+from lux.annotate import add_annotations, annotations_requested
 from random import seed
-import getpass
 import math
 
 seed(69420)
@@ -54,10 +56,6 @@ def update_logic_globals(player):
         # if cluster.type == Constants.RESOURCE_TYPES.WOOD and cluster.n_defended == 0:
         #     LogicGlobals.clusters_to_colonize.add(cluster)
 
-    units_lost = set(go.UNIT_CACHE) - player.unit_ids
-    for id_ in units_lost:
-        go.UNIT_CACHE.pop(id_)
-
     for k, v in LogicGlobals.CLUSTER_ID_TO_BUILDERS.items():
         LogicGlobals.CLUSTER_ID_TO_BUILDERS[k] = LogicGlobals.CLUSTER_ID_TO_BUILDERS.get(k, set()) & player.unit_ids
 
@@ -126,11 +124,12 @@ def gather_turn_information(player, opponent):
     LogicGlobals.max_resource_cluster_amount = max(
         [1] + [c.total_amount for c in LogicGlobals.clusters_to_colonize]
     )
-    for c in LogicGlobals.clusters_to_colonize:
-        c.calculate_score(player, opponent, scaling_factor=LogicGlobals.max_resource_cluster_amount)
+    LogicGlobals.game_state.map.score_clusters(
+        LogicGlobals.clusters_to_colonize, player, opponent, scaling_factor=LogicGlobals.max_resource_cluster_amount
+    )
 
     for city_id, city in LogicGlobals.player.cities.items():
-        log(f"Turn {LogicGlobals.game_state.turn} city {city_id} managers: {city.managers}")
+        log.debug("Turn %s city %s managers: %s", LogicGlobals.game_state.turn, city_id, city.managers)
 
     for __, city in player.cities.items():
         for tile in city.citytiles:
@@ -160,17 +159,21 @@ def gather_turn_information(player, opponent):
 
 def unit_actions(player, opponent):
     actions = []
-    blocked_positions, enemy_blocked_positions = gather_turn_information(player, opponent)
+    with INSTRUMENTATION.phase('gather_turn_information'):
+        blocked_positions, enemy_blocked_positions = gather_turn_information(player, opponent)
 
-    set_unit_strategy(player)
+    with INSTRUMENTATION.phase('set_unit_strategy'):
+        set_unit_strategy(player)
 
-    for unit in sorted(player.units, key=lambda u: (u.cargo.wood, u.id if getpass.getuser() == 'Paul' else 0))[::-1]:
+    for unit in sorted(player.units, key=lambda u: (u.cargo.wood, u.id if DETERMINISTIC else 0))[::-1]:
         if unit.current_task is None:
-            unit.get_task_from_strategy(player)
+            with INSTRUMENTATION.phase('get_task_from_strategy'):
+                unit.get_task_from_strategy(player)
             # unit.set_task_from_strategy(player)
             # set_unit_task(unit, player)
 
-    switch_builds_if_needed()
+    with INSTRUMENTATION.phase('switch_builds_if_needed'):
+        switch_builds_if_needed()
 
     # for unit in player.units:
     #     action, target = unit.propose_action(player, LogicGlobals.game_state)
@@ -180,12 +183,15 @@ def unit_actions(player, opponent):
 
     debug_info = []
     units_wanting_to_move = set()
+    plan_jointly = CooperativePlanner.is_enabled()
+    move_requests = []
     for unit in player.units:
-        action, target, *extra = unit.propose_action(
-            player, LogicGlobals.game_state
-        )
-        log(
-            f"Unit {unit.id} at {unit.pos} with cargo {unit.cargo} proposed action {action} with target {target}",
+        with INSTRUMENTATION.phase('propose_action'):
+            action, target, *extra = unit.propose_action(
+                player, LogicGlobals.game_state
+            )
+        log.debug(
+            "Unit %s at %s with cargo %s proposed action %s with target %s", unit.id, unit.pos, unit.cargo, action, target
         )
         if action is None:
             continue
@@ -203,14 +209,25 @@ def unit_actions(player, opponent):
         elif action == ValidActions.PILLAGE:
             actions.append(unit.pillage(logs=debug_info))
         elif action == ValidActions.MOVE:
-            select_movement_direction_for_unit(
-                unit, target, blocked_positions,
-                enemy_blocked_positions,
+            if plan_jointly:
+                move_requests.append((unit, target))
+                continue
+            with INSTRUMENTATION.phase('select_movement_direction'):
+                select_movement_direction_for_unit(
+                    unit, target, blocked_positions,
+                    enemy_blocked_positions,
+                    register=units_wanting_to_move
+                )
+    if move_requests:
+        with INSTRUMENTATION.phase('plan_unit_movement'):
+            plan_unit_movement(
+                move_requests, blocked_positions, enemy_blocked_positions,
                 register=units_wanting_to_move
             )
-    actions, debug_info = resolve_unit_movement(
-        player, units_wanting_to_move, blocked_positions, actions, debug_info
-    )
+    with INSTRUMENTATION.phase('resolve_unit_movement'):
+        actions, debug_info = resolve_unit_movement(
+            player, units_wanting_to_move, blocked_positions, actions, debug_info
+        )
     return actions, debug_info
 
 
@@ -252,6 +269,10 @@ def city_actions(actions):
 
 
 def agent(observation, configuration, include_debug_for_vis=True):
+    INSTRUMENTATION.begin_turn()
+    if observation["step"] == 0 or LogicGlobals.turn_budget is None:
+        LogicGlobals.turn_budget = TurnBudget.from_hyperparameters()
+    LogicGlobals.turn_budget.start_turn(observation, configuration)
 
     ### Do not edit ###
     if observation["step"] == 0:
@@ -261,20 +282,52 @@ def agent(observation, configuration, include_debug_for_vis=True):
         LogicGlobals.player.current_strategy = StrategyTypes.STARTER
     else:
         LogicGlobals.game_state.update(observation["updates"], observation.player)
+    INSTRUMENTATION.record_since_turn_start('game_update')
 
     ### AI Code goes down here! ###
-    update_logic_globals(LogicGlobals.player)
+    with INSTRUMENTATION.phase('update_logic_globals'):
+        update_logic_globals(LogicGlobals.player)
 
     # actions, debug_info = old_unit_action_resolution(player, opponent)
     actions, debug_info = unit_actions(LogicGlobals.player, LogicGlobals.opponent)
-    actions = city_actions(actions)
-    actions = add_annotations(
-        actions, LogicGlobals.player, LogicGlobals.game_state.map,
-        debug_info, include_debug_for_vis
+    with INSTRUMENTATION.phase('city_actions'):
+        actions = city_actions(actions)
+    with INSTRUMENTATION.phase('add_annotations'):
+        actions = add_annotations(
+            actions, LogicGlobals.player, LogicGlobals.game_state.map,
+            debug_info, annotations_requested(configuration, include_debug_for_vis)
+        )
+
+    if LogicGlobals.turn_budget.fallbacks:
+        log.warning(
+            "Turn %s: ran short on time, fell back on %s", LogicGlobals.game_state.turn, dict(LogicGlobals.turn_budget.fallbacks)
+        )
+
+    INSTRUMENTATION.end_turn(
+        LogicGlobals.game_state.turn, LogicGlobals.game_state.id,
+        pathfinder=LogicGlobals.game_state.map.pathfinder.stats,
+        nearest_features=LogicGlobals.game_state.map.nearest_features.stats,
+        fallbacks=LogicGlobals.turn_budget.fallbacks,
     )
 
     return actions
 
 
+def make_agent(context=None):
+    """ An `agent` with its own :GameContext:, so that several agents can play in one process.
+
+    For example, self-play within a single `kaggle_environments` run:
+        env.run([make_agent(), make_agent()])
+
+    Pass a `context` to continue from it, e.g. to resume a game from a
+    snapshot: make_agent(GameContext.from_snapshot(data)).
+    """
+    if context is None:
+        context = GameContext()
 
+    def bound_agent(observation, configuration, include_debug_for_vis=True):
+        with context.bound():
+            return agent(observation, configuration, include_debug_for_vis)
 
+    bound_agent.context = context
+    return bound_agent
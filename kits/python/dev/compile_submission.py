@@ -1,9 +1,11 @@
 import subprocess
 import time
 import sys
+from freeze_constants import write_frozen_constants
 
 if __name__ == '__main__':
     timestr = time.strftime("%m_%d_%Y-%H-%M-%S")
+    write_frozen_constants()
 
     try:
         subprocess.run(
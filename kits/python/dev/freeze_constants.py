@@ -0,0 +1,46 @@
+""" Freeze the JSON constants into `lux/frozen_constants.py`.
+
+The agent then imports the constants as Python literals instead of
+parsing the JSON files and deriving the per-map-size keys at startup.
+The generated module records a checksum of the JSON files; when they no
+longer match, `lux.constants` ignores it and parses the JSON again, so
+a stale freeze only costs startup time. Run this after editing
+`strategy_hyperparameters.json` or `game_constants.json`;
+`compile_submission.py` runs it before packaging.
+
+Usage:
+    python freeze_constants.py
+"""
+import textwrap
+from os import path
+from pprint import pformat
+from lux.constants import CONSTANTS_SOURCES, constants_source_digest, load_constants_from_json
+
+
+FROZEN_CONSTANTS_PATH = path.join(path.dirname(path.abspath(__file__)), "lux", "frozen_constants.py")
+
+
+def _literal_assignment(name, value):
+    prefix = f"{name} = "
+    literal = pformat(value, sort_dicts=False, width=100 - len(prefix))
+    return prefix + textwrap.indent(literal, " " * len(prefix)).lstrip() + "\n"
+
+
+def render_frozen_constants():
+    strategy_hyperparameters, game_constants = load_constants_from_json()
+    return "\n\n".join([
+        f'""" Generated by freeze_constants.py from {" and ".join(CONSTANTS_SOURCES)}; do not edit. """\n',
+        f"SOURCE_DIGEST = {constants_source_digest()!r}\n",
+        _literal_assignment("STRATEGY_HYPERPARAMETERS", strategy_hyperparameters),
+        _literal_assignment("GAME_CONSTANTS", game_constants),
+    ])
+
+
+def write_frozen_constants(destination=FROZEN_CONSTANTS_PATH):
+    with open(destination, "w") as f:
+        f.write(render_frozen_constants())
+
+
+if __name__ == '__main__':
+    write_frozen_constants()
+    print(f"Wrote {FROZEN_CONSTANTS_PATH}")
@@ -1,3 +1,8 @@
+from itertools import islice
+
+from .constants import STRATEGY_HYPERPARAMETERS
+
+
 def circle(x: int, y: int) -> str:
     return f"dc {x} {y}"
 
@@ -24,115 +29,109 @@ def format_message(message):
     return message.replace(',', ';').replace('(', '[').replace(')', ']')
 
 
-def add_annotations(actions, player, game_map, debug_info, include_debug_for_vis):
-    if include_debug_for_vis:
-        actions.append(
-            sidetext(
-                f"Current Strategy: {player.current_strategy}",
-            )
-        )
-        actions.append(
-            sidetext(
-                f"Found {len(game_map.resource_clusters)} clusters",
-            )
-        )
-        actions.append(
-            sidetext(
-                "Cluster - N_resource - N_defend - Score",
-            )
+class AnnotationBuilder:
+    """ Debug annotations for the replay viewer, built one section at a time.
+
+    Sections are generators, so nothing past the `max_annotations` cap
+    (or in a disabled section) is ever formatted. Sections, in order:
+        - SUMMARY: current strategy and number of clusters
+        - CLUSTERS: amount, positions to defend and score of each cluster
+        - GOAL_TASKS: last task in the queue of each unit
+        - CURRENT_TASKS: current task of each unit
+        - TASK_QUEUE: full task queue of each unit
+        - ACTIONS: actions logged this turn (`debug_info`)
+        - MARKER: a text marker on the map
+    """
+
+    SECTIONS = ('SUMMARY', 'CLUSTERS', 'GOAL_TASKS', 'CURRENT_TASKS', 'TASK_QUEUE', 'ACTIONS', 'MARKER')
+
+    def __init__(self, player, game_map, debug_info, sections=None, max_annotations=None):
+        self.player = player
+        self.game_map = game_map
+        self.debug_info = debug_info
+        self.sections = self.SECTIONS if sections is None else tuple(s for s in self.SECTIONS if s in sections)
+        self.max_annotations = max_annotations
+
+    @classmethod
+    def from_hyperparameters(cls, player, game_map, debug_info):
+        params = STRATEGY_HYPERPARAMETERS["ANNOTATIONS"]
+        return cls(
+            player, game_map, debug_info,
+            sections={name for name, enabled in params["SECTIONS"].items() if enabled},
+            max_annotations=params["MAX_ANNOTATIONS"]
         )
-        for cluster in sorted(game_map.resource_clusters,
-                              key=lambda c: (c.center_pos.x, c.center_pos.y)):
-            actions.append(
-                sidetext(
-                    format_message(
-                        f"{cluster.center_pos} - {cluster.total_amount:4d} - {cluster.n_to_block:1d} - {cluster.current_score:0.5f}"),
+
+    def annotations(self):
+        """ All annotations of the enabled sections, lazily. """
+        for section in self.sections:
+            yield from getattr(self, f"_{section.lower()}")()
+
+    def add_to(self, actions):
+        actions.extend(islice(self.annotations(), self.max_annotations))
+        return actions
+
+    def _summary(self):
+        yield sidetext(f"Current Strategy: {self.player.current_strategy}")
+        yield sidetext(f"Found {len(self.game_map.resource_clusters)} clusters")
+
+    def _clusters(self):
+        yield sidetext("Cluster - N_resource - N_defend - Score")
+        for cluster in sorted(self.game_map.resource_clusters, key=lambda c: (c.center_pos.x, c.center_pos.y)):
+            yield sidetext(
+                format_message(
+                    f"{cluster.center_pos} - {cluster.total_amount:4d} - {cluster.n_to_block:1d} - {cluster.current_score:0.5f}"
                 )
             )
-            # for pos in cluster.resource_positions:
-            #     actions.append(annotate.circle(pos.x, pos.y))
-            # for pos in cluster.pos_to_defend:
-            #     actions.append(annotate.x(pos.x, pos.y))
-
-        # actions.append(annotate.sidetext("STRATEGIES"))
-        # for unit in LogicGlobals.player.units:
-        #     actions.append(
-        #         annotate.sidetext(
-        #             f"{unit.id}: {unit.current_strategy}"
-        #         )
-        #     )
-
-        actions.append(sidetext("GOAL TASKS"))
-
-        for unit in player.units:
-            # if unit.current_task is not None:
-            #     __, target = unit.current_task
-            #     if type(target) is Position:
-            #         actions.append(
-            #             annotate.line(unit.pos.x, unit.pos.y, target.x, target.y)
-            #         )
+
+    def _goal_tasks(self):
+        yield sidetext("GOAL TASKS")
+        for unit in self.player.units:
             if unit.task_q:
-                actions.append(
-                    sidetext(
-                        format_message(f"{unit.id}: {unit.task_q[-1][0]} at {unit.task_q[-1][1]} ")
-                    )
-                )
+                yield sidetext(format_message(f"{unit.id}: {unit.task_q[-1][0]} at {unit.task_q[-1][1]} "))
             else:
-                actions.append(
-                    sidetext(
-                        f"{unit.id}: None"
-                    )
-                )
-
-        actions.append(sidetext("CURRENT TASK"))
+                yield sidetext(f"{unit.id}: None")
 
-        for unit in player.units:
+    def _current_tasks(self):
+        yield sidetext("CURRENT TASK")
+        for unit in self.player.units:
             if unit.current_task is None:
-                actions.append(
-                    sidetext(
-                        f"{unit.id}: None"
-                    )
-                )
+                yield sidetext(f"{unit.id}: None")
             else:
-                actions.append(
-                    sidetext(
-                        format_message(f"{unit.id}: {unit.current_task[0]} at {unit.current_task[1]} ")
-                    )
-                )
-
-        actions.append(sidetext("TASK QUEUE"))
+                yield sidetext(format_message(f"{unit.id}: {unit.current_task[0]} at {unit.current_task[1]} "))
 
-        for unit in player.units:
+    def _task_queue(self):
+        yield sidetext("TASK QUEUE")
+        for unit in self.player.units:
             if unit.task_q:
-                actions.append(
-                    sidetext(
-                        # annotate.format_message(f"{unit.id}: {unit.task_q[-1][0]} at {unit.task_q[-1][1]} ")
-                        format_message(
-                            f"{unit.id}: " +
-                            " - ".join(
-                                [f"{t[0]} to {t[1]}"
-                                 if t[0] == 'move' else f"{t[0]} at {t[1]}"
-                                 for t in unit.task_q
-                                 ]
-                            )
+                yield sidetext(
+                    format_message(
+                        f"{unit.id}: " + " - ".join(
+                            f"{t[0]} to {t[1]}" if t[0] == 'move' else f"{t[0]} at {t[1]}" for t in unit.task_q
                         )
                     )
                 )
             else:
-                actions.append(
-                    sidetext(
-                        f"{unit.id}: None"
-                    )
-                )
+                yield sidetext(f"{unit.id}: None")
 
-        actions.append(sidetext("ACTIONS"))
+    def _actions(self):
+        yield sidetext("ACTIONS")
+        for uid, action, target in self.debug_info:
+            yield sidetext(format_message(f"{uid}: {action} with target {target}"))
 
-        for uid, action, target in debug_info:
-            actions.append(
-                sidetext(
-                    format_message(f"{uid}: {action} with target {target}")
-                )
-            )
+    def _marker(self):
+        yield text(15, 15, "A")
 
-        actions.append(text(15, 15, "A"))
-        return actions
+
+def annotations_requested(configuration, include_debug_for_vis=True):
+    """ Whether to annotate this match: only if asked to, and if the environment shows annotations at all. """
+    if not include_debug_for_vis:
+        return False
+    if configuration is None or configuration.get("annotations") is None:
+        return True
+    return bool(configuration.get("annotations"))
+
+
+def add_annotations(actions, player, game_map, debug_info, include_debug_for_vis):
+    if include_debug_for_vis:
+        AnnotationBuilder.from_hyperparameters(player, game_map, debug_info).add_to(actions)
+    return actions
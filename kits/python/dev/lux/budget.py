@@ -0,0 +1,75 @@
+from collections import Counter
+from time import perf_counter
+
+from .constants import LogicGlobals, STRATEGY_HYPERPARAMETERS
+
+
+class BudgetSteps:
+    """ Expensive steps of a turn that can be skipped or approximated when time runs short. """
+    TURN_DISTANCE_MOVEMENT = "TURN_DISTANCE_MOVEMENT"
+    SWITCH_BUILDS = "SWITCH_BUILDS"
+    COOPERATIVE_PLANNER = "COOPERATIVE_PLANNER"
+    MOVEMENT_ROUNDS = "MOVEMENT_ROUNDS"
+
+
+class TurnBudget:
+    """ Time left to act in the current turn.
+
+    The budget of a turn is the `act_timeout` of the episode minus a
+    `safety_margin`, plus an `overage_share` of the overage time bank
+    that is left. Every expensive step asks `allows` whether there is
+    still at least its `min_remaining` seconds left; steps that are
+    refused fall back to something cheaper, and are counted in
+    `fallbacks` (this turn) and `total_fallbacks` (this game).
+    """
+
+    def __init__(self, act_timeout=3, safety_margin=0.25, overage_share=0.0, min_remaining=None, clock=perf_counter):
+        self.act_timeout = act_timeout
+        self.safety_margin = safety_margin
+        self.overage_share = overage_share
+        self.min_remaining = min_remaining or {}
+        self.clock = clock
+        self.overage = 0
+        self.fallbacks = Counter()
+        self.total_fallbacks = Counter()
+        self._start = clock()
+
+    @classmethod
+    def from_hyperparameters(cls):
+        params = STRATEGY_HYPERPARAMETERS["TURN_BUDGET"]
+        return cls(
+            act_timeout=params["ACT_TIMEOUT"],
+            safety_margin=params["SAFETY_MARGIN"],
+            overage_share=params["OVERAGE_SHARE"],
+            min_remaining=params["MIN_REMAINING"]
+        )
+
+    def start_turn(self, observation=None, configuration=None):
+        """ Restart the clock. Reads `actTimeout` and `remainingOverageTime` when the environment provides them. """
+        self._start = self.clock()
+        if configuration is not None and configuration.get("actTimeout") is not None:
+            self.act_timeout = configuration["actTimeout"]
+        if observation is not None and observation.get("remainingOverageTime") is not None:
+            self.overage = observation["remainingOverageTime"]
+        self.fallbacks = Counter()
+
+    def elapsed(self):
+        return self.clock() - self._start
+
+    def remaining(self):
+        """ Seconds left in this turn's budget. """
+        return self.act_timeout - self.safety_margin + self.overage_share * self.overage - self.elapsed()
+
+    def allows(self, step):
+        """ Whether there is enough time left for `step`. Refusals are recorded as fallbacks. """
+        if self.remaining() >= self.min_remaining.get(step, 0):
+            return True
+        self.fallbacks[step] += 1
+        self.total_fallbacks[step] += 1
+        return False
+
+
+def time_allows(step):
+    """ Whether the budget of the current turn allows `step`. Always True outside of `agent` (e.g. in tests). """
+    budget = LogicGlobals.turn_budget
+    return budget is None or budget.allows(step)
@@ -1,41 +1,77 @@
 import io
+import os
 import sys
 import getpass
-import json
+import zlib
 from os import path
-from functools import partial
 from collections import deque
+from .logger import Logger, level_from_environment
 dir_path = path.dirname(__file__)
 
 
-constants_path = path.abspath(
-    path.join(dir_path, "strategy_hyperparameters.json")
-)
+CONSTANTS_SOURCES = ("strategy_hyperparameters.json", "game_constants.json")
+DETERMINISTIC_ENV_VAR = "LUX_DETERMINISTIC"
 
-with open(constants_path) as f:
-    STRATEGY_HYPERPARAMETERS = json.load(f)
 
-STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_RATIO_12X12"] = STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_STARTER_RATIO_12X12"]
-STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_RATIO_16X16"] = STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_STARTER_RATIO_16X16"]
-STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_RATIO_24X24"] = STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_STARTER_RATIO_24X24"]
-STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_RATIO_32X32"] = STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_STARTER_RATIO_32X32"]
+def constants_source_digest():
+    """ Checksum of the JSON files the constants are built from. """
+    checksum = 0
+    for name in CONSTANTS_SOURCES:
+        with open(path.join(dir_path, name), "rb") as f:
+            checksum = zlib.crc32(f.read(), checksum)
+    return f"{checksum:08x}"
 
-STRATEGY_HYPERPARAMETERS["STARTER"]["BUILDER_TO_MANAGER_RATIO_12X12"] = STRATEGY_HYPERPARAMETERS["STARTER"]["BUILDER_TO_MANAGER_STARTER_RATIO_12X12"]
-STRATEGY_HYPERPARAMETERS["STARTER"]["BUILDER_TO_MANAGER_RATIO_16X16"] = STRATEGY_HYPERPARAMETERS["STARTER"]["BUILDER_TO_MANAGER_STARTER_RATIO_16X16"]
-STRATEGY_HYPERPARAMETERS["STARTER"]["BUILDER_TO_MANAGER_RATIO_24X24"] = STRATEGY_HYPERPARAMETERS["STARTER"]["BUILDER_TO_MANAGER_STARTER_RATIO_24X24"]
-STRATEGY_HYPERPARAMETERS["STARTER"]["BUILDER_TO_MANAGER_RATIO_32X32"] = STRATEGY_HYPERPARAMETERS["STARTER"]["BUILDER_TO_MANAGER_STARTER_RATIO_32X32"]
 
-STRATEGY_HYPERPARAMETERS["STARTER"]["N_UNITS_SPAWN_BEFORE_COLONIZE_12X12"] = STRATEGY_HYPERPARAMETERS["STARTER"]["N_UNITS_SPAWN_BEFORE_COLONIZE_STARTER_12X12"]
-STRATEGY_HYPERPARAMETERS["STARTER"]["N_UNITS_SPAWN_BEFORE_COLONIZE_16X16"] = STRATEGY_HYPERPARAMETERS["STARTER"]["N_UNITS_SPAWN_BEFORE_COLONIZE_STARTER_16X16"]
-STRATEGY_HYPERPARAMETERS["STARTER"]["N_UNITS_SPAWN_BEFORE_COLONIZE_24X24"] = STRATEGY_HYPERPARAMETERS["STARTER"]["N_UNITS_SPAWN_BEFORE_COLONIZE_STARTER_24X24"]
-STRATEGY_HYPERPARAMETERS["STARTER"]["N_UNITS_SPAWN_BEFORE_COLONIZE_32X32"] = STRATEGY_HYPERPARAMETERS["STARTER"]["N_UNITS_SPAWN_BEFORE_COLONIZE_STARTER_32X32"]
+def load_constants_from_json():
+    """ Parse the JSON constants and add the keys derived from them.
 
+    Returns
+    -------
+    tuple of dict
+        The strategy hyperparameters and the game constants.
+    """
+    import json  # Not needed at all when the frozen constants are current
 
-constants_path = path.abspath(path.join(dir_path, "game_constants.json"))
-with open(constants_path) as f:
-    GAME_CONSTANTS = json.load(f)
+    with open(path.join(dir_path, "strategy_hyperparameters.json")) as f:
+        strategy_hyperparameters = json.load(f)
 
-GAME_CONSTANTS["PARAMETERS"]["CYCLE_LENGTH"] = GAME_CONSTANTS["PARAMETERS"]["DAY_LENGTH"] + GAME_CONSTANTS["PARAMETERS"]["NIGHT_LENGTH"]
+    starter = strategy_hyperparameters["STARTER"]
+    for size in (12, 16, 24, 32):
+        starter[f"SPAWN_TO_RESEARCH_RATIO_{size}X{size}"] = starter[f"SPAWN_TO_RESEARCH_STARTER_RATIO_{size}X{size}"]
+        starter[f"BUILDER_TO_MANAGER_RATIO_{size}X{size}"] = starter[f"BUILDER_TO_MANAGER_STARTER_RATIO_{size}X{size}"]
+        starter[f"N_UNITS_SPAWN_BEFORE_COLONIZE_{size}X{size}"] = starter[f"N_UNITS_SPAWN_BEFORE_COLONIZE_STARTER_{size}X{size}"]
+
+    with open(path.join(dir_path, "game_constants.json")) as f:
+        game_constants = json.load(f)
+
+    game_constants["PARAMETERS"]["CYCLE_LENGTH"] = game_constants["PARAMETERS"]["DAY_LENGTH"] + game_constants["PARAMETERS"]["NIGHT_LENGTH"]
+    return strategy_hyperparameters, game_constants
+
+
+def _load_constants():
+    """ Use the constants frozen by `freeze_constants.py` unless the JSON files changed since. """
+    try:
+        from . import frozen_constants
+    except ImportError:
+        return load_constants_from_json()
+    if frozen_constants.SOURCE_DIGEST != constants_source_digest():
+        return load_constants_from_json()
+    return frozen_constants.STRATEGY_HYPERPARAMETERS, frozen_constants.GAME_CONSTANTS
+
+
+STRATEGY_HYPERPARAMETERS, GAME_CONSTANTS = _load_constants()
+
+
+def determinism_from_environment(default):
+    """ Whether ties are broken by id instead of randomly; LUX_DETERMINISTIC=0/1 overrides `default`. """
+    value = os.environ.get(DETERMINISTIC_ENV_VAR)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("", "0", "false", "no")
+
+
+ON_DEVELOPER_MACHINE = getpass.getuser() == 'Paul'
+DETERMINISTIC = determinism_from_environment(ON_DEVELOPER_MACHINE)
 
 
 class StrategyTypes:
@@ -122,34 +158,47 @@ class LogicGlobals:
     RP_AT_LAST_ADJUSTMENT = 0
     x_mult = 1
     y_mult = 1
+    unit_task_version = 0
+    turn_budget = None
+
+    @staticmethod
+    def initial_state():
+        """ Values of all per-game attributes at the start of a game. """
+        return {
+            'game_state': None,
+            'player': None,
+            'opponent': None,
+            'unlocked_coal': False,
+            'unlocked_uranium': False,
+            'unlock_coal_memory': deque(maxlen=2),
+            'unlock_uranium_memory': deque(maxlen=2),
+            'cities': None,
+            'pos_being_built': set(),
+            'clusters_to_colonize': set(),
+            'max_resource_cluster_amount': 0,
+            'TBS_COM': None,
+            'TBS_citytiles': set(),
+            'RBS_rtype': None,
+            'clusters_to_colonize_rbs': {},
+            'RBS_citytiles': set(),
+            'RBS_cluster_carts': {},
+            'radius_for_clusters': 0,
+            'main_city_close_to_coal': None,
+            'CLUSTER_ID_TO_BUILDERS': {},
+            'CLUSTER_ID_TO_MANAGERS': {},
+            'CLUSTER_ID_TO_CARTS': {},
+            'RESOURCES_BEING_COLLECTED': {},
+            'RP_AT_LAST_ADJUSTMENT': 0,
+            'x_mult': 1,
+            'y_mult': 1,
+            'unit_task_version': 0,
+            'turn_budget': None,
+        }
 
     @classmethod
     def reset(cls):
-        cls.game_state = None
-        cls.player = None
-        cls.opponent = None
-        cls.unlocked_coal = False
-        cls.unlocked_uranium = False
-        cls.unlock_coal_memory = deque(maxlen=2)
-        cls.unlock_uranium_memory = deque(maxlen=2)
-        cls.cities = None
-        cls.pos_being_built = set()
-        cls.clusters_to_colonize = set()
-        cls.max_resource_cluster_amount = 0
-        cls.TBS_COM = None
-        cls.TBS_citytiles = set()
-        cls.RBS_rtype = None
-        cls.clusters_to_colonize_rbs = {}
-        cls.RBS_citytiles = set()
-        cls.RBS_cluster_carts = {}
-        cls.radius_for_clusters = 0
-        cls.main_city_close_to_coal = None
-        cls.CLUSTER_ID_TO_BUILDERS = {}
-        cls.CLUSTER_ID_TO_MANAGERS = {}
-        cls.RESOURCES_BEING_COLLECTED = {}
-        cls.RP_AT_LAST_ADJUSTMENT = 0
-        cls.x_mult = 1
-        cls.y_mult = 1
+        for name, value in cls.initial_state().items():
+            setattr(cls, name, value)
 
     @classmethod
     def just_unlocked_new_resource(cls):
@@ -205,12 +254,12 @@ def is_turn_during_night(turn):
     return GAME_CONSTANTS["PARAMETERS"]["DAY_LENGTH"] - turn % GAME_CONSTANTS["PARAMETERS"]["CYCLE_LENGTH"] <= 0
 
 
-if getpass.getuser() == 'Paul':
+if ON_DEVELOPER_MACHINE:
     print_out = io.StringIO()
     old_print = print
-    log = partial(print, file=print_out)
+    log = Logger(print_out, level=level_from_environment("DEBUG"))
     # print = partial(print, f"Turn {LogicGlobals.game_state.turn}", file=sys.stderr)
     print = lambda *args: old_print(f"Turn {LogicGlobals.game_state.turn}:", *args, file=sys.stderr)
 else:
-    log = partial(print, file=sys.__stderr__)
+    log = Logger(sys.__stderr__, level=level_from_environment("WARNING"))
     print = print
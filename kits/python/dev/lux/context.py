@@ -0,0 +1,95 @@
+import pickle
+import random
+from contextlib import contextmanager
+from copy import deepcopy
+
+from . import game_map
+from .constants import LogicGlobals, STRATEGY_HYPERPARAMETERS
+
+
+AGENT_RANDOM_SEED = 69420
+_INITIAL_STARTER_HYPERPARAMETERS = deepcopy(STRATEGY_HYPERPARAMETERS["STARTER"])
+
+
+class GameContext:
+    """ All the per-game state of one agent, so that several games can share a process.
+
+    The agent code reads its state from process-wide places: the class
+    attributes of `LogicGlobals` (which include the game state and its
+    units), the `MAP_CACHE` module dict, the "STARTER" hyperparameters
+    (which strategies adjust as the game goes) and the `random` module.
+    A GameContext owns its own copy of each of these; `bound` swaps
+    them in for the duration of a `with` block and saves them back
+    afterwards.
+
+    Binding only swaps references, so it is cheap enough to do on
+    every call of `agent` (see `agent.make_agent`). Contexts are not
+    thread safe; bind one at a time.
+
+    `snapshot` serializes the whole state, so that a game can be resumed
+    from any turn (`from_snapshot`) or branched off for a lookahead
+    search (`fork`). Per-turn caches are left out of snapshots.
+    """
+
+    def __init__(self, random_seed=AGENT_RANDOM_SEED):
+        self.logic_globals = LogicGlobals.initial_state()
+        self.map_cache = {}
+        self.starter_hyperparameters = deepcopy(_INITIAL_STARTER_HYPERPARAMETERS)
+        self.random_state = random.Random(random_seed).getstate()
+        self._is_bound = False
+
+    @staticmethod
+    def _capture():
+        return (
+            {name: getattr(LogicGlobals, name) for name in LogicGlobals.initial_state()},
+            game_map.MAP_CACHE,
+            STRATEGY_HYPERPARAMETERS["STARTER"],
+            random.getstate(),
+        )
+
+    @staticmethod
+    def _restore(state):
+        logic_globals, map_cache, starter_hyperparameters, random_state = state
+        for name, value in logic_globals.items():
+            setattr(LogicGlobals, name, value)
+        game_map.MAP_CACHE = map_cache
+        STRATEGY_HYPERPARAMETERS["STARTER"] = starter_hyperparameters
+        random.setstate(random_state)
+
+    @contextmanager
+    def bound(self):
+        """ Make this context the process-wide game state inside the `with` block. """
+        previous = self._capture()
+        self._restore(self._state())
+        self._is_bound = True
+        try:
+            yield self
+        finally:
+            self._is_bound = False
+            (
+                self.logic_globals, self.map_cache, self.starter_hyperparameters, self.random_state
+            ) = self._capture()
+            self._restore(previous)
+
+    def _state(self):
+        if self._is_bound:
+            return self._capture()
+        return self.logic_globals, self.map_cache, self.starter_hyperparameters, self.random_state
+
+    def snapshot(self):
+        """ The state of this context as bytes; may also be taken while it is bound. """
+        return pickle.dumps(self._state(), protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_snapshot(cls, data):
+        """ A new, unbound context holding the state of `snapshot` bytes `data`. """
+        context = cls.__new__(cls)
+        (
+            context.logic_globals, context.map_cache, context.starter_hyperparameters, context.random_state
+        ) = pickle.loads(data)
+        context._is_bound = False
+        return context
+
+    def fork(self):
+        """ An independent copy of this context. """
+        return self.from_snapshot(self.snapshot())
@@ -0,0 +1,213 @@
+from heapq import heappush, heappop
+from math import ceil
+from time import perf_counter
+
+from .constants import LogicGlobals, ALL_DIRECTIONS, STRATEGY_HYPERPARAMETERS, GAME_CONSTANTS
+
+
+class ReservationTable:
+    """ Space-time reservations of the tiles of a map, over a window of turns.
+
+    Tiles are position indices (see `GameMap.index_of`) and turns are
+    counted from the current turn (0). A tile can be reserved by one
+    unit per turn, except for the `stackable` tiles (own city tiles),
+    which any number of units may share. Moves are reserved as well,
+    so that two units never swap tiles.
+    """
+
+    def __init__(self, stackable):
+        self.stackable = stackable
+        self._cells = {}
+        self._moves = set()
+
+    def is_free(self, index, turn, unit_id=None):
+        if self.stackable[index]:
+            return True
+        owner = self._cells.get((index, turn))
+        return owner is None or owner == unit_id
+
+    def is_span_free(self, index, first_turn, last_turn, unit_id=None):
+        """ Whether `index` is free on every turn from `first_turn` to `last_turn` (inclusive). """
+        return all(self.is_free(index, turn, unit_id) for turn in range(first_turn, last_turn + 1))
+
+    def is_swap(self, from_index, to_index, turn):
+        """ Whether moving `from_index` -> `to_index` on `turn` crosses a reserved move the other way. """
+        return (to_index, from_index, turn) in self._moves
+
+    def reserve(self, unit_id, index, first_turn, last_turn):
+        if self.stackable[index]:
+            return
+        for turn in range(first_turn, last_turn + 1):
+            self._cells[(index, turn)] = unit_id
+
+    def reserve_path(self, unit_id, path, window):
+        """ Reserve the tiles of `path` (one tile per turn, from turn 0), then its last tile until `window`. """
+        for turn, index in enumerate(path):
+            self.reserve(unit_id, index, turn, turn)
+            if turn and path[turn - 1] != index:
+                self._moves.add((path[turn - 1], index, turn - 1))
+        self.reserve(unit_id, path[-1], len(path), window)
+
+
+class CooperativePlanner:
+    """ Joint movement planner for the units moving this turn (windowed hierarchical cooperative A*).
+
+    Units are planned one at a time, in priority order. Each unit runs
+    a space-time A* over the next `window` turns that avoids the tiles
+    and moves reserved by the units planned before it, then reserves
+    its own path. Moving onto a tile costs the same number of turns as
+    in `PathFinder.step_costs`, rounded up; the unit is stuck on the
+    tile for that long. Past the window, the remaining cost is read
+    from the cached `PathFinder.distance_field` of the target.
+
+    Planning stops once `time_cap` seconds have been spent; units that
+    were not planned by then are left to the greedy movement selection.
+    """
+
+    def __init__(self, game_map, blocked_positions, window=8, time_cap=0.1, max_expansions=2000):
+        self.game_map = game_map
+        self.pathfinder = game_map.pathfinder
+        self.occupancy = game_map.occupancy
+        self.window = window
+        self.time_cap = time_cap
+        self.max_expansions = max_expansions
+        self.reservations = ReservationTable(self.occupancy.own_cities.ravel().tolist())
+        self.blocked_indices = frozenset(
+            game_map.index_of(pos) for pos in blocked_positions if game_map.is_within_bounds(pos)
+        )
+
+    @classmethod
+    def from_hyperparameters(cls, game_map, blocked_positions):
+        params = STRATEGY_HYPERPARAMETERS["COOPERATIVE_PLANNER"]
+        return cls(
+            game_map, blocked_positions,
+            window=params["WINDOW"],
+            time_cap=params["TIME_CAP_MS"] / 1000,
+            max_expansions=params["MAX_EXPANSIONS_PER_UNIT"]
+        )
+
+    @staticmethod
+    def is_enabled():
+        return bool(STRATEGY_HYPERPARAMETERS["COOPERATIVE_PLANNER"]["ENABLED"])
+
+    def plan(self, move_requests):
+        """ Plan the moves of several units.
+
+        Parameters
+        ----------
+        move_requests : list
+            (unit, target position) pairs, for units that can act this turn.
+
+        Returns
+        -------
+        plans : dict
+            Unit id -> (direction, new position) of the first move of
+            the unit, or None if the unit should wait this turn.
+        unplanned : list
+            The requests that did not fit in the time cap.
+        """
+        start_time = perf_counter()
+        plans = {}
+        requests = sorted(
+            move_requests,
+            key=lambda request: (-request[0].turns_spent_waiting_to_move, not request[0].is_building(), request[0].id)
+        )
+        for num_planned, (unit, target) in enumerate(requests):
+            if perf_counter() - start_time > self.time_cap:
+                return plans, requests[num_planned:]
+            path = self._search(unit, target)
+            if path is None:
+                path = [self.game_map.index_of(unit.pos)]
+            self.reservations.reserve_path(unit.id, path, self.window)
+            plans[unit.id] = self._first_move(unit, path)
+        return plans, []
+
+    def _first_move(self, unit, path):
+        if len(path) < 2 or path[1] == path[0]:
+            return None
+        new_pos = self.game_map.position_at(path[1])
+        for direction in ALL_DIRECTIONS:
+            if unit.pos.translate(direction, 1) == new_pos:
+                return direction, new_pos
+        return None
+
+    def _heuristic(self, origin, target, cooldown, avoid_own_cities):
+        """ Lower bound on the turns needed to get from each tile to `target`.
+
+        The field is blocked like the search from `origin` (the city of
+        `origin` stays open), so that the bound never overestimates.
+        """
+        pathfinder = self.pathfinder
+        costs = pathfinder.step_costs(cooldown)
+        field = pathfinder.distance_field(target, cooldown, avoid_own_cities=avoid_own_cities, origin=origin)
+        field_cap = pathfinder.distance_field_cap(cooldown)
+        target_index = self.game_map.index_of(target)
+        target_cost = costs[target_index]
+        xs, ys = pathfinder._xs, pathfinder._ys
+
+        def heuristic(index):
+            if index == target_index:
+                return 0
+            if field[index] is None:
+                return abs(xs[index] - target.x) + abs(ys[index] - target.y)
+            return min(field[index], field_cap) - costs[index] + target_cost
+
+        return heuristic
+
+    def _search(self, unit, target):
+        """ Space-time A* path of `unit` towards `target`: one tile index per turn, starting with the current one. """
+        game_map = self.game_map
+        if not game_map.is_within_bounds(target):
+            return None
+        pathfinder = self.pathfinder
+        reservations = self.reservations
+        window = self.window
+        cooldown = GAME_CONSTANTS['PARAMETERS']['UNIT_ACTION_COOLDOWN'][unit.type_str]
+        avoid_own_cities = unit.should_avoid_citytiles
+        costs = [ceil(cost) for cost in pathfinder.step_costs(cooldown)]
+        blocked = pathfinder.blocked_mask(unit.pos, target, avoid_own_cities=avoid_own_cities)
+        for index in self.blocked_indices:
+            blocked[index] = 1
+        heuristic = self._heuristic(unit.pos, target, cooldown, avoid_own_cities)
+        xs, ys, neighbors = pathfinder._xs, pathfinder._ys, pathfinder._neighbors
+        x_mult, y_mult = LogicGlobals.x_mult, LogicGlobals.y_mult
+
+        start = game_map.index_of(unit.pos)
+        target_index = game_map.index_of(target)
+        came_from = {(start, 0): None}
+        frontier = [(heuristic(start), 0, x_mult * xs[start], y_mult * ys[start], start)]
+        num_expansions = 0
+        while frontier:
+            __, turn, __, __, index = heappop(frontier)
+            if index == target_index or turn >= window:
+                return self._reconstruct(came_from, (index, turn))
+            num_expansions += 1
+            if num_expansions > self.max_expansions:
+                break
+
+            if reservations.is_free(index, turn + 1, unit.id) and (index, turn + 1) not in came_from:
+                came_from[(index, turn + 1)] = (index, turn)
+                heappush(frontier, (turn + 1 + heuristic(index), turn + 1, x_mult * xs[index], y_mult * ys[index], index))
+
+            for neighbor in neighbors[index]:
+                if blocked[neighbor] or reservations.is_swap(index, neighbor, turn):
+                    continue
+                arrival = min(turn + costs[neighbor], window)
+                if (neighbor, arrival) in came_from:
+                    continue
+                if not reservations.is_span_free(neighbor, turn + 1, arrival, unit.id):
+                    continue
+                came_from[(neighbor, arrival)] = (index, turn)
+                heappush(frontier, (arrival + heuristic(neighbor), arrival, x_mult * xs[neighbor], y_mult * ys[neighbor], neighbor))
+        return None
+
+    @staticmethod
+    def _reconstruct(came_from, state):
+        path = []
+        while state is not None:
+            index, turn = state
+            previous = came_from[state]
+            first_turn = previous[1] + 1 if previous is not None else 0
+            path.extend([index] * (turn - first_turn + 1))
+            state = previous
+        return path[::-1]
@@ -0,0 +1,90 @@
+import numpy as np
+
+from .constants import GAME_CONSTANTS
+
+
+def _clip_at_zero(value):
+    if isinstance(value, np.ndarray):
+        return np.maximum(value, 0)
+    return max(0, value)
+
+
+def _ceil_div(numerator, denominator):
+    return -((-numerator) // denominator)
+
+
+class DayNightCycle:
+    """ Travel time and survival model over the day/night cycle.
+
+    Night time is periodic in the turn number, so every query is
+    answered from closed forms or from tables over one cycle, built
+    once per cooldown. All queries accept either scalars or numpy
+    arrays (e.g. one entry per unit or per city).
+    """
+
+    def __init__(self, day_length, night_length):
+        self.day_length = day_length
+        self.night_length = night_length
+        self.cycle_length = day_length + night_length
+        self._night_penalties = {}
+
+    @classmethod
+    def from_game_constants(cls):
+        return cls(GAME_CONSTANTS["PARAMETERS"]["DAY_LENGTH"], GAME_CONSTANTS["PARAMETERS"]["NIGHT_LENGTH"])
+
+    def is_night(self, turn):
+        return self.day_length - turn % self.cycle_length <= 0
+
+    def _night_penalty_table(self, cooldown, num_moves):
+        """ [num moves, start turn % cycle length] table of the turns lost to night time by a moving unit.
+
+        Every move starting at night costs an extra `cooldown` turns.
+        Rows are added as longer moves get queried.
+        """
+        table = self._night_penalties.get(cooldown)
+        if table is None or table.shape[0] <= num_moves:
+            num_rows = max(num_moves + 1, 2 * table.shape[0] if table is not None else 64)
+            turns = np.arange(self.cycle_length) + 0 * cooldown
+            rows = [np.zeros_like(turns)]
+            for __ in range(num_rows - 1):
+                penalty = self.is_night(turns) * cooldown
+                rows.append(rows[-1] + penalty)
+                turns = turns + cooldown + penalty
+            table = self._night_penalties[cooldown] = np.stack(rows)
+        return table
+
+    def travel_turns(self, turn, num_turns, cooldown):
+        """ Turns needed to make `num_turns` worth of moves starting on `turn`, including night time cooldowns.
+
+        The first move is made on `turn`; every following move that
+        starts at night takes twice as long.
+        """
+        num_moves = _clip_at_zero(_ceil_div(num_turns - 1, cooldown))
+        phase = (turn + 1) % self.cycle_length
+        if isinstance(num_moves, np.ndarray):
+            num_moves = num_moves.astype(int)
+            table = self._night_penalty_table(cooldown, int(num_moves.max(initial=0)))
+            return num_turns + table[num_moves, phase]
+        num_moves = int(num_moves)
+        return num_turns + self._night_penalty_table(cooldown, num_moves).item(num_moves, phase)
+
+    def night_turns_en_route(self, turns_until_next_night, num_turns):
+        """ Night turns spent on a trip of `num_turns` turns starting `turns_until_next_night` turns before night. """
+        num_turns_left = num_turns - turns_until_next_night
+        num_nights = _clip_at_zero(_ceil_div(num_turns_left - self.night_length, self.day_length))
+        return num_nights * self.night_length + _clip_at_zero(num_turns_left - num_nights * self.day_length)
+
+    def fuel_needed(self, turns_until_next_night, num_turns, light_upkeep):
+        """ Fuel burned at night on a trip of `num_turns` turns (see `night_turns_en_route`). """
+        return self.night_turns_en_route(turns_until_next_night, num_turns) * light_upkeep
+
+    def turns_can_survive(self, turns_until_next_night, num_night_turns_of_fuel):
+        """ Turns until something with fuel for `num_night_turns_of_fuel` night turns runs out. """
+        num_cycles = _clip_at_zero(_ceil_div(num_night_turns_of_fuel - self.night_length, self.night_length))
+        return (
+            turns_until_next_night + num_cycles * self.cycle_length
+            + num_night_turns_of_fuel - num_cycles * self.night_length
+        )
+
+
+DAY_NIGHT = DayNightCycle.from_game_constants()
@@ -0,0 +1,114 @@
+""" Generated by freeze_constants.py from strategy_hyperparameters.json and game_constants.json; do not edit. """
+
+
+SOURCE_DIGEST = '11e6fb66'
+
+
+STRATEGY_HYPERPARAMETERS = {'MAX_DISTANCE_FROM_EDGE': 3,
+                            'BUILD_NIGHT_TURN_BUFFER': 7,
+                            'END_GAME_12X12': 80,
+                            'END_GAME_16X16': 120,
+                            'END_GAME_24X24': 200,
+                            'END_GAME_32X32': 240,
+                            'QUADRATIC_CUTOFF_12X12': 220,
+                            'QUADRATIC_CUTOFF_16X16': 260,
+                            'QUADRATIC_CUTOFF_24X24': 280,
+                            'QUADRATIC_CUTOFF_32X32': 300,
+                            'MANAGER_TO_CITY_RATIO': 0.5,
+                            'NUM_TURNS_BEFORE_RESEARCH_EXP_FIT': 5,
+                            'NUM_RP_BETWEEN_RATIO_ADJUSTMENTS': 5,
+                            'STARTER': {'SPAWN_TO_RESEARCH_STARTER_RATIO_12X12': 1,
+                                        'SPAWN_TO_RESEARCH_STARTER_RATIO_16X16': 1,
+                                        'SPAWN_TO_RESEARCH_STARTER_RATIO_24X24': 1,
+                                        'SPAWN_TO_RESEARCH_STARTER_RATIO_32X32': 1,
+                                        'DECREASE_SPAWN_TO_RESEARCH_RATIO_AMOUNT_12X12': 0.15,
+                                        'DECREASE_SPAWN_TO_RESEARCH_RATIO_AMOUNT_16X16': 0.15,
+                                        'DECREASE_SPAWN_TO_RESEARCH_RATIO_AMOUNT_24X24': 0.15,
+                                        'DECREASE_SPAWN_TO_RESEARCH_RATIO_AMOUNT_32X32': 0.15,
+                                        'BUILDER_TO_MANAGER_STARTER_RATIO_12X12': 0.3,
+                                        'BUILDER_TO_MANAGER_STARTER_RATIO_16X16': 0.35,
+                                        'BUILDER_TO_MANAGER_STARTER_RATIO_24X24': 0.4,
+                                        'BUILDER_TO_MANAGER_STARTER_RATIO_32X32': 0.45,
+                                        'MAX_FUEL_PER_MANAGER_3X3': 1000,
+                                        'MAX_FUEL_PER_MANAGER_12X12': 1000,
+                                        'MAX_FUEL_PER_MANAGER_16X16': 2000,
+                                        'MAX_FUEL_PER_MANAGER_24X24': 3000,
+                                        'MAX_FUEL_PER_MANAGER_32X32': 4000,
+                                        'N_UNITS_SPAWN_BEFORE_COLONIZE_STARTER_12X12': 3,
+                                        'N_UNITS_SPAWN_BEFORE_COLONIZE_STARTER_16X16': 3,
+                                        'N_UNITS_SPAWN_BEFORE_COLONIZE_STARTER_24X24': 3,
+                                        'N_UNITS_SPAWN_BEFORE_COLONIZE_STARTER_32X32': 3,
+                                        'CONTINUE_TO_BUILD_AFTER_RESOURCES_DEPLETED': 0,
+                                        'FARTHEST_DISTANCE_TO_TRAVEL_FOR_WOOD_12X12': 5,
+                                        'FARTHEST_DISTANCE_TO_TRAVEL_FOR_WOOD_16X16': 7,
+                                        'FARTHEST_DISTANCE_TO_TRAVEL_FOR_WOOD_24X24': 10,
+                                        'FARTHEST_DISTANCE_TO_TRAVEL_FOR_WOOD_32X32': 15,
+                                        'SPAWN_TO_RESEARCH_RATIO_12X12': 1,
+                                        'BUILDER_TO_MANAGER_RATIO_12X12': 0.3,
+                                        'N_UNITS_SPAWN_BEFORE_COLONIZE_12X12': 3,
+                                        'SPAWN_TO_RESEARCH_RATIO_16X16': 1,
+                                        'BUILDER_TO_MANAGER_RATIO_16X16': 0.35,
+                                        'N_UNITS_SPAWN_BEFORE_COLONIZE_16X16': 3,
+                                        'SPAWN_TO_RESEARCH_RATIO_24X24': 1,
+                                        'BUILDER_TO_MANAGER_RATIO_24X24': 0.4,
+                                        'N_UNITS_SPAWN_BEFORE_COLONIZE_24X24': 3,
+                                        'SPAWN_TO_RESEARCH_RATIO_32X32': 1,
+                                        'BUILDER_TO_MANAGER_RATIO_32X32': 0.45,
+                                        'N_UNITS_SPAWN_BEFORE_COLONIZE_32X32': 3},
+                            'COOPERATIVE_PLANNER': {'ENABLED': 0,
+                                                    'WINDOW': 8,
+                                                    'TIME_CAP_MS': 100,
+                                                    'MAX_EXPANSIONS_PER_UNIT': 2000},
+                            'TURN_BUDGET': {'ACT_TIMEOUT': 3,
+                                            'SAFETY_MARGIN': 0.25,
+                                            'OVERAGE_SHARE': 0.02,
+                                            'MIN_REMAINING': {'TURN_DISTANCE_MOVEMENT': 1.0,
+                                                              'SWITCH_BUILDS': 0.75,
+                                                              'COOPERATIVE_PLANNER': 1.0,
+                                                              'MOVEMENT_ROUNDS': 0.25}},
+                            'ANNOTATIONS': {'MAX_ANNOTATIONS': 300,
+                                            'SECTIONS': {'SUMMARY': 1,
+                                                         'CLUSTERS': 1,
+                                                         'GOAL_TASKS': 1,
+                                                         'CURRENT_TASKS': 1,
+                                                         'TASK_QUEUE': 1,
+                                                         'ACTIONS': 1,
+                                                         'MARKER': 1}},
+                            'TBS': {'LAST_DITCH_NUMBER_OF_WORKERS_RATIO': 0.25,
+                                    'LAST_DITCH_RESOURCE_DUMP_RATIO': 0.5},
+                            'RBS': {'COAL': {'MAX_CARTS_PER_CLUSTER': 1,
+                                             'WORKERS_INITIAL': 4,
+                                             'WORKERS_MAINTENANCE': 1,
+                                             'CART_RETURN': 1},
+                                    'URANIUM': {'MAX_CARTS_PER_CLUSTER': 1,
+                                                'WORKERS_INITIAL': 4,
+                                                'WORKERS_MAINTENANCE': 1,
+                                                'CART_RETURN': 1}}}
+
+
+GAME_CONSTANTS = {'UNIT_TYPES': {'WORKER': 0, 'CART': 1},
+                  'RESOURCE_TYPES': {'WOOD': 'wood', 'COAL': 'coal', 'URANIUM': 'uranium'},
+                  'DIRECTIONS': {'NORTH': 'n',
+                                 'WEST': 'w',
+                                 'EAST': 'e',
+                                 'SOUTH': 's',
+                                 'CENTER': 'c'},
+                  'PARAMETERS': {'DAY_LENGTH': 30,
+                                 'NIGHT_LENGTH': 10,
+                                 'MAX_DAYS': 360,
+                                 'LIGHT_UPKEEP': {'CITY': 23, 'WORKER': 4, 'CART': 10},
+                                 'WOOD_GROWTH_RATE': 1.025,
+                                 'MAX_WOOD_AMOUNT': 500,
+                                 'CITY_BUILD_COST': 100,
+                                 'CITY_ADJACENCY_BONUS': 5,
+                                 'RESOURCE_CAPACITY': {'WORKER': 100, 'CART': 2000},
+                                 'WORKER_COLLECTION_RATE': {'WOOD': 20, 'COAL': 5, 'URANIUM': 2},
+                                 'RESOURCE_TO_FUEL_RATE': {'WOOD': 1, 'COAL': 10, 'URANIUM': 40},
+                                 'RESEARCH_REQUIREMENTS': {'COAL': 50, 'URANIUM': 200},
+                                 'CITY_ACTION_COOLDOWN': 10,
+                                 'UNIT_ACTION_COOLDOWN': {'CART': 3, 'WORKER': 2},
+                                 'MAX_ROAD': 6,
+                                 'MIN_ROAD': 0,
+                                 'CART_ROAD_DEVELOPMENT_RATE': 0.75,
+                                 'PILLAGE_RATE': 0.5,
+                                 'CYCLE_LENGTH': 40}}
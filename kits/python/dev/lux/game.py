@@ -1,12 +1,25 @@
-import getpass
-from .constants import GAME_CONSTANTS, InputConstants, LogicGlobals
+from .constants import GAME_CONSTANTS, InputConstants, LogicGlobals, DETERMINISTIC
 from .game_map import GameMap, Position
-from .game_objects import Player, Unit, City, CityTile
+from .game_objects import Player, City, CityTile, UnitRegistry
 
 
 class Game:
-    def __init__(self, map_id, size_str):
+    def __init__(self, map_id, size_str, incremental_map=True):
+        """
+        Parameters
+        ----------
+        map_id : int or str
+            Id of the map.
+        size_str : str
+            Map width and height, separated by a space.
+        incremental_map : bool, optional
+            If True, a single map is kept for the whole game and each
+            observation is applied to it as a diff. Otherwise, the map
+            is rebuilt every turn and clusters are carried over through
+            the `MAP_CACHE`.
+        """
         self.id = int(map_id)
+        self.incremental_map = incremental_map
         self.turn = -1
         self.turns_until_next_night = GAME_CONSTANTS["PARAMETERS"]["DAY_LENGTH"]
         self.turns_until_next_day = GAME_CONSTANTS["PARAMETERS"]["CYCLE_LENGTH"]
@@ -15,6 +28,7 @@ class Game:
         self.map_width = int(mapInfo[0])
         self.map_height = int(mapInfo[1])
         self.players = [Player(0), Player(1)]
+        self.units = UnitRegistry()
         self.map = None
         self.player_rp = []
         self.opponent_rp = []
@@ -30,17 +44,23 @@ class Game:
         """
         update state
         """
-        self.map = GameMap(self.map_width, self.map_height)
+        if self.map is None or not self.incremental_map:
+            self.map = GameMap(self.map_width, self.map_height)
+            if not self.incremental_map:
+                self.map.load_state()
+        self.map.begin_update()
         self.turn += 1
         self.turns_until_next_night = max(0,
             GAME_CONSTANTS["PARAMETERS"]["DAY_LENGTH"] - self.turn % GAME_CONSTANTS["PARAMETERS"]["CYCLE_LENGTH"]
         )
         self.turns_until_next_day = GAME_CONSTANTS["PARAMETERS"]["CYCLE_LENGTH"] - self.turn % GAME_CONSTANTS["PARAMETERS"]["CYCLE_LENGTH"]
         self._reset_player_states()
+        self.units.begin_turn()
 
-        if getpass.getuser() == 'Paul':
+        if DETERMINISTIC:
             messages = sorted(messages)
 
+        layer_updates = []
         for update in messages:
             if update == "D_DONE":
                 continue
@@ -50,11 +70,7 @@ class Game:
                 team = int(strs[1])
                 self.players[team].research_points = int(strs[2])
             elif input_identifier == InputConstants.RESOURCES:
-                r_type = strs[1]
-                x = int(strs[2])
-                y = int(strs[3])
-                amt = int(float(strs[4]))
-                self.map._setResource(r_type, x, y, amt)
+                layer_updates.append(update)
             elif input_identifier == InputConstants.UNITS:
                 unittype = int(strs[1])
                 team = int(strs[2])
@@ -65,7 +81,9 @@ class Game:
                 wood = int(strs[7])
                 coal = int(strs[8])
                 uranium = int(strs[9])
-                self.players[team].units.append(Unit(team, unittype, unitid, x, y, cooldown, wood, coal, uranium))
+                self.players[team].units.append(
+                    self.units.observe(team, unittype, unitid, x, y, cooldown, wood, coal, uranium)
+                )
                 self.players[team].unit_pos.add(Position(x, y))
                 self.players[team].unit_ids.add(unitid)
             elif input_identifier == InputConstants.CITY:
@@ -83,17 +101,20 @@ class Game:
                 cooldown = float(strs[5])
                 city = self.players[team].cities[cityid]
                 citytile = city._add_city_tile(x, y, cooldown)
-                self.map.get_cell(x, y).citytile = citytile
+                self.map._setCityTile(x, y, citytile)
                 self.players[team].city_tile_count += 1
                 self.players[team].city_pos.add(Position(x, y))
             elif input_identifier == InputConstants.ROADS:
-                x = int(strs[1])
-                y = int(strs[2])
-                road = float(strs[3])
-                self.map.get_cell(x, y).road = road
+                layer_updates.append(update)
+
+        self.units.evict_missing()
+        self.map.apply_layer_updates(layer_updates)
+        self.map.end_update()
 
         LogicGlobals.player = LogicGlobals.game_state.players[player_id]
         LogicGlobals.opponent = LogicGlobals.game_state.players[(player_id + 1) % 2]
+        self.map.occupancy.update(LogicGlobals.player, LogicGlobals.opponent)
+        self.map.influence.update(LogicGlobals.player, LogicGlobals.opponent)
         self.player_rp.append(LogicGlobals.player.research_points)
         self.opponent_rp.append(LogicGlobals.opponent.research_points)
         if self.map.resource_clusters is None:
@@ -1,15 +1,30 @@
-from typing import List
 import math
 import sys
 from functools import partial
+from itertools import count
 from random import shuffle
-import getpass
 
-from .constants import ALL_DIRECTIONS, print, log, STRATEGY_HYPERPARAMETERS, ResourceTypes, Directions, LogicGlobals, StrategyTypes, INFINITE_DISTANCE, GAME_CONSTANTS, ValidActions, is_turn_during_night
+import numpy as np
+
+from .daynight import DAY_NIGHT
+from .influence import InfluenceMaps
+from .nearest import NearestFeatureIndex
+from .pathfinding import OccupancyLayer, PathFinder, TileDistanceField
+from .constants import ALL_DIRECTIONS, InputConstants, print, log, STRATEGY_HYPERPARAMETERS, ResourceTypes, Directions, LogicGlobals, StrategyTypes, INFINITE_DISTANCE, GAME_CONSTANTS, ValidActions, DETERMINISTIC
 
 
 MAX_DISTANCE_FROM_EDGE = STRATEGY_HYPERPARAMETERS['MAX_DISTANCE_FROM_EDGE']
 
+NO_RESOURCE = -1
+RESOURCE_TYPES_BY_CODE = (ResourceTypes.WOOD, ResourceTypes.COAL, ResourceTypes.URANIUM)
+RESOURCE_CODES = {r_type: code for code, r_type in enumerate(RESOURCE_TYPES_BY_CODE)}
+WOOD_CODE = RESOURCE_CODES[ResourceTypes.WOOD]
+MAX_MAP_SIZE = 32
+NO_TEAM = -1
+NO_CITY = -1
+NO_CLUSTER = -1
+CLUSTER_CONNECTIVITY = 8
+
 
 class Resource:
     def __init__(self, r_type: str, amount: int):
@@ -49,21 +64,33 @@ class ResourceCluster:
         self.sort_position = None
         self.needs_defending_from_opponent = False
         self.cart_id = None
+        self._map_generation = None
+        self._pos_to_defend_set = set()
+        self._center_distances = None
+        self._sort_distances = None
+        self._sort_key = None
 
         for pos in positions:
             self._resource_positions[pos] = None
         self.id = self._hash = hash(tuple(self._resource_positions.keys()))
+        self._resource_positions_avoided = frozenset(self._resource_positions)
 
     def __repr__(self) -> str:
         return f"ResourceCluster({self.type}, {self.center_pos}, {self.id})"
 
+    def __getstate__(self):
+        # The distance fields are rebuilt on demand, no need to carry them into snapshots
+        state = self.__dict__.copy()
+        state['_center_distances'] = state['_sort_distances'] = None
+        return state
+
     def __eq__(self, other) -> bool:
         return self.resource_positions == other.resource_positions
 
     def __hash__(self):
         return self._hash
 
-    def calculate_score(self, player, opponent, scaling_factor=1):
+    def calculate_score(self, player, opponent, scaling_factor=1, game_map=None):
         # From list 'L' of clusters with type (wood, coal, uranium) and number of resources in cluster:
         # 1.) Iterate through 'L'  and compare type to number of research points and if compatible, add the number of resources of cluster to list 'K'
         # 2.) Reorder 'K' by number of resources
@@ -73,21 +100,11 @@ class ResourceCluster:
         # 6.) Multiply by distance to nearest opponent city or worker
         # 7.) Send worker to cluster with highest value
 
-        self.current_score = self.total_amount / scaling_factor
-        self.current_score /= max(1, len(self.pos_defended))
-        self.current_score /= min(
-            [1]
-            +
-            [self.center_pos.distance_to(pos) for pos in player.city_pos]
-        )
-        self.current_score *= min(
-            [1]
-            +
-            [self.center_pos.distance_to(pos) for pos in opponent.city_pos]
-            +
-            [self.center_pos.distance_to(unit.pos) for unit in opponent.units]
-        )
-        return self.current_score
+        # Scoring terms are defined by CLUSTER_SCORE_TERMS; see GameMap.score_clusters.
+        # `game_map` defaults to the map of the current turn
+        if game_map is None:
+            game_map = LogicGlobals.game_state.map
+        return game_map.score_clusters([self], player, opponent, scaling_factor=scaling_factor)[self]
 
     def _set_research_based_pos_to_defend(self, game_map):
         self.pos_to_defend = set()
@@ -200,35 +217,56 @@ class ResourceCluster:
     def _set_basic_positions(self, game_map):
         self.pos_to_defend = set()
         for r_pos in self._resource_positions:
-            for pos in r_pos.adjacent_positions(include_center=True, include_diagonals=True):
-                if game_map.is_within_bounds(pos) and not game_map.get_cell_by_pos(pos).has_resource():
+            for pos in game_map.adjacent_positions(r_pos, include_center=True, include_diagonals=True):
+                if not game_map.has_resource_at(pos.x, pos.y):
                     self.pos_to_defend.add(pos)
 
     def update_state(self, game_map, opponent):
-        cells = {
-            game_map.get_cell_by_pos(p)
-            for p in self._resource_positions.keys()
-            if game_map.is_within_bounds(p)
-        }
+        """ Refresh the derived state of the cluster for the current observation.
 
-        cells = {
-            c for c in cells if c.resource is not None
-        }
+        Only the parts that can have changed are recomputed: resource
+        totals and positions to defend when resources around the cluster
+        changed, defended positions when city tiles around it changed, and
+        the order of the positions to defend when the position they are
+        sorted from changed.
 
-        self.total_amount = sum(
-            cell.resource.amount for cell in cells  # if cell.resource is not None
-        ) if cells else 0
+        Returns
+        -------
+        bool
+            False if the update was skipped because nothing around
+            the cluster changed.
 
-        x_vals = [p.x for p in self._resource_positions.keys()]
-        y_vals = [p.y for p in self._resource_positions.keys()]
+        """
+        if self.min_loc is None:
+            x_vals = [p.x for p in self._resource_positions.keys()]
+            y_vals = [p.y for p in self._resource_positions.keys()]
+
+            self.min_loc = (min(x_vals), min(y_vals))
+            self.max_loc = (max(x_vals), max(y_vals))
+            self.center_pos = Position(
+                (self.max_loc[0] - self.min_loc[0]) // 2 + self.min_loc[0],
+                (self.max_loc[1] - self.min_loc[1]) // 2 + self.min_loc[1],
+            )
 
-        self.min_loc = (min(x_vals), min(y_vals))
-        self.max_loc = (max(x_vals), max(y_vals))
-        self.center_pos = Position(
-            (self.max_loc[0] - self.min_loc[0]) // 2 + self.min_loc[0],
-            (self.max_loc[1] - self.min_loc[1]) // 2 + self.min_loc[1],
+        region = (
+            slice(max(0, self.min_loc[1] - 1), self.max_loc[1] + 2),
+            slice(max(0, self.min_loc[0] - 1), self.max_loc[0] + 2),
         )
-        self._set_basic_positions(game_map)
+        if self._map_generation != game_map.generation:
+            self._map_generation = game_map.generation
+            self._center_distances = self._sort_distances = self._sort_key = None
+            resources_changed = cities_changed = True
+        else:
+            resources_changed = game_map.resources_changed[region].any()
+            cities_changed = game_map.city_tiles_changed[region].any()
+
+        if resources_changed:
+            xs = [p.x for p in self._resource_positions.keys() if game_map.is_within_bounds(p)]
+            ys = [p.y for p in self._resource_positions.keys() if game_map.is_within_bounds(p)]
+            has_resource = game_map.resource_type[ys, xs] != NO_RESOURCE
+            self.total_amount = int(game_map.resource_amount[ys, xs][has_resource].sum())
+            self._set_basic_positions(game_map)
+            self._pos_to_defend_set = self.pos_to_defend
 
         # if LogicGlobals.player.current_strategy == StrategyTypes.RESEARCH_BASED:
         #     self._set_research_based_pos_to_defend(game_map)
@@ -274,15 +312,17 @@ class ResourceCluster:
         #
         #
         if self.sort_position is None:
+            if self._center_distances is None:
+                self._center_distances = TileDistanceField(game_map.pathfinder, self.center_pos, self._resource_positions_avoided)
             opponent_positions = opponent.city_pos | opponent.unit_pos
-            if opponent_positions and (not opponent_positions & self.pos_to_defend):
+            if opponent_positions and (not opponent_positions & self._pos_to_defend_set):
                 # closest_opponent_pos = min(
                 #     opponent_positions,
                 #     key=lambda p: (self.center_pos.distance_to(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
                 # )
                 closest_opponent_pos = min(
                     opponent_positions,
-                    key=lambda p: (self.center_pos.tile_distance_to(p, positions_to_avoid=self.resource_positions), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
+                    key=lambda p: (self._center_distances.distance_to(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
                 )
             else:
                 to_search_pos = LogicGlobals.player.city_pos | LogicGlobals.player.unit_pos
@@ -290,7 +330,7 @@ class ResourceCluster:
                     to_search_pos = {Position(0, 0)}
                 closest_opponent_pos = min(
                     to_search_pos,
-                    key=lambda p: (self.center_pos.tile_distance_to(p, positions_to_avoid=self.resource_positions), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
+                    key=lambda p: (self._center_distances.distance_to(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
                 )
         else:
             closest_opponent_pos = self.sort_position
@@ -298,13 +338,20 @@ class ResourceCluster:
         # self.pos_to_defend = sorted(
         #     self.pos_to_defend, key=lambda p: (closest_opponent_pos.distance_to(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
         # )
-        self.pos_to_defend = sorted(
-            self.pos_to_defend, key=lambda p: (closest_opponent_pos.tile_distance_to(p, positions_to_avoid=self.resource_positions), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
-        )
+        sort_key = (closest_opponent_pos, LogicGlobals.x_mult, LogicGlobals.y_mult)
+        resort = resources_changed or sort_key != self._sort_key
+        if resort:
+            if self._sort_distances is None or self._sort_distances.origin != closest_opponent_pos:
+                self._sort_distances = TileDistanceField(game_map.pathfinder, closest_opponent_pos, self._resource_positions_avoided)
+            self._sort_key = sort_key
+            self.pos_to_defend = sorted(
+                self._pos_to_defend_set, key=lambda p: (self._sort_distances.distance_to(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
+            )
 
         if LogicGlobals.opponent.units:
+            influence = game_map.influence
             distance_to_closest_enemy = {
-                p: (min(p.distance_to(u.pos) for u in LogicGlobals.opponent.units), -min(p.distance_to(u.pos) for u in LogicGlobals.player.units) if LogicGlobals.player.units else 0, LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
+                p: (influence.at('opponent_units', p), -influence.at('player_units', p) if LogicGlobals.player.units else 0, LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y)
                 for p in self.pos_to_defend
             }
             pos_closest_to_enemy = min(
@@ -319,18 +366,21 @@ class ResourceCluster:
 
         # print(f"Resource cluster at {self.center_pos} needs defending: {self.needs_defending_from_opponent}")
 
-        self.city_ids = set()
-        self.pos_defended = []
-        self.pos_defended_by_player = set()
-        for x in range(self.min_loc[0]-1, self.max_loc[0] + 2):
-            for y in range(self.min_loc[1]-1, self.max_loc[1] + 2):
-                if game_map.is_loc_within_bounds(x, y):
-                    city_tile = game_map.get_cell(x, y).citytile
-                    if city_tile is not None:
-                        if city_tile.cityid in LogicGlobals.player.city_ids:
-                            self.city_ids.add(city_tile.cityid)
-                            self.pos_defended_by_player.add(city_tile.pos)
-                        self.pos_defended.append(Position(x, y))
+        if cities_changed:
+            self.city_ids = set()
+            self.pos_defended = []
+            self.pos_defended_by_player = set()
+            for x in range(self.min_loc[0]-1, self.max_loc[0] + 2):
+                for y in range(self.min_loc[1]-1, self.max_loc[1] + 2):
+                    if game_map.is_loc_within_bounds(x, y):
+                        city_tile = game_map.get_cell(x, y).citytile
+                        if city_tile is not None:
+                            if city_tile.cityid in LogicGlobals.player.city_ids:
+                                self.city_ids.add(city_tile.cityid)
+                                self.pos_defended_by_player.add(city_tile.pos)
+                            self.pos_defended.append(Position(x, y))
+
+        return resources_changed or cities_changed or resort
 
     @property
     def n_to_block(self):
@@ -346,17 +396,51 @@ class ResourceCluster:
 
 
 class Cell:
-    def __init__(self, x, y):
+    """ View of a single tile of a :GameMap:.
+
+    All state lives in the map arrays; the view only
+    translates attribute access into array reads and writes.
+    """
+    __slots__ = ('pos', '_map', '_x', '_y')
+
+    def __init__(self, game_map, x, y):
         self.pos = Position(x, y)
-        self.resource: Resource = None
-        self.citytile = None
-        self.road = 0
+        self._map = game_map
+        self._x = x
+        self._y = y
 
-    def has_resource(self, include_wood_that_is_growing=True, min_amt=0):
-        if include_wood_that_is_growing:
-            return self.resource is not None and self.resource.amount > min_amt
+    @property
+    def resource(self):
+        r_code = self._map.resource_type.item(self._y, self._x)
+        if r_code == NO_RESOURCE:
+            return None
+        return Resource(RESOURCE_TYPES_BY_CODE[r_code], self._map.resource_amount.item(self._y, self._x))
+
+    @resource.setter
+    def resource(self, resource):
+        if resource is None:
+            self._map._clearResource(self._x, self._y)
         else:
-            return self.resource is not None and ((self.resource.type != ResourceTypes.WOOD and self.resource.amount > min_amt) or (self.resource.type == ResourceTypes.WOOD and self.resource.amount >= GAME_CONSTANTS["PARAMETERS"]["MAX_WOOD_AMOUNT"]))
+            self._map._setResource(resource.type, self._x, self._y, resource.amount)
+
+    @property
+    def citytile(self):
+        return self._map.city_tiles[self._y * self._map.width + self._x]
+
+    @citytile.setter
+    def citytile(self, citytile):
+        self._map._setCityTile(self._x, self._y, citytile)
+
+    @property
+    def road(self):
+        return self._map.road.item(self._y, self._x)
+
+    @road.setter
+    def road(self, road):
+        self._map._setRoad(self._x, self._y, road)
+
+    def has_resource(self, include_wood_that_is_growing=True, min_amt=0):
+        return self._map.has_resource_at(self._x, self._y, include_wood_that_is_growing=include_wood_that_is_growing, min_amt=min_amt)
 
     def is_empty(self):
         return self.citytile is None and not self.has_resource()
@@ -365,37 +449,196 @@ class Cell:
 MAP_CACHE = {}
 
 
+class ClusterScoringContext:
+    """ Inputs shared by the terms of a batch of cluster scores.
+
+    `influence` holds the distance grids from the point of view of
+    `player` and `opponent`.
+    """
+
+    def __init__(self, clusters, player, opponent, influence, scaling_factor):
+        self.clusters = clusters
+        self.player = player
+        self.opponent = opponent
+        self.influence = influence.for_players(player, opponent)
+        self.scaling_factor = scaling_factor
+        self.center_xs = np.array([c.center_pos.x for c in clusters], dtype=np.int64)
+        self.center_ys = np.array([c.center_pos.y for c in clusters], dtype=np.int64)
+
+    def at_centers(self, layer):
+        """ Influence map `layer` at the center of every cluster. """
+        return getattr(self.influence, layer)[self.center_ys, self.center_xs]
+
+
+def _resource_amount_term(scores, context):
+    return scores * (np.array([c.total_amount for c in context.clusters], dtype=np.int64) / context.scaling_factor)
+
+
+def _defended_positions_term(scores, context):
+    return scores / np.maximum(1, [len(c.pos_defended) for c in context.clusters])
+
+
+def _player_city_distance_term(scores, context):
+    # A cluster centered on one of the player's cities is already taken, and scores 0
+    distances = np.minimum(1, context.at_centers('player_cities'))
+    return np.divide(scores, distances, out=np.zeros_like(scores), where=distances > 0)
+
+
+def _opponent_distance_term(scores, context):
+    return scores * np.minimum(1, context.at_centers('opponent_presence'))
+
+
+# Each term takes the scores so far and a ClusterScoringContext, and returns the updated scores
+CLUSTER_SCORE_TERMS = [
+    _resource_amount_term,
+    _defended_positions_term,
+    _player_city_distance_term,
+    _opponent_distance_term,
+]
+
+
+_MAP_GENERATIONS = count()
+
+
 class GameMap:
+    """ Game map backed by one NumPy array per tile attribute.
+
+    Arrays are indexed as ``[y, x]``:
+
+    - ``resource_type``: index into ``RESOURCE_TYPES_BY_CODE``, or ``NO_RESOURCE``.
+    - ``resource_amount``: amount of resource on the tile.
+    - ``road``: road level of the tile.
+    - ``city_tile_team``: team owning the city tile on the tile, or ``NO_TEAM``.
+    - ``city_id``: numeric code of the city owning the tile, or ``NO_CITY``.
+      Codes map back to city id strings through ``city_id_from_code``.
+
+    ``get_cell``/``get_cell_by_pos`` return :Cell: views over these arrays.
+    """
+
     def __init__(self, width, height):
         self.height = height
         self.width = width
-        self.map: List[List[Cell]] = [None] * height
+        self.resource_type = np.full((height, width), NO_RESOURCE, dtype=np.int8)
+        self.resource_amount = np.zeros((height, width), dtype=np.int32)
+        self.road = np.zeros((height, width), dtype=np.float64)
+        self.city_tile_team = np.full((height, width), NO_TEAM, dtype=np.int8)
+        self.city_id = np.full((height, width), NO_CITY, dtype=np.int32)
+        self.city_tiles = [None] * (width * height)
+        self.resources_changed = np.zeros((height, width), dtype=bool)
+        self.roads_changed = np.zeros((height, width), dtype=bool)
+        self.city_tiles_changed = np.zeros((height, width), dtype=bool)
+        self._city_id_codes = {}
+        self._city_ids_by_code = []
+        self._cells = [None] * (width * height)
+        self.positions_by_index = position_table(width, height)
+        self.neighbor_table = neighbor_table(width, height)
+        self.occupancy = OccupancyLayer(self)
+        self.pathfinder = PathFinder(self, self.occupancy)
+        self.nearest_features = NearestFeatureIndex(self)
+        self.influence = InfluenceMaps(self)
         self._resources = []
+        self._layer_updates = set()
+        self._city_tile_indices = set()
+        self._previous_city_tile_indices = set()
         self.resource_clusters = None
-        for y in range(0, self.height):
-            self.map[y] = [None] * width
-            for x in range(0, self.width):
-                self.map[y][x] = Cell(x, y)
-
-        self.__dict__.update(MAP_CACHE.get('map', {}))
+        self.cluster_labels = None
+        self.clusters_by_label = []
+        self._clusters_by_id = {}
+        self._cluster_grid = [None] * (width * height)
+        self.skipped_cluster_updates = 0
+        self.generation = next(_MAP_GENERATIONS)
 
     def save_state(self):
         MAP_CACHE['map'] = {
             key: self.__dict__[key]
             for key in [
                 'resource_clusters',
+                'cluster_labels',
+                'clusters_by_label',
+                '_clusters_by_id',
+                '_cluster_grid',
             ]
         }
 
+    def load_state(self):
+        self.__dict__.update(MAP_CACHE.get('map', {}))
+
+    def begin_update(self):
+        """ Prepare the map for the observation of a new turn.
+
+        Only the per-turn change masks and the city tiles are
+        reset here. Resources and roads are updated in place by
+        `apply_layer_updates`, and city tiles that were not seen
+        again are cleared by `end_update`.
+        """
+        self.resources_changed.fill(False)
+        self.roads_changed.fill(False)
+        self.city_tiles_changed.fill(False)
+        self.nearest_features.begin_turn()
+        self.pathfinder.begin_turn()
+        self._previous_city_tile_indices = self._city_tile_indices
+        self._city_tile_indices = set()
+
+    def apply_layer_updates(self, updates):
+        """ Apply the resource ('r') and road ('ccd') lines of an observation.
+
+        The lines are diffed against the ones applied last turn,
+        so only tiles whose line changed (appeared, disappeared or
+        got a new value) are touched.
+
+        Parameters
+        ----------
+        updates : iterable of str
+            Every resource and road line of the current observation.
+        """
+        updates = set(updates)
+        for update in self._layer_updates - updates:
+            strs = update.split(" ")
+            if strs[0] == InputConstants.RESOURCES:
+                self._clearResource(int(strs[2]), int(strs[3]))
+            else:
+                self._setRoad(int(strs[1]), int(strs[2]), 0)
+        for update in updates - self._layer_updates:
+            strs = update.split(" ")
+            if strs[0] == InputConstants.RESOURCES:
+                self._setResource(strs[1], int(strs[2]), int(strs[3]), int(float(strs[4])))
+            else:
+                self._setRoad(int(strs[1]), int(strs[2]), float(strs[3]))
+        self._layer_updates = updates
+
+    def end_update(self):
+        """ Clear the city tiles that were not part of this turn's observation. """
+        for index in self._previous_city_tile_indices - self._city_tile_indices:
+            self._setCityTile(index % self.width, index // self.width, None)
+
     def get_cell_by_pos(self, pos):
-        if not self.is_within_bounds(pos):
-            return None
-        return self.map[pos.y][pos.x]
+        return self.get_cell(pos.x, pos.y)
 
     def get_cell(self, x, y):
         if not self.is_loc_within_bounds(x, y):
             return None
-        return self.map[y][x]
+        index = y * self.width + x
+        cell = self._cells[index]
+        if cell is None:
+            cell = self._cells[index] = Cell(self, x, y)
+        return cell
+
+    def index_of(self, pos):
+        """ Integer `y * width + x` encoding of an on-map position. """
+        return pos.y * self.width + pos.x
+
+    def position_at(self, index):
+        """ Position for an index produced by `index_of`. """
+        return self.positions_by_index[index]
+
+    def adjacent_positions(self, pos, include_center=True, include_diagonals=False):
+        """ On-map positions adjacent to `pos`. """
+        if self.is_within_bounds(pos):
+            return self.neighbor_table.neighbors(pos.y * self.width + pos.x, include_center, include_diagonals)
+        return tuple(
+            p for p in pos.adjacent_positions(include_center=include_center, include_diagonals=include_diagonals)
+            if self.is_within_bounds(p)
+        )
 
     def is_loc_within_bounds(self, x, y):
         return (0 <= x < self.height) and (0 <= y < self.width)
@@ -407,78 +650,205 @@ class GameMap:
         """
         do not use this function, this is for internal tracking of state
         """
-        cell = self.get_cell(x, y)
-        cell.resource = Resource(r_type, amount)
+        self.resource_type[y, x] = RESOURCE_CODES[r_type]
+        self.resource_amount[y, x] = amount
+        self.resources_changed[y, x] = True
+        self._resources = []
+
+    def _clearResource(self, x, y):
+        """
+        do not use this function, this is for internal tracking of state
+        """
+        self.resource_type[y, x] = NO_RESOURCE
+        self.resource_amount[y, x] = 0
+        self.resources_changed[y, x] = True
+        self._resources = []
+
+    def _setCityTile(self, x, y, citytile):
+        """
+        do not use this function, this is for internal tracking of state
+        """
+        index = y * self.width + x
+        self.city_tiles[index] = citytile
+        if citytile is None:
+            team, city_id = NO_TEAM, NO_CITY
+            self._city_tile_indices.discard(index)
+        else:
+            team, city_id = citytile.team, self.city_id_code(citytile.cityid)
+            self._city_tile_indices.add(index)
+        if self.city_tile_team.item(y, x) != team or self.city_id.item(y, x) != city_id:
+            self.city_tile_team[y, x] = team
+            self.city_id[y, x] = city_id
+            self.city_tiles_changed[y, x] = True
+
+    def _setRoad(self, x, y, road):
+        """
+        do not use this function, this is for internal tracking of state
+        """
+        if self.road.item(y, x) != road:
+            self.road[y, x] = road
+            self.roads_changed[y, x] = True
+
+    def city_id_code(self, city_id):
+        """ Numeric code used for `city_id` in the `city_id` array. """
+        code = self._city_id_codes.get(city_id)
+        if code is None:
+            code = self._city_id_codes[city_id] = len(self._city_ids_by_code)
+            self._city_ids_by_code.append(city_id)
+        return code
+
+    def city_id_from_code(self, code):
+        """ City id string for a code read from the `city_id` array. """
+        if code == NO_CITY:
+            return None
+        return self._city_ids_by_code[code]
+
+    def has_resource_at(self, x, y, include_wood_that_is_growing=True, min_amt=0):
+        r_code = self.resource_type.item(y, x)
+        if r_code == NO_RESOURCE:
+            return False
+        amount = self.resource_amount.item(y, x)
+        if include_wood_that_is_growing or r_code != WOOD_CODE:
+            return amount > min_amt
+        return amount >= GAME_CONSTANTS["PARAMETERS"]["MAX_WOOD_AMOUNT"]
+
+    def resource_mask(self, r_type=None):
+        """ Boolean array of tiles that have resources (of type `r_type`, if given) left on them. """
+        if r_type is None:
+            return (self.resource_type != NO_RESOURCE) & (self.resource_amount > 0)
+        return (self.resource_type == RESOURCE_CODES[r_type]) & (self.resource_amount > 0)
 
     def max_collectors_allowed_at(self, pos):
         return sum(
-            self.is_within_bounds(p) and self.get_cell_by_pos(pos).citytile is None
-            for p in pos.adjacent_positions(include_center=False, include_diagonals=False)
+            self.get_cell_by_pos(pos).citytile is None
+            for p in self.adjacent_positions(pos, include_center=False, include_diagonals=False)
         )
 
     def num_adjacent_resources(self, pos, include_center=True, include_wood_that_is_growing=True, check_for_unlock=False):
         return sum(
-            self.get_cell_by_pos(p).has_resource(include_wood_that_is_growing=include_wood_that_is_growing) and (self.get_cell_by_pos(p).resource.can_harvest if check_for_unlock else True)
-            for p in pos.adjacent_positions(include_center=include_center)
-            if self.is_within_bounds(p)
+            self.has_resource_at(p.x, p.y, include_wood_that_is_growing=include_wood_that_is_growing) and (self.get_cell_by_pos(p).resource.can_harvest if check_for_unlock else True)
+            for p in self.adjacent_positions(pos, include_center=include_center)
         )
 
     def adjacent_resource_types(self, pos, include_center=True):
         return set(
-            self.get_cell_by_pos(p).resource.type
-            for p in pos.adjacent_positions(include_center=include_center)
-            if self.is_within_bounds(p) and self.get_cell_by_pos(p).has_resource(include_wood_that_is_growing=True)
+            RESOURCE_TYPES_BY_CODE[self.resource_type.item(p.y, p.x)]
+            for p in self.adjacent_positions(pos, include_center=include_center)
+            if self.has_resource_at(p.x, p.y)
         )
 
     def resources(self, return_positions_only=False):
         if not self._resources:
+            # Transpose so that tiles come out in the same (x, y) order as `cells`
+            xs, ys = np.nonzero(self.resource_mask().T)
             self._resources = [
-                cell.pos if return_positions_only else cell
-                for cell in self.cells()
-                if cell.has_resource()
+                self.positions_by_index[y * self.width + x] if return_positions_only else self.get_cell(x, y)
+                for x, y in zip(xs.tolist(), ys.tolist())
             ]
         return self._resources
 
-    def _check_for_cluster(self, position, resource_set, resource_type):
-        for step in ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)):
-            new_position = position.shift_by(*step)
-            if self.is_within_bounds(new_position) and new_position not in resource_set:
-                new_cell = self.get_cell_by_pos(new_position)
-                if new_cell.resource is not None and new_cell.resource.type == resource_type:
-                    resource_set.add(new_position)
-                    self._check_for_cluster(new_position, resource_set, resource_type)
-
-        return resource_set
-
-    def find_clusters(self):
-        resource_pos_found = set()
-        self.resource_clusters = set()
-        for cell in self.cells():
-            if cell.has_resource() and cell.pos not in resource_pos_found:
-                new_cluster_pos = self._check_for_cluster(cell.pos, {cell.pos}, cell.resource.type)
-                resource_pos_found = resource_pos_found | new_cluster_pos
-                new_cluster = ResourceCluster(cell.resource.type, new_cluster_pos)
-                self.resource_clusters.add(new_cluster)
+    def find_clusters(self, connectivity=CLUSTER_CONNECTIVITY):
+        """ Group connected tiles of the same resource type into :ResourceCluster:s.
+
+        Also sets `cluster_labels`, a [y, x] grid of indices into
+        `clusters_by_label` (NO_CLUSTER for tiles without resources).
+
+        Parameters
+        ----------
+        connectivity : int, optional
+            4 to only connect tiles that share an edge, or 8 to
+            connect diagonal neighbors as well.
+
+        Returns
+        -------
+        set
+            The resource clusters.
+
+        """
+        codes = np.where(self.resource_mask(), self.resource_type, NO_RESOURCE)
+        self.cluster_labels, components = label_components(codes, connectivity=connectivity, background=NO_RESOURCE)
+        self.clusters_by_label = [
+            ResourceCluster(
+                RESOURCE_TYPES_BY_CODE[codes.item(indices[0] // self.width, indices[0] % self.width)],
+                [self.positions_by_index[index] for index in indices]
+            )
+            for indices in components
+        ]
+        self.resource_clusters = set(self.clusters_by_label)
+        self._index_clusters()
         self.save_state()
         return self.resource_clusters
 
     def update_clusters(self, opponent):
         clusters_to_discard = set()
+        self.skipped_cluster_updates = 0
         for cluster in self.resource_clusters:
-            cluster.update_state(
-                game_map=self, opponent=opponent
-            )
+            if not cluster.update_state(game_map=self, opponent=opponent):
+                self.skipped_cluster_updates += 1
             cluster_has_no_resources = cluster.total_amount <= 0
             cluster_has_cities = any(p in LogicGlobals.player.city_pos for p in cluster.pos_to_defend)
             if cluster_has_no_resources and not cluster_has_cities and LogicGlobals.player.current_strategy == StrategyTypes.STARTER:
                 clusters_to_discard.add(cluster)
         self.resource_clusters = self.resource_clusters - clusters_to_discard
+        self._index_clusters()
         self.save_state()
 
+    def _index_clusters(self):
+        """ Rebuild the cluster lookups used by `get_cluster_by_id` and `position_to_cluster`.
+
+        Clusters are indexed in `resource_clusters` iteration order, and the
+        first cluster to claim an id or a tile keeps it, so the lookups give
+        the same results as scanning the clusters would.
+        """
+        self._clusters_by_id = {}
+        self._cluster_grid = [None] * (self.width * self.height)
+        for cluster in self.resource_clusters:
+            self._clusters_by_id.setdefault(cluster.id, cluster)
+            if cluster.min_loc is None:
+                continue
+            for x in range(max(0, cluster.min_loc[0] - 1), min(self.width, cluster.max_loc[0] + 2)):
+                for y in range(max(0, cluster.min_loc[1] - 1), min(self.height, cluster.max_loc[1] + 2)):
+                    if self._cluster_grid[y * self.width + x] is None:
+                        self._cluster_grid[y * self.width + x] = cluster
+            for pos in cluster.pos_to_defend:
+                if self.is_within_bounds(pos) and self._cluster_grid[pos.y * self.width + pos.x] is None:
+                    self._cluster_grid[pos.y * self.width + pos.x] = cluster
+
+    def score_clusters(self, clusters, player, opponent, scaling_factor=1, terms=None):
+        """ Score several clusters at once and store the results as their `current_score`.
+
+        Parameters
+        ----------
+        clusters : iterable
+            The :ResourceCluster:s to score.
+        player, opponent : Player
+            The point of view to score from. The influence maps of this
+            turn are reused when they were built for these players.
+        scaling_factor : int, optional
+            Resource amount that maps to a score of 1.
+        terms : list, optional
+            Scoring terms to apply in order. Defaults to CLUSTER_SCORE_TERMS.
+
+        Returns
+        -------
+        dict
+            Score of every cluster. Clusters centered on a city of
+            `player` score 0.
+
+        """
+        clusters = list(clusters)
+        if not clusters:
+            return {}
+        context = ClusterScoringContext(clusters, player, opponent, self.influence, scaling_factor)
+        scores = np.ones(len(clusters))
+        for term in CLUSTER_SCORE_TERMS if terms is None else terms:
+            scores = term(scores, context)
+        for cluster, score in zip(clusters, scores.tolist()):
+            cluster.current_score = score
+        return {cluster: cluster.current_score for cluster in clusters}
+
     def get_cluster_by_id(self, cluster_id):
-        for c in self.resource_clusters:
-            if c.id == cluster_id:
-                return c
+        return self._clusters_by_id.get(cluster_id)
 
     def position_to_cluster(self, pos):
         if not self.resource_clusters:
@@ -486,6 +856,8 @@ class GameMap:
             return None
         if pos is None:
             return None
+        if self.is_within_bounds(pos):
+            return self._cluster_grid[pos.y * self.width + pos.x]
         for cluster in self.resource_clusters:
             if (cluster.min_loc[0] - 1 <= pos.x <= cluster.max_loc[0] + 1) and (
                     cluster.min_loc[1] - 1 <= pos.y <= cluster.max_loc[1] + 1):
@@ -508,182 +880,52 @@ class GameMap:
 
 
 class Position:
-    def __init__(self, x, y):
+    """ Immutable map position.
+
+    Positions with integer coordinates inside the largest
+    possible map are interned, so `Position(x, y)` returns the
+    same object every time. Do not set attributes on positions.
+    """
+    __slots__ = ('x', 'y', '_hash')
+
+    def __new__(cls, x, y):
+        if 0 <= x < MAX_MAP_SIZE and 0 <= y < MAX_MAP_SIZE:
+            try:
+                return _INTERNED_POSITIONS[y * MAX_MAP_SIZE + x]
+            except TypeError:  # Non-integer coordinates, like a median
+                pass
+        return cls._new(x, y)
+
+    @classmethod
+    def _new(cls, x, y):
+        self = object.__new__(cls)
         self.x = x
         self.y = y
-        self._closest_resource_pos = {
-            ResourceTypes.WOOD: [],
-            ResourceTypes.COAL: [],
-            ResourceTypes.URANIUM: [],
-        }
-        self._closest_city_pos = None
+        self._hash = hash((x, y))
+        return self
+
+    def __reduce__(self):
+        return Position, (self.x, self.y)
 
     def __sub__(self, pos) -> int:
         return abs(pos.x - self.x) + abs(pos.y - self.y)
 
-    def turn_distance_to(self, pos, game_map, cooldown, avoid_own_cities=False, include_target_road=False, debug=False):
-        num_turns = self.__turn_distance_to(
-            pos, game_map, cooldown, avoid_own_cities=avoid_own_cities,
-            include_target_road=include_target_road, debug=debug
+    def turn_distance_to(self, pos, game_map, cooldown, avoid_own_cities=False, include_target_road=False, debug=False, field_root=None):
+        num_turns = game_map.pathfinder.turn_distance(
+            self, pos, cooldown, avoid_own_cities=avoid_own_cities,
+            include_target_road=include_target_road, field_root=field_root
         )
 
         if num_turns >= INFINITE_DISTANCE or num_turns == 0:
             return num_turns
 
-        num_turns_to_add = 0
-        num_turns_left = num_turns
-        turn_number = LogicGlobals.game_state.turn
-        turn_number += 1
-        num_turns_left -= 1
-        while num_turns_left > 0:
-            if is_turn_during_night(turn_number):
-                num_turns_to_add += cooldown
-                turn_number += cooldown
-            turn_number += cooldown
-            num_turns_left -= cooldown
-
-        return num_turns + num_turns_to_add
-
-    def __turn_distance_to(self, pos, game_map, cooldown, avoid_own_cities=False, include_target_road=False, debug=False):
-        if pos is None or not game_map.is_within_bounds(pos):
-            return INFINITE_DISTANCE
-        if pos == self:
-            return 0
-        elif (self - pos) > 10:
-            return (self - pos) * cooldown
-        else:
-            i = 0
-            if include_target_road:
-                step = max(1, cooldown - game_map.get_cell_by_pos(pos).road)
-            else:
-                step = 1
-            main_list = [(pos, step)]
-
-            tiles_not_blocked = {self, pos}
-            for p in [self, pos]:
-                cell = LogicGlobals.game_state.map.get_cell_by_pos(p)
-                if cell.citytile is not None:
-                    city_id = cell.citytile.cityid
-                    if city_id in LogicGlobals.player.cities:
-                        tiles_not_blocked = tiles_not_blocked | {c.pos for c in LogicGlobals.player.cities[city_id].citytiles}
-
-            while self not in set(x[0] for x in main_list):
-                # if debug:
-                #     print(main_list)
-                try:
-                    next_pos, step = main_list[i]
-                except IndexError:
-                    return INFINITE_DISTANCE
-                if step >= 10 * cooldown:
-                    break
-                for p in next_pos.adjacent_positions(include_center=False):
-                    if p == self:
-                        return step
-
-                    is_valid_to_move_to = p not in (LogicGlobals.opponent.city_pos - tiles_not_blocked)
-                    tiles_blocked_by_units = {u.pos for u in LogicGlobals.player.units if (LogicGlobals.game_state.map.get_cell_by_pos(u.pos).citytile is not None and (u.current_task is not None and u.current_task[0] != ValidActions.MOVE))}
-                    is_valid_to_move_to = is_valid_to_move_to and p not in (tiles_blocked_by_units - tiles_not_blocked)
-                    if avoid_own_cities:
-                        is_valid_to_move_to = is_valid_to_move_to and p not in (LogicGlobals.player.city_pos - tiles_not_blocked)
-
-                    if game_map.is_within_bounds(p) and is_valid_to_move_to and p not in set(x[0] for x in main_list):
-                        main_list.append((p, step + max(1, cooldown - game_map.get_cell_by_pos(p).road)))
-                main_list = sorted(main_list, key=lambda x: (x[1], LogicGlobals.x_mult * x[0].x, LogicGlobals.y_mult * x[0].y))
-                i += 1
-            for x in main_list:
-                if x[0] == self:
-                    return x[1]
-            return step
+        return DAY_NIGHT.travel_turns(LogicGlobals.game_state.turn, num_turns, cooldown)
 
     def pathing_distance_to(self, pos, game_map, avoid_own_cities=False, debug=False):
-        if pos is None or not game_map.is_within_bounds(pos):
-            return INFINITE_DISTANCE
-        if pos == self:
-            return 0
-        elif self - pos > 15:
-            return self - pos
-        else:
-            i = 0
-            step = 0
-            main_list = [(pos, step)]
-
-            tiles_not_blocked = {self, pos}
-            for p in [self, pos]:
-                cell = LogicGlobals.game_state.map.get_cell_by_pos(p)
-                if cell.citytile is not None:
-                    city_id = cell.citytile.cityid
-                    if city_id in LogicGlobals.player.cities:
-                        tiles_not_blocked = tiles_not_blocked | {c.pos for c in LogicGlobals.player.cities[city_id].citytiles}
-
-            while self not in set(x[0] for x in main_list):
-                # if debug:
-                #     print(main_list)
-                try:
-                    next_pos, step = main_list[i]
-                except IndexError:
-                    return 100000
-                if step >= 15:
-                    break
-                for p in next_pos.adjacent_positions(include_center=False):
-                    if p == self:
-                        return step + 1
-
-                    is_valid_to_move_to = p not in (LogicGlobals.opponent.city_pos - tiles_not_blocked)
-                    tiles_blocked_by_units = {u.pos for u in LogicGlobals.player.units if (LogicGlobals.game_state.map.get_cell_by_pos(u.pos).citytile is not None and (u.current_task is not None and u.current_task[0] != ValidActions.MOVE))}
-                    is_valid_to_move_to = is_valid_to_move_to and p not in (tiles_blocked_by_units - tiles_not_blocked)
-                    if avoid_own_cities:
-                        is_valid_to_move_to = is_valid_to_move_to and p not in (LogicGlobals.player.city_pos - tiles_not_blocked)
-
-                    if game_map.is_within_bounds(p) and is_valid_to_move_to and p not in set(x[0] for x in main_list):
-                        main_list.append((p, step + 1))
-                i += 1
-            for x in main_list:
-                if x[0] == self:
-                    return x[1] + 1
-            return step
+        return game_map.pathfinder.pathing_distance(self, pos, avoid_own_cities=avoid_own_cities)
 
     def tile_distance_to(self, pos, positions_to_avoid=None, debug=False):
-        if pos is None or not LogicGlobals.game_state.map.is_within_bounds(pos):
-            return INFINITE_DISTANCE
-        if pos == self:
-            return 0
-        elif self - pos > 10:
-            return self - pos
-        else:
-            i = 0
-            step = 0
-            main_list = [(pos, step)]
-
-            tiles_not_blocked = {self, pos}
-            for p in [self, pos]:
-                cell = LogicGlobals.game_state.map.get_cell_by_pos(p)
-                if cell and cell.citytile is not None:
-                    city_id = cell.citytile.cityid
-                    if city_id in LogicGlobals.player.cities:
-                        tiles_not_blocked = tiles_not_blocked | {c.pos for c in LogicGlobals.player.cities[city_id].citytiles}
-
-            while self not in set(x[0] for x in main_list):
-                # if debug:
-                #     print(main_list)
-                try:
-                    next_pos, step = main_list[i]
-                except IndexError:
-                    return 100000
-                if step >= 10:
-                    break
-                for p in next_pos.adjacent_positions(include_center=False):
-                    if p == self:
-                        return step + 1
-
-                    is_valid_to_move_to = not positions_to_avoid or p not in positions_to_avoid
-
-                    if LogicGlobals.game_state.map.is_within_bounds(p) and is_valid_to_move_to and p not in set(x[0] for x in main_list):
-                        main_list.append((p, step + 1))
-                i += 1
-            for x in main_list:
-                if x[0] == self:
-                    return x[1] + 1
-            return step
+        return LogicGlobals.game_state.map.pathfinder.tile_distance(self, pos, positions_to_avoid=positions_to_avoid)
 
     def radial_distance_to(self, pos):
         """
@@ -701,10 +943,10 @@ class Position:
         return (self - pos) <= 1
 
     def __eq__(self, pos) -> bool:
-        return self.x == pos.x and self.y == pos.y
+        return self is pos or (self.x == pos.x and self.y == pos.y)
 
     def __hash__(self):
-        return hash((self.x, self.y))
+        return self._hash
 
     def __str__(self) -> str:
         return f"({self.x}, {self.y})"
@@ -765,62 +1007,25 @@ class Position:
 
         """
 
-        if self._closest_city_pos is None or game_map.get_cell_by_pos(self._closest_city_pos).citytile is None:
-            if len(player.cities) > 0:
-                closest_dist = math.inf
-                for pos in player.city_pos:
-                    dist = pos.distance_to(self)
-                    if dist < closest_dist:
-                        closest_dist = dist
-                        self._closest_city_pos = pos
-            else:
-                return None
-        return self._closest_city_pos
+        if len(player.cities) > 0:
+            return game_map.nearest_features.closest(self, [game_map.nearest_features.city_tiles(player)])
+        return None
 
     def _find_closest_resource(self, resources_to_consider, game_map, tie_breaker_func=None):
-
-        for resource in resources_to_consider:
-            if not self._closest_resource_pos[resource] or any(not game_map.get_cell_by_pos(p).has_resource() for p in self._closest_resource_pos[resource]):
-                self._closest_resource_pos[resource] = []
-                closest_dist = math.inf
-                for resource_tile in game_map.resources():
-                    if resource_tile.resource.type != resource:
-                        continue
-                    dist = resource_tile.pos.distance_to(self)
-                    if dist <= closest_dist:
-                        closest_dist = dist
-                        self._closest_resource_pos[resource].append(resource_tile.pos)
-        # positions = list(filter(None, [self._closest_resource_pos[r] for r in resources_to_consider]))
-        positions = [p for r in resources_to_consider for p in self._closest_resource_pos[r]]
-        if positions:
-            if tie_breaker_func is None:
-                return min(positions, key=lambda p: (self.distance_to(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y))
-            else:
-                return min(positions, key=lambda p: (self.distance_to(p), tie_breaker_func(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y))
-        else:
-            return None
+        nearest_features = game_map.nearest_features
+        return nearest_features.closest(
+            self,
+            [nearest_features.resources(r_type) for r_type in resources_to_consider],
+            tie_breaker_func=tie_breaker_func
+        )
 
     def _find_closest_resource_for_collecting(self, resources_to_consider, game_map, tie_breaker_func=None):
-        closest_resource_pos = {}
-        for resource in resources_to_consider:
-            closest_resource_pos[resource] = []
-            closest_dist = math.inf
-            for resource_tile in game_map.resources():
-                if resource_tile.resource.type != resource or len(LogicGlobals.RESOURCES_BEING_COLLECTED.get(resource_tile.pos, set())) >= LogicGlobals.game_state.map.max_collectors_allowed_at(resource_tile.pos):
-                    continue
-                dist = resource_tile.pos.distance_to(self)
-                if dist <= closest_dist:
-                    closest_dist = dist
-                    closest_resource_pos[resource].append(resource_tile.pos)
-        # positions = list(filter(None, [self._closest_resource_pos[r] for r in resources_to_consider]))
-        positions = [p for r in resources_to_consider for p in closest_resource_pos[r]]
-        if positions:
-            if tie_breaker_func is None:
-                return min(positions, key=lambda p: (self.distance_to(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y))
-            else:
-                return min(positions, key=lambda p: (self.distance_to(p), tie_breaker_func(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y))
-        else:
-            return None
+        nearest_features = game_map.nearest_features
+        return nearest_features.closest(
+            self,
+            [nearest_features.collectable_resources(r_type) for r_type in resources_to_consider],
+            tie_breaker_func=tie_breaker_func
+        )
 
     def find_closest_wood(self, game_map, tie_breaker_func=None):
         """ Find the closest wood to this position.
@@ -938,13 +1143,25 @@ class Position:
                 game_map=game_map,
                 cooldown=cooldown,
                 avoid_own_cities=avoid_own_cities,
-                include_target_road=True
+                include_target_road=True,
+                field_root=target_pos
             ),
             secondary_dist_func=target_pos.distance_to,
             pos_to_check=pos_to_check,
             tolerance=tolerance
         )
 
+    def sort_directions_by_distance(self, target_pos, pos_to_check=None, tolerance=None):
+
+        if self.distance_to(target_pos) == 0:
+            return Directions.CENTER
+
+        return self._sort_directions(
+            dist_func=target_pos.distance_to,
+            pos_to_check=pos_to_check,
+            tolerance=tolerance
+        )
+
     def _default_positions_to_check(self):
         return {
             direction: self.translate(direction, 1)
@@ -994,8 +1211,157 @@ class Position:
             }
 
         dir_pos = list(pos_to_check.items())
-        if do_shuffle and getpass.getuser() != 'Paul':
+        if do_shuffle and not DETERMINISTIC:
             shuffle(dir_pos)
 
         dists = {d: target_pos.distance_to(p) for d, p in dir_pos}
         return min(dists, key=lambda x: (dists.get(x), x))
+
+
+_INTERNED_POSITIONS = [
+    Position._new(x, y) for y in range(MAX_MAP_SIZE) for x in range(MAX_MAP_SIZE)
+]
+_POSITION_TABLES = {}
+
+
+def position_table(width, height):
+    """ All positions of a `width` x `height` map, ordered by their `y * width + x` index. """
+    table = _POSITION_TABLES.get((width, height))
+    if table is None:
+        table = _POSITION_TABLES[(width, height)] = tuple(
+            Position(x, y) for y in range(height) for x in range(width)
+        )
+    return table
+
+
+CARDINAL_STEPS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+DIAGONAL_STEPS = ((1, -1), (-1, -1), (1, 1), (-1, 1))
+
+
+class NeighborTable:
+    """ Bounds-clipped neighbors of every position of a `width` x `height` map.
+
+    Neighbors are looked up by position index (see `GameMap.index_of`),
+    either as tuples of positions or, for vectorized code, as NumPy index
+    arrays padded with -1.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        positions = position_table(width, height)
+        self._neighbors = {}
+        for include_diagonals in (False, True):
+            steps = CARDINAL_STEPS + DIAGONAL_STEPS if include_diagonals else CARDINAL_STEPS
+            neighbors = tuple(
+                tuple(
+                    positions[(pos.y + dy) * width + pos.x + dx]
+                    for dx, dy in steps
+                    if 0 <= pos.x + dx < width and 0 <= pos.y + dy < height
+                )
+                for pos in positions
+            )
+            self._neighbors[(False, include_diagonals)] = neighbors
+            self._neighbors[(True, include_diagonals)] = tuple(
+                (pos,) + adjacent for pos, adjacent in zip(positions, neighbors)
+            )
+
+        self.cardinal_indices = self._index_array(self._neighbors[(False, False)], len(CARDINAL_STEPS))
+        self.all_indices = self._index_array(self._neighbors[(False, True)], len(CARDINAL_STEPS + DIAGONAL_STEPS))
+
+    def _index_array(self, neighbors, n_steps):
+        indices = np.full((len(neighbors), n_steps), -1, dtype=np.int32)
+        for index, adjacent in enumerate(neighbors):
+            indices[index, :len(adjacent)] = [p.y * self.width + p.x for p in adjacent]
+        return indices
+
+    def neighbors(self, index, include_center=True, include_diagonals=False):
+        """ Tuple of on-map positions adjacent to the position with index `index`. """
+        return self._neighbors[(include_center, include_diagonals)][index]
+
+    def table(self, include_center=True, include_diagonals=False):
+        """ Neighbor tuples of all positions, ordered by position index. """
+        return self._neighbors[(include_center, include_diagonals)]
+
+
+_NEIGHBOR_TABLES = {}
+
+
+def neighbor_table(width, height):
+    """ Shared :NeighborTable: for a `width` x `height` map. """
+    table = _NEIGHBOR_TABLES.get((width, height))
+    if table is None:
+        table = _NEIGHBOR_TABLES[(width, height)] = NeighborTable(width, height)
+    return table
+
+
+CONNECTIVITY_STEPS = {4: CARDINAL_STEPS, 8: CARDINAL_STEPS + DIAGONAL_STEPS}
+
+
+def label_components(codes, connectivity=8, background=NO_RESOURCE):
+    """ Label the connected groups of tiles that have the same value in `codes`.
+
+    Uses an iterative union-find over the tiles, so the size of a
+    group is not limited by the recursion depth.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        [y, x] grid of integer tile values.
+    connectivity : int, optional
+        4 (edge neighbors) or 8 (edge and diagonal neighbors).
+    background : int, optional
+        Value of the tiles that do not belong to any group.
+
+    Returns
+    -------
+    labels : np.ndarray
+        [y, x] grid of group labels, NO_CLUSTER for background tiles. Groups are
+        numbered in the order their first tile appears in when scanning
+        the map column by column, like `GameMap.cells` does.
+    components : list
+        Position indices (see `GameMap.index_of`) of the tiles of each
+        group, in scan order.
+
+    """
+    if connectivity not in CONNECTIVITY_STEPS:
+        raise ValueError(f"Connectivity must be one of {sorted(CONNECTIVITY_STEPS)}, got {connectivity}.")
+    height, width = codes.shape
+    table = neighbor_table(width, height)
+    neighbors = (table.all_indices if connectivity == 8 else table.cardinal_indices).tolist()
+    values = codes.ravel().tolist()
+    parent = list(range(width * height))
+
+    def find(index):
+        root = index
+        while parent[root] != root:
+            root = parent[root]
+        while parent[index] != root:
+            parent[index], index = root, parent[index]
+        return root
+
+    scan_order = [y * width + x for x in range(width) for y in range(height)]
+    for index in scan_order:
+        value = values[index]
+        if value == background:
+            continue
+        for neighbor in neighbors[index]:
+            if neighbor >= 0 and values[neighbor] == value:
+                root, neighbor_root = find(index), find(neighbor)
+                if root != neighbor_root:
+                    parent[neighbor_root] = root
+
+    labels = [NO_CLUSTER] * (width * height)
+    label_of_root = {}
+    components = []
+    for index in scan_order:
+        if values[index] == background:
+            continue
+        root = find(index)
+        label = label_of_root.get(root)
+        if label is None:
+            label = label_of_root[root] = len(components)
+            components.append([])
+        labels[index] = label
+        components[label].append(index)
+    return np.array(labels, dtype=np.int32).reshape(height, width), components
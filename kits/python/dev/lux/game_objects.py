@@ -2,6 +2,7 @@ from typing import Dict
 from itertools import chain
 from collections import deque
 from .constants import ValidActions, print, log, UNIT_TYPE_AS_STR, StrategyTypes, GAME_CONSTANTS, STRATEGY_HYPERPARAMETERS, UnitTypes, LogicGlobals, ResourceTypes
+from .daynight import DAY_NIGHT
 from .game_map import Position
 from .strategies import STRATEGY_FUNCTIONS
 
@@ -72,14 +73,9 @@ class City:
 
     @property
     def num_turns_can_survive(self):
-        num_turns = LogicGlobals.game_state.turns_until_next_night
-        num_night_turns = self.num_night_turns_can_survive
-
-        while num_night_turns > GAME_CONSTANTS["PARAMETERS"]["NIGHT_LENGTH"]:
-            num_turns += GAME_CONSTANTS["PARAMETERS"]["CYCLE_LENGTH"]
-            num_night_turns -= GAME_CONSTANTS["PARAMETERS"]["NIGHT_LENGTH"]
-        num_turns += num_night_turns
-        return num_turns
+        return DAY_NIGHT.turns_can_survive(
+            LogicGlobals.game_state.turns_until_next_night, self.num_night_turns_can_survive
+        )
 
     @property
     def can_survive_until_end_of_game(self):
@@ -160,20 +156,14 @@ class Cargo:
         return r, c[r]
 
 
-UNIT_CACHE = {}
-
-
 class Unit:
     def __init__(self, teamid, u_type, unitid, x, y, cooldown, wood, coal, uranium):
-        self.pos = Position(x, y)
         self.team = teamid
         self.id = unitid
         self.type = u_type
         self.type_str = UNIT_TYPE_AS_STR[u_type]
-        self.cooldown = cooldown
-        self.cargo = Cargo(wood, coal, uranium)
 
-        self.current_task = None
+        self._current_task = None
         self.task_q = deque()
         self.did_just_transfer = False
         self.turns_spent_waiting_to_move = 0
@@ -183,30 +173,16 @@ class Unit:
         self.current_strategy = StrategyTypes.STARTER
         self.previous_pos = deque(maxlen=2)
         self._collection_maximum_for_building = GAME_CONSTANTS["PARAMETERS"]["CITY_BUILD_COST"]
-        self.__dict__.update(UNIT_CACHE.get(self.id, {}))
+        self.observe(x, y, cooldown, wood, coal, uranium)
+
+    def observe(self, x, y, cooldown, wood, coal, uranium):
+        """ Update the fields that are sent with every observation. """
+        self.pos = Position(x, y)
+        self.cooldown = cooldown
+        self.cargo = Cargo(wood, coal, uranium)
         if self.pos not in self.previous_pos:
             self.previous_pos.append(self.pos)
 
-    def save_state(self):
-        UNIT_CACHE[self.id] = {
-            key: self.__dict__.get(key, None)
-            for key in [
-                'current_task',
-                'task_q',
-                'did_just_transfer',
-                'turns_spent_waiting_to_move',
-                'has_colonized',
-                'cluster_to_defend',
-                'cluster_to_defend_id',
-                'current_strategy',
-                'previous_pos',
-                '_collection_maximum_for_building'
-            ]
-        }
-
-    def __del__(self):
-        self.save_state()
-
     def __eq__(self, other) -> bool:
         return self.id == other.id
 
@@ -216,6 +192,22 @@ class Unit:
     def __repr__(self) -> str:
         return f"Unit({self.type_str} ({self.id}) at {self.pos} with cargo {self.cargo})"
 
+    @property
+    def current_task(self):
+        return self._current_task
+
+    @current_task.setter
+    def current_task(self, task):
+        """ Set the task, noting when the unit starts or stops being busy with something other than moving.
+
+        Busy units block own city tiles for pathing (see `OccupancyLayer`).
+        """
+        was_busy = self._current_task is not None and self._current_task[0] != ValidActions.MOVE
+        is_busy = task is not None and task[0] != ValidActions.MOVE
+        self._current_task = task
+        if was_busy != is_busy:
+            LogicGlobals.unit_task_version += 1
+
     def reset(self):
         self.current_task = None
         self.task_q = deque()
@@ -226,7 +218,6 @@ class Unit:
         self.cluster_to_defend_id = None
         self.previous_pos = deque(maxlen=2)
         self._collection_maximum_for_building = GAME_CONSTANTS["PARAMETERS"]["CITY_BUILD_COST"]
-        self.save_state()
 
     def is_worker(self) -> bool:
         return self.type == UnitTypes.WORKER
@@ -278,7 +269,6 @@ class Unit:
         # print(f"New task was set for unit {self.id} at {self.pos}: {action} with target {target}")
         # print(f"New task was set for unit {self.id} at {self.pos}: {self.current_task}")
         # log(f"New task was set for unit {self.id} at {self.pos}: {action} with target {target}")
-        self.save_state()
 
     @property
     def should_avoid_citytiles(self):
@@ -512,7 +502,6 @@ class Unit:
         # else:
         #     if self.pos != target_pos:
         #         return ValidActions.MOVE, target_pos
-        self.save_state()
         return self.current_task
 
     def remove_next_build_action(self):
@@ -660,20 +649,17 @@ class Unit:
         #     self.current_task = self.task_q.popleft()
         #     self.check_for_task_completion(game_map, player)
 
-        self.save_state()
 
     def push_task(self, task):
         if self.current_task is not None:
             self.task_q.appendleft(self.current_task)
         self.current_task = task
-        self.save_state()
 
     def load_next_task(self):
         if self.task_q:
             self.current_task = self.task_q.popleft()
         else:
             self.current_task = None
-        self.save_state()
 
     def cargo_space_left(self):
         """
@@ -744,6 +730,7 @@ class Unit:
             LogicGlobals.game_state.map,
             cooldown=GAME_CONSTANTS["PARAMETERS"]["UNIT_ACTION_COOLDOWN"][self.type_str],
             avoid_own_cities=self.should_avoid_citytiles,
+            field_root=target_pos,
         )
 
     def can_make_it_to_pos_without_dying(self, target_pos, mult=1.0):
@@ -751,13 +738,10 @@ class Unit:
             return True
         elif self.pos.distance_to(target_pos) <= 2 and LogicGlobals.game_state.map.get_cell_by_pos(target_pos).resource is not None:  # TODO: This could also rely on the amount of fuel left in the resource
             return True
-        num_turns_left = self.turn_distance_to(target_pos) - LogicGlobals.game_state.turns_until_next_night
-        num_night_turns = 0
-        while num_turns_left > GAME_CONSTANTS["PARAMETERS"]["NIGHT_LENGTH"]:
-            num_night_turns += GAME_CONSTANTS["PARAMETERS"]["NIGHT_LENGTH"]
-            num_turns_left -= GAME_CONSTANTS["PARAMETERS"]["DAY_LENGTH"]
-        num_night_turns += max(0, num_turns_left)
-        fuel_needed_to_survive = num_night_turns * GAME_CONSTANTS["PARAMETERS"]["LIGHT_UPKEEP"][self.type_str]
+        fuel_needed_to_survive = DAY_NIGHT.fuel_needed(
+            LogicGlobals.game_state.turns_until_next_night, self.turn_distance_to(target_pos),
+            GAME_CONSTANTS["PARAMETERS"]["LIGHT_UPKEEP"][self.type_str]
+        )
         return self.total_fuel >= mult * fuel_needed_to_survive
 
     def can_make_it_before_nightfall(self, target_pos, game_state, mult=1.0, tolerance=0):
@@ -801,3 +785,47 @@ class Unit:
         if logs is not None:
             logs.append((self.id, ValidActions.PILLAGE, self.pos))
         return "p {}".format(self.id)
+
+
+class UnitRegistry:
+    """ The units of both teams, kept alive from one turn to the next.
+
+    `observe` updates a known unit in place and only creates a Unit for
+    an id seen for the first time, so everything a unit remembers (its
+    tasks, the cluster it defends, its last positions) carries over
+    between turns without being copied. Units that were not observed
+    during a turn are dead and are dropped by `evict_missing`.
+    """
+
+    def __init__(self):
+        self._units = {}
+        self._observed = set()
+
+    def __contains__(self, unit_id):
+        return unit_id in self._units
+
+    def __len__(self):
+        return len(self._units)
+
+    def get(self, unit_id):
+        return self._units.get(unit_id)
+
+    def begin_turn(self):
+        self._observed = set()
+
+    def observe(self, teamid, u_type, unitid, x, y, cooldown, wood, coal, uranium):
+        unit = self._units.get(unitid)
+        if unit is None or unitid in self._observed:
+            # A unit handed out earlier this turn is never changed under the caller
+            unit = self._units[unitid] = Unit(teamid, u_type, unitid, x, y, cooldown, wood, coal, uranium)
+        else:
+            unit.observe(x, y, cooldown, wood, coal, uranium)
+        self._observed.add(unitid)
+        return unit
+
+    def evict_missing(self):
+        """ Drop the units that were not observed since `begin_turn` and return their ids. """
+        lost = self._units.keys() - self._observed
+        for unit_id in lost:
+            del self._units[unit_id]
+        return lost
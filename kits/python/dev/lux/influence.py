@@ -0,0 +1,64 @@
+import numpy as np
+
+from .constants import INFINITE_DISTANCE
+
+
+class InfluenceMaps:
+    """ Per-turn L1 distance grids from the units and city tiles of both players.
+
+    All grids are indexed [y, x] and hold the distance from each tile to
+    the closest source of their kind, or INFINITE_DISTANCE if there is
+    none:
+        - `player_units`, `player_cities`
+        - `opponent_units`, `opponent_cities`
+        - `opponent_presence`: closest opponent unit or city tile
+
+    `Game.update` calls `update` once the observation has been applied.
+    `for_players` gives maps from the point of view of other players.
+    """
+
+    LAYERS = ('player_units', 'player_cities', 'opponent_units', 'opponent_cities')
+
+    def __init__(self, game_map):
+        self.width = game_map.width
+        self.height = game_map.height
+        self.update(None, None)
+
+    def update(self, player, opponent):
+        self.player = player
+        self.opponent = opponent
+        sources = {
+            'player_units': [u.pos for u in player.units] if player is not None else [],
+            'player_cities': list(player.city_pos) if player is not None else [],
+            'opponent_units': [u.pos for u in opponent.units] if opponent is not None else [],
+            'opponent_cities': list(opponent.city_pos) if opponent is not None else [],
+        }
+
+        # All layers are computed in one pass over the stacked sources
+        positions = [p for layer in self.LAYERS for p in sources[layer]]
+        grids = {layer: np.full((self.height, self.width), INFINITE_DISTANCE, dtype=np.int64) for layer in self.LAYERS}
+        if positions:
+            xs = np.array([p.x for p in positions], dtype=np.int64)
+            ys = np.array([p.y for p in positions], dtype=np.int64)
+            grid_ys, grid_xs = np.mgrid[0:self.height, 0:self.width]
+            distances = np.abs(grid_xs.ravel()[None, :] - xs[:, None]) + np.abs(grid_ys.ravel()[None, :] - ys[:, None])
+            layers = [layer for layer in self.LAYERS if sources[layer]]
+            starts = np.cumsum([0] + [len(sources[layer]) for layer in layers[:-1]])
+            for layer, layer_min in zip(layers, np.minimum.reduceat(distances, starts, axis=0)):
+                grids[layer] = layer_min.reshape(self.height, self.width)
+
+        for layer, grid in grids.items():
+            setattr(self, layer, grid)
+        self.opponent_presence = np.minimum(self.opponent_units, self.opponent_cities)
+
+    def for_players(self, player, opponent):
+        """ These maps if they were built for `player` and `opponent`, otherwise new maps built for them. """
+        if player is self.player and opponent is self.opponent:
+            return self
+        influence = InfluenceMaps(self)
+        influence.update(player, opponent)
+        return influence
+
+    def at(self, layer, pos):
+        """ Value of the grid `layer` at the on-map position `pos`. """
+        return getattr(self, layer).item(pos.y, pos.x)
@@ -0,0 +1,88 @@
+import os
+import sys
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+
+INSTRUMENTATION_ENV_VAR = "LUX_INSTRUMENTATION"
+
+
+class Instrumentation:
+    """ Per-turn timing of the phases of `agent`, written as one JSON line per turn.
+
+    Enabled by setting the LUX_INSTRUMENTATION environment variable to
+    "stderr" or to the path of a file to append to. When disabled,
+    `phase` hands out a shared no-op context and nothing is recorded.
+
+    Each record holds the turn, the total time spent, the wall time and
+    call count of every phase, and the counters passed to `end_turn`
+    (e.g. `PathFinder.stats`). See `summarize_instrumentation.py` for
+    aggregating the records of a match.
+    """
+
+    def __init__(self, destination=None):
+        self.destination = destination
+        self.enabled = bool(destination)
+        self._null_phase = nullcontext()
+        self._turn_start = None
+        self.times = Counter()
+        self.calls = Counter()
+
+    @classmethod
+    def from_environment(cls):
+        return cls(os.environ.get(INSTRUMENTATION_ENV_VAR))
+
+    def begin_turn(self):
+        if not self.enabled:
+            return
+        self._turn_start = perf_counter()
+        self.times = Counter()
+        self.calls = Counter()
+
+    def phase(self, name):
+        """ Context manager that adds the time spent inside it to the phase `name`. """
+        if not self.enabled:
+            return self._null_phase
+        return self._timed_phase(name)
+
+    @contextmanager
+    def _timed_phase(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] += perf_counter() - start
+            self.calls[name] += 1
+
+    def record_since_turn_start(self, name):
+        """ Record the time since `begin_turn` as the phase `name`. """
+        if not self.enabled:
+            return
+        self.times[name] += perf_counter() - self._turn_start
+        self.calls[name] += 1
+
+    def end_turn(self, turn, player_id=None, **counters):
+        """ Write the record of this turn. """
+        if not self.enabled:
+            return
+        import json
+
+        record = {
+            "turn": turn,
+            "player": player_id,
+            "total": perf_counter() - self._turn_start,
+            "phases": {name: {"time": self.times[name], "calls": self.calls[name]} for name in self.times},
+            "counters": {name: dict(counter) for name, counter in counters.items()},
+        }
+        self._write(json.dumps(record, sort_keys=True))
+
+    def _write(self, line):
+        if self.destination == "stderr":
+            print(line, file=sys.__stderr__)
+        else:
+            with open(self.destination, "a") as f:
+                f.write(line + "\n")
+
+
+INSTRUMENTATION = Instrumentation.from_environment()
@@ -0,0 +1,59 @@
+import os
+
+
+LEVELS = {
+    "DEBUG": 10,
+    "INFO": 20,
+    "WARNING": 30,
+    "OFF": 100,
+}
+
+LOG_LEVEL_ENV_VAR = "LUX_LOG_LEVEL"
+
+
+def _no_op(*args, **kwargs):
+    pass
+
+
+class Logger:
+    """ Leveled logger with deferred message formatting.
+
+    Messages are %-style format strings; they are only formatted (and
+    written) when their level is enabled. Methods of disabled levels
+    are rebound to a no-op function by `set_level`, so a disabled call
+    costs no more than an empty function call. For messages that are
+    expensive to build, check `is_enabled_for` first.
+
+    Calling the logger directly logs at DEBUG level.
+    """
+
+    def __init__(self, stream, level="DEBUG"):
+        self.stream = stream
+        self.set_level(level)
+
+    def set_level(self, level):
+        self.level = LEVELS[level] if isinstance(level, str) else level
+        for name, method in (("debug", self._debug), ("info", self._info), ("warning", self._warning)):
+            setattr(self, name, method if self.is_enabled_for(name.upper()) else _no_op)
+
+    def is_enabled_for(self, level):
+        return LEVELS[level] >= self.level
+
+    def __call__(self, msg, *args):
+        self.debug(msg, *args)
+
+    def _write(self, msg, args):
+        print(msg % args if args else msg, file=self.stream)
+
+    def _debug(self, msg, *args):
+        self._write(msg, args)
+
+    def _info(self, msg, *args):
+        self._write(msg, args)
+
+    def _warning(self, msg, *args):
+        self._write(msg, args)
+
+
+def level_from_environment(default):
+    return os.environ.get(LOG_LEVEL_ENV_VAR, default).upper()
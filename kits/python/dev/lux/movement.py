@@ -0,0 +1,136 @@
+from .budget import BudgetSteps, time_allows
+from .constants import DETERMINISTIC
+
+
+class MovementResolver:
+    """ Resolves the moves of units that want to move this turn, so that no two units collide.
+
+    Every unit claims the first tile left in its `dirs_to_move`. Claims
+    on own city tiles are always granted. Otherwise, one claimant per
+    tile is moved (see `_winner`) and the tile is blocked for the rest of
+    the turn. Losers claim their next direction in the following round.
+    Rounds repeat while some tile has more than two claimants, and the
+    turn budget allows; a final round then settles the remaining claims.
+
+    Claims are indexed by tile, by unit and by the tile the claimant is
+    standing on, so each round is linear in the number of claims.
+    """
+
+    def __init__(self, player, blocked_positions, actions, debug_info):
+        self.player = player
+        self.blocked_positions = blocked_positions
+        self.actions = actions
+        self.debug_info = debug_info
+        self.claims = {}
+        self._claimed_by = {}
+        self._claimant_origins = {}
+        self._crowded = set()
+        self._break_ties_by_id = DETERMINISTIC
+
+    def resolve(self, units_wanting_to_move):
+        """ Append the move actions of `units_wanting_to_move` to `actions`.
+
+        Returns
+        -------
+        actions, debug_info
+        """
+        while any(unit.dirs_to_move for unit in units_wanting_to_move) and (not self.claims or self._crowded):
+            if self.claims and not time_allows(BudgetSteps.MOVEMENT_ROUNDS):
+                break
+            units_with_movement_resolved = set()
+            self._claim_all(units_wanting_to_move, units_with_movement_resolved)
+
+            pos_to_discard = []
+            for pos, units in sorted(self.claims.items(), key=lambda tup: (-len(tup[1]), tup[0].x, tup[0].y)):
+                if pos in self.blocked_positions:
+                    pos_to_discard.append(pos)
+                    continue
+                if pos in self.player.city_pos:
+                    for unit, direction in units:
+                        self._move(unit, direction, units_with_movement_resolved)
+                    pos_to_discard.append(pos)
+                elif len(units) > 1:
+                    unit, direction = self._winner(pos, units)
+                    self._move(unit, direction, units_with_movement_resolved)
+                    self.blocked_positions.add(pos)
+                    pos_to_discard.append(pos)
+
+            for pos in pos_to_discard:
+                self._release(pos)
+
+            units_wanting_to_move = units_wanting_to_move - units_with_movement_resolved
+
+        units_with_movement_resolved = set()
+        self._claim_all(units_wanting_to_move, units_with_movement_resolved)
+
+        for pos, units in self.claims.items():
+            if pos in self.blocked_positions:
+                continue
+            if pos in self.player.city_pos:
+                for unit, direction in units:
+                    self._move(unit, direction, units_with_movement_resolved)
+            else:
+                unit, direction = self._winner(pos, units)
+                self._move(unit, direction, units_with_movement_resolved)
+                self.blocked_positions.add(pos)
+
+        units_wanting_to_move = units_wanting_to_move - units_with_movement_resolved
+
+        for unit in units_wanting_to_move:
+            unit.turns_spent_waiting_to_move += 1
+
+        return self.actions, self.debug_info
+
+    def _claim_all(self, units, units_with_movement_resolved):
+        """ Have every unit without a claim claim its next direction. Units with no directions left stay put. """
+        for unit in units:
+            if unit.id in self._claimed_by:
+                continue
+            if not unit.dirs_to_move:
+                units_with_movement_resolved.add(unit)
+                unit.turns_spent_waiting_to_move += 1
+                if unit.pos not in self.player.city_pos:
+                    self.blocked_positions.add(unit.pos)
+                continue
+            direction, new_pos = unit.dirs_to_move.popleft()
+            claimants = self.claims.setdefault(new_pos, [])
+            claimants.append((unit, direction))
+            self._claimed_by[unit.id] = new_pos
+            self._claimant_origins.setdefault(new_pos, set()).add(unit.pos)
+            if len(claimants) > 2:
+                self._crowded.add(new_pos)
+
+    def _release(self, pos):
+        """ Drop all claims on `pos`. """
+        for unit, __ in self.claims.pop(pos):
+            del self._claimed_by[unit.id]
+        del self._claimant_origins[pos]
+        self._crowded.discard(pos)
+
+    def _wants_to_swap(self, unit, pos):
+        """ Whether a unit standing on `pos` has claimed the tile `unit` is standing on. """
+        return pos in self._claimant_origins.get(unit.pos, ())
+
+    def _winner(self, pos, claimants):
+        """ Claimant of `pos` that gets to move there.
+
+        Priority goes to units swapping places with a claimant of their
+        own tile, then to units only passing through `pos` on the way
+        to their `move_target`, then to units that have waited longer,
+        then to units that are building.
+        """
+        return max(
+            claimants,
+            key=lambda pair: (
+                self._wants_to_swap(pair[0], pos),
+                not pos == pair[0].move_target,
+                pair[0].turns_spent_waiting_to_move,
+                pair[0].is_building(),
+                pair[0].id if self._break_ties_by_id else 0
+            )
+        )
+
+    def _move(self, unit, direction, units_with_movement_resolved):
+        unit.turns_spent_waiting_to_move = 0
+        self.actions.append(unit.move(direction, logs=self.debug_info))
+        units_with_movement_resolved.add(unit)
@@ -0,0 +1,172 @@
+from collections import Counter
+
+import numpy as np
+
+from .constants import LogicGlobals
+
+
+class NearestFeatures:
+    """ Nearest tiles of one feature (e.g. wood, or own city tiles) for every tile of the map.
+
+    Distances are L1 (see `Position.distance_to`). Sources are kept in
+    rank order; when several sources are equally close, the one with
+    the lowest rank wins.
+
+    Attributes
+    ----------
+    xs, ys : np.ndarray
+        Source coordinates, in rank order.
+    distance : np.ndarray
+        [y, x] grid of the distance to the closest source.
+    closest : np.ndarray
+        [y, x] grid of the rank of the closest source.
+    """
+
+    def __init__(self, positions, width, height):
+        self.positions = positions
+        self.xs = np.array([p.x for p in positions], dtype=np.int32)
+        self.ys = np.array([p.y for p in positions], dtype=np.int32)
+        self.width, self.height = width, height
+        if positions:
+            grid_ys, grid_xs = np.mgrid[0:height, 0:width]
+            distances = (
+                np.abs(grid_xs.ravel()[None, :] - self.xs[:, None])
+                + np.abs(grid_ys.ravel()[None, :] - self.ys[:, None])
+            )
+            self.distance = distances.min(axis=0).reshape(height, width)
+            self.closest = distances.argmin(axis=0).reshape(height, width)
+        else:
+            self.distance = self.closest = None
+
+    def __bool__(self):
+        return bool(self.positions)
+
+    def _on_grid(self, pos):
+        return type(pos.x) is int and type(pos.y) is int and 0 <= pos.x < self.width and 0 <= pos.y < self.height
+
+    def nearest(self, pos):
+        """ Distance to the lowest ranked closest source, and that source. """
+        if self._on_grid(pos):
+            return self.distance.item(pos.y, pos.x), self.positions[self.closest.item(pos.y, pos.x)]
+        distances = np.abs(self.xs - pos.x) + np.abs(self.ys - pos.y)
+        rank = int(distances.argmin())
+        return distances[rank].item(), self.positions[rank]
+
+    def all_nearest(self, pos):
+        """ Distance to the closest sources, and all sources at that distance, in rank order. """
+        distances = np.abs(self.xs - pos.x) + np.abs(self.ys - pos.y)
+        min_distance = distances.min()
+        return min_distance.item(), [self.positions[rank] for rank in np.flatnonzero(distances == min_distance).tolist()]
+
+
+class NearestFeatureIndex:
+    """ Per-turn index of the closest resource and city tiles to any position.
+
+    Feature grids are built lazily, on the first query of the turn
+    that needs them, and dropped by `begin_turn`. Queries break ties
+    the same way the linear scans they replace did. `stats` counts the
+    grid cache hits and misses of the current turn.
+    """
+
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.begin_turn()
+
+    def begin_turn(self):
+        self._features = {}
+        self._max_collectors = None
+        self.stats = Counter()
+
+    def __getstate__(self):
+        # Snapshots leave out the per-turn feature grids; they are rebuilt on demand
+        state = self.__dict__.copy()
+        for name in ('_features', '_max_collectors', 'stats'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.begin_turn()
+
+    def _get(self, key, make_positions):
+        features = self._features.get(key)
+        if features is None:
+            self.stats['misses'] += 1
+            features = self._features[key] = NearestFeatures(
+                make_positions(), self.game_map.width, self.game_map.height
+            )
+        else:
+            self.stats['hits'] += 1
+        return features
+
+    def max_collectors(self):
+        """ [y, x] grid of `GameMap.max_collectors_allowed_at`. """
+        if self._max_collectors is None:
+            game_map = self.game_map
+            num_neighbors = (game_map.neighbor_table.cardinal_indices >= 0).sum(axis=1)
+            self._max_collectors = np.where(
+                game_map.city_tile_team == -1, num_neighbors.reshape(game_map.height, game_map.width), 0
+            )
+        return self._max_collectors
+
+    def _full_tiles(self):
+        """ Tiles that are already being collected from by as many units as allowed. """
+        max_collectors = self.max_collectors()
+        return frozenset(
+            pos for pos, unit_ids in LogicGlobals.RESOURCES_BEING_COLLECTED.items()
+            if self.game_map.is_within_bounds(pos) and len(unit_ids) >= max_collectors.item(pos.y, pos.x)
+        )
+
+    def resources(self, r_type, exclude=frozenset()):
+        """ Nearest-tile index of resources of type `r_type`, minus the tiles in `exclude`.
+
+        Ties are broken by (x_mult * x, y_mult * y).
+        """
+        game_map = self.game_map
+        x_mult, y_mult = LogicGlobals.x_mult, LogicGlobals.y_mult
+        mask = game_map.resource_mask(r_type)
+        exclude = frozenset(pos for pos in exclude if mask.item(pos.y, pos.x))
+
+        def make_positions():
+            ys, xs = np.nonzero(mask)
+            positions = [game_map.positions_by_index[y * game_map.width + x] for x, y in zip(xs.tolist(), ys.tolist())]
+            return sorted(
+                (p for p in positions if p not in exclude), key=lambda p: (x_mult * p.x, y_mult * p.y)
+            )
+
+        return self._get(('resource', r_type, exclude, x_mult, y_mult), make_positions)
+
+    def collectable_resources(self, r_type):
+        """ Like `resources`, but without tiles that are at max collection capacity. """
+        return self.resources(r_type, exclude=self._full_tiles())
+
+    def city_tiles(self, player):
+        """ Nearest-tile index of the city tiles of `player`. Ties go to the first tile in `player.city_pos`. """
+        return self._get(('city', player.team), lambda: list(player.city_pos))
+
+    def closest(self, pos, features_by_type, tie_breaker_func=None):
+        """ Closest source to `pos` over several feature indices.
+
+        Ties are broken by `tie_breaker_func` (if given), then by
+        (x_mult * x, y_mult * y).
+        """
+        candidates = []
+        min_distance = None
+        for features in features_by_type:
+            if not features:
+                continue
+            if tie_breaker_func is None:
+                distance, positions = features.nearest(pos)
+                positions = [positions]
+            else:
+                distance, positions = features.all_nearest(pos)
+            if min_distance is None or distance < min_distance:
+                min_distance, candidates = distance, positions
+            elif distance == min_distance:
+                candidates.extend(positions)
+
+        if not candidates:
+            return None
+        if tie_breaker_func is None:
+            return min(candidates, key=lambda p: (LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y))
+        return min(candidates, key=lambda p: (tie_breaker_func(p), LogicGlobals.x_mult * p.x, LogicGlobals.y_mult * p.y))
@@ -0,0 +1,433 @@
+from collections import deque, Counter
+from heapq import heappush, heappop
+
+import numpy as np
+
+from .constants import LogicGlobals, ValidActions, INFINITE_DISTANCE
+
+
+TURN_DISTANCE_SEARCH_RADIUS = 10
+PATHING_DISTANCE_SEARCH_RADIUS = 15
+TILE_DISTANCE_SEARCH_RADIUS = 10
+UNREACHABLE_DISTANCE = 100000
+
+
+class OccupancyLayer:
+    """ Per-turn passability grids of a :GameMap:, shared by all distance queries.
+
+    All grids are indexed [y, x]:
+        - `opponent_cities`: opponent city tiles
+        - `own_cities`: own city tiles
+        - `busy_units`: own city tiles with a unit that is busy with
+          something other than moving
+        - `road`: road levels (the map's own array)
+
+    City grids are rebuilt by `update`, which `Game.update` calls once
+    the observation has been applied. `busy_units` depends on unit tasks,
+    which change during the turn; it is only rebuilt when a unit starts
+    or stops being busy (see `LogicGlobals.unit_task_version`).
+    """
+
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.width = game_map.width
+        self.road = game_map.road
+        self.update(None, None)
+
+    def update(self, player, opponent):
+        shape = (self.game_map.height, self.width)
+        self.opponent_cities = np.zeros(shape, dtype=bool)
+        self.own_cities = np.zeros(shape, dtype=bool)
+        if opponent is not None:
+            for pos in opponent.city_pos:
+                self.opponent_cities[pos.y, pos.x] = True
+        if player is not None:
+            for pos in player.city_pos:
+                self.own_cities[pos.y, pos.x] = True
+        self.opponent_city_mask = self.opponent_cities.tobytes()
+        self.city_mask = (self.opponent_cities | self.own_cities).tobytes()
+        self._busy_unit_indices = frozenset()
+        self._unit_task_version = None
+
+    def city_blocking_mask(self, avoid_own_cities=False):
+        """ Flat mask of the city tiles blocking a unit, as bytes. """
+        return self.city_mask if avoid_own_cities else self.opponent_city_mask
+
+    def busy_unit_indices(self):
+        """ Flat indices of the own city tiles occupied by busy units. """
+        if self._unit_task_version != LogicGlobals.unit_task_version:
+            self._unit_task_version = LogicGlobals.unit_task_version
+            indices = []
+            if LogicGlobals.player is not None:
+                for unit in LogicGlobals.player.units:
+                    task = unit.current_task
+                    if task is not None and task[0] != ValidActions.MOVE and self.own_cities[unit.pos.y, unit.pos.x]:
+                        indices.append(unit.pos.y * self.width + unit.pos.x)
+            self._busy_unit_indices = frozenset(indices)
+        return self._busy_unit_indices
+
+    @property
+    def busy_units(self):
+        grid = np.zeros(self.own_cities.shape, dtype=bool)
+        grid.ravel()[list(self.busy_unit_indices())] = True
+        return grid
+
+
+class PathFinder:
+    """ Shortest-path searches over the tiles of a :GameMap:.
+
+    Searches run on position indices (see `GameMap.index_of`) with
+    flat visited/blocked arrays. `turn_distance` uses a binary heap
+    frontier ordered by (cost, x_mult * x, y_mult * y), which is the
+    same order the old sorted-list frontier expanded tiles in. Tiles
+    are blocked according to the map's :OccupancyLayer:; step costs
+    are built once per turn. Call `begin_turn` when the observation
+    changes.
+
+    `stats` counts the queries and cache hits of the current turn.
+    """
+
+    def __init__(self, game_map, occupancy):
+        self.game_map = game_map
+        self.occupancy = occupancy
+        self.width = game_map.width
+        self.size = game_map.width * game_map.height
+        self._xs = [p.x for p in game_map.positions_by_index]
+        self._ys = [p.y for p in game_map.positions_by_index]
+        self._neighbors = [
+            tuple(index for index in row if index >= 0)
+            for row in game_map.neighbor_table.cardinal_indices.tolist()
+        ]
+        self.begin_turn()
+
+    def begin_turn(self):
+        self._step_costs = {}
+        self._distance_fields = {}
+        self.stats = Counter()
+
+    def __getstate__(self):
+        # Snapshots leave out the per-turn caches; they are rebuilt on demand
+        state = self.__dict__.copy()
+        for name in ('_step_costs', '_distance_fields', 'stats'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.begin_turn()
+
+    def _index(self, pos):
+        return pos.y * self.width + pos.x
+
+    def step_costs(self, cooldown):
+        """ Turns needed to move onto each tile, given the unit `cooldown` and the road levels. """
+        costs = self._step_costs.get(cooldown)
+        if costs is None:
+            costs = self._step_costs[cooldown] = [
+                max(1, cooldown - road) for road in self.occupancy.road.ravel().tolist()
+            ]
+        return costs
+
+    def _own_city_indices(self, pos):
+        """ Indices of the tiles of the own city that `pos` is part of (empty if it is not an own city tile). """
+        city_tile = self.game_map.city_tiles[self._index(pos)]
+        if city_tile is None or city_tile.cityid not in LogicGlobals.player.cities:
+            return ()
+        return tuple(self._index(c.pos) for c in LogicGlobals.player.cities[city_tile.cityid].citytiles)
+
+    def _unblocked_indices(self, *positions):
+        """ Indices of the end points and of every tile of the own cities they are part of. """
+        indices = []
+        for pos in positions:
+            if not self.game_map.is_within_bounds(pos):
+                continue
+            indices.append(self._index(pos))
+            indices.extend(self._own_city_indices(pos))
+        return indices
+
+    def blocked_mask(self, origin, target, avoid_own_cities=False):
+        """ Tiles that a unit moving between `origin` and `target` may not path through.
+
+        These are opponent city tiles, own city tiles occupied by units
+        that are busy with something other than moving and, if
+        `avoid_own_cities` is set, own city tiles. Tiles of the cities
+        that `origin` or `target` are part of are never blocked.
+        """
+        return self._blocked_mask(self.occupancy.busy_unit_indices(), (origin, target), avoid_own_cities)
+
+    def _blocked_mask(self, unit_blocked_indices, end_points, avoid_own_cities):
+        blocked = bytearray(self.occupancy.city_blocking_mask(avoid_own_cities))
+        for index in unit_blocked_indices:
+            blocked[index] = 1
+        for index in self._unblocked_indices(*end_points):
+            blocked[index] = 0
+        return blocked
+
+    def distance_field(self, root, cooldown, avoid_own_cities=False, origin=None):
+        """ Path costs from `root` to every tile, cached for the rest of the turn.
+
+        The value of a tile is the summed step cost of the tiles on the
+        cheapest path from `root` (excluded) to it (included), or None
+        if the tile was not reached. Only costs below the search cap
+        of `turn_distance` are exact; the search stops there (see
+        `distance_field_cap`).
+
+        Tiles are blocked as in `blocked_mask(origin, root)`. Without
+        `origin`, only the city of `root` is unblocked.
+        """
+        unit_blocked_indices = self.occupancy.busy_unit_indices()
+        origin_city_indices = self._own_city_indices(origin) if origin is not None else ()
+        key = (root, cooldown, avoid_own_cities, unit_blocked_indices, origin_city_indices)
+        field = self._distance_fields.get(key)
+        if field is None:
+            self.stats['distance_field_misses'] += 1
+            field = self._distance_fields[key] = self._compute_distance_field(
+                root, cooldown, avoid_own_cities, unit_blocked_indices, origin_city_indices
+            )
+        else:
+            self.stats['distance_field_hits'] += 1
+        return field
+
+    @staticmethod
+    def distance_field_cap(cooldown):
+        """ Every tile of a distance field below this cost is exact; the others cost at least this much. """
+        return TURN_DISTANCE_SEARCH_RADIUS * cooldown - 1
+
+    def _compute_distance_field(self, root, cooldown, avoid_own_cities, unit_blocked_indices, origin_city_indices=()):
+        costs = self.step_costs(cooldown)
+        blocked = self._blocked_mask(unit_blocked_indices, (root,), avoid_own_cities)
+        for index in origin_city_indices:
+            blocked[index] = 0
+        neighbors = self._neighbors
+        max_cost = self.distance_field_cap(cooldown)
+
+        start = self._index(root)
+        field = [None] * self.size
+        field[start] = 0
+        frontier = [(0, start)]
+        while frontier:
+            cost, index = heappop(frontier)
+            if cost > field[index]:
+                continue
+            if cost >= max_cost:
+                break
+            for neighbor in neighbors[index]:
+                if blocked[neighbor]:
+                    continue
+                new_cost = cost + costs[neighbor]
+                old_cost = field[neighbor]
+                if old_cost is None or new_cost < old_cost:
+                    field[neighbor] = new_cost
+                    heappush(frontier, (new_cost, neighbor))
+        return field
+
+    def turn_distance(self, origin, target, cooldown, avoid_own_cities=False, include_target_road=False, field_root=None):
+        """ Number of turns needed to move from `origin` to `target`, ignoring night time.
+
+        Searches outward from `target` and stops at the first expanded
+        tile next to `origin`. Searches are capped at a cost of
+        10 * `cooldown`; the cost reached at that point is returned.
+
+        If `field_root` (either `origin` or `target`) is given, the
+        result is read from the cached `distance_field` of that
+        position instead, falling back to a search whenever the field
+        cannot reproduce the capped search result exactly.
+        """
+        game_map = self.game_map
+        self.stats['turn_distance_calls'] += 1
+        if target is None or not game_map.is_within_bounds(target):
+            return INFINITE_DISTANCE
+        if target == origin:
+            return 0
+        distance = origin - target
+        if distance > TURN_DISTANCE_SEARCH_RADIUS:
+            return distance * cooldown
+
+        if field_root is not None and game_map.is_within_bounds(field_root):
+            num_turns = self._turn_distance_from_field(
+                origin, target, cooldown, avoid_own_cities, include_target_road, field_root
+            )
+            if num_turns is not None:
+                self.stats['turn_distance_from_field'] += 1
+                return num_turns
+
+        self.stats['turn_distance_searches'] += 1
+        return self._search_turn_distance(origin, target, cooldown, avoid_own_cities, include_target_road)
+
+    def _turn_distance_from_field(self, origin, target, cooldown, avoid_own_cities, include_target_road, field_root):
+        """ `turn_distance` computed from a distance field, or None if it has to be searched for.
+
+        The search cost is the start step cost plus the cost of the
+        tiles strictly between the end points, which is symmetric in
+        the end points and can be read off the field of either one.
+        """
+        city_tiles = self.game_map.city_tiles
+        other = target if field_root == origin else origin
+        root_index = self._index(field_root)
+        other_index = self._index(other)
+
+        # Tiles of the city `other` is part of would not be blocked for this query
+        other_city_tile = city_tiles[other_index]
+        if other_city_tile is not None and other_city_tile.cityid in LogicGlobals.player.cities:
+            root_city_tile = city_tiles[root_index]
+            if root_city_tile is None or root_city_tile.cityid != other_city_tile.cityid:
+                return None
+
+        if include_target_road:
+            step = self.step_costs(cooldown)[self._index(target)]
+        else:
+            step = 1
+
+        if field_root - other > 1:
+            field = self.distance_field(field_root, cooldown, avoid_own_cities=avoid_own_cities)
+            costs = [field[index] for index in self._neighbors[other_index] if field[index] is not None]
+            if not costs:
+                return None
+            step += min(costs)
+
+        if step >= TURN_DISTANCE_SEARCH_RADIUS * cooldown:
+            return None
+        return step
+
+    def _search_turn_distance(self, origin, target, cooldown, avoid_own_cities, include_target_road):
+        costs = self.step_costs(cooldown)
+        blocked = self.blocked_mask(origin, target, avoid_own_cities=avoid_own_cities)
+        xs, ys, neighbors = self._xs, self._ys, self._neighbors
+        x_mult, y_mult = LogicGlobals.x_mult, LogicGlobals.y_mult
+        origin_x, origin_y = origin.x, origin.y
+        max_cost = TURN_DISTANCE_SEARCH_RADIUS * cooldown
+
+        start = self._index(target)
+        step = costs[start] if include_target_road else 1
+        discovered = bytearray(self.size)
+        discovered[start] = 1
+        frontier = [(step, x_mult * xs[start], y_mult * ys[start], start)]
+        while frontier:
+            step, __, __, index = heappop(frontier)
+            if step >= max_cost:
+                return step
+            if abs(xs[index] - origin_x) + abs(ys[index] - origin_y) == 1:
+                return step
+            for neighbor in neighbors[index]:
+                if not discovered[neighbor] and not blocked[neighbor]:
+                    discovered[neighbor] = 1
+                    heappush(frontier, (step + costs[neighbor], x_mult * xs[neighbor], y_mult * ys[neighbor], neighbor))
+        return INFINITE_DISTANCE
+
+    def _breadth_first_distance(self, origin, target, blocked, max_steps):
+        xs, ys, neighbors = self._xs, self._ys, self._neighbors
+        origin_x, origin_y = origin.x, origin.y
+
+        start = self._index(target)
+        discovered = bytearray(self.size)
+        discovered[start] = 1
+        frontier = deque([(start, 0)])
+        while frontier:
+            index, step = frontier.popleft()
+            if step >= max_steps:
+                return step
+            if abs(xs[index] - origin_x) + abs(ys[index] - origin_y) == 1:
+                return step + 1
+            for neighbor in neighbors[index]:
+                if not discovered[neighbor] and not blocked[neighbor]:
+                    discovered[neighbor] = 1
+                    frontier.append((neighbor, step + 1))
+        return UNREACHABLE_DISTANCE
+
+    def pathing_distance(self, origin, target, avoid_own_cities=False):
+        """ Number of tiles a unit has to move through to get from `origin` to `target`. """
+        if target is None or not self.game_map.is_within_bounds(target):
+            return INFINITE_DISTANCE
+        if target == origin:
+            return 0
+        distance = origin - target
+        if distance > PATHING_DISTANCE_SEARCH_RADIUS:
+            return distance
+
+        self.stats['pathing_distance_searches'] += 1
+        blocked = self.blocked_mask(origin, target, avoid_own_cities=avoid_own_cities)
+        return self._breadth_first_distance(origin, target, blocked, PATHING_DISTANCE_SEARCH_RADIUS)
+
+    def tile_distance(self, origin, target, positions_to_avoid=None):
+        """ Number of tiles between `origin` and `target`, going around `positions_to_avoid`. """
+        game_map = self.game_map
+        if target is None or not game_map.is_within_bounds(target):
+            return INFINITE_DISTANCE
+        if target == origin:
+            return 0
+        distance = origin - target
+        if distance > TILE_DISTANCE_SEARCH_RADIUS:
+            return distance
+
+        blocked = bytearray(self.size)
+        if positions_to_avoid:
+            for pos in positions_to_avoid:
+                if game_map.is_within_bounds(pos):
+                    blocked[self._index(pos)] = 1
+        self.stats['tile_distance_searches'] += 1
+        return self._breadth_first_distance(origin, target, blocked, TILE_DISTANCE_SEARCH_RADIUS)
+
+
+class TileDistanceField:
+    """ `PathFinder.tile_distance` from a fixed `origin` around fixed `positions_to_avoid`, to any target.
+
+    A single breadth first search out of the tiles next to `origin`
+    answers all targets whose search would have ended well inside the
+    search radius; other targets fall back to `PathFinder.tile_distance`.
+    The field does not depend on the observation, so it can be kept
+    for as long as `origin` and `positions_to_avoid` stay the same.
+    """
+
+    def __init__(self, pathfinder, origin, positions_to_avoid):
+        self.pathfinder = pathfinder
+        self.origin = origin
+        self.positions_to_avoid = positions_to_avoid
+        game_map = pathfinder.game_map
+        neighbors = pathfinder._neighbors
+        max_level = TILE_DISTANCE_SEARCH_RADIUS - 2
+
+        blocked = bytearray(pathfinder.size)
+        for pos in positions_to_avoid:
+            if game_map.is_within_bounds(pos):
+                blocked[pathfinder._index(pos)] = 1
+
+        # Level of a tile: number of steps from it to the nearest unblocked tile next to `origin`
+        self._levels = levels = [None] * pathfinder.size
+        frontier = []
+        if game_map.is_within_bounds(origin):
+            for index in neighbors[pathfinder._index(origin)]:
+                if not blocked[index]:
+                    levels[index] = 0
+                    frontier.append(index)
+        level = 0
+        while frontier and level < max_level:
+            level += 1
+            next_frontier = []
+            for index in frontier:
+                for neighbor in neighbors[index]:
+                    if levels[neighbor] is None and not blocked[neighbor]:
+                        levels[neighbor] = level
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+    def distance_to(self, target):
+        """ Same as `PathFinder.tile_distance(origin, target, positions_to_avoid)`. """
+        pathfinder = self.pathfinder
+        origin = self.origin
+        if target is None or not pathfinder.game_map.is_within_bounds(target):
+            return INFINITE_DISTANCE
+        if target == origin:
+            return 0
+        distance = origin - target
+        if distance > TILE_DISTANCE_SEARCH_RADIUS:
+            return distance
+        if distance == 1:
+            return 1
+
+        levels = self._levels
+        steps = [levels[index] for index in pathfinder._neighbors[pathfinder._index(target)] if levels[index] is not None]
+        if steps:
+            pathfinder.stats['tile_distance_from_field'] += 1
+            # One step onto the closest neighbor, its level, and the step onto `origin`
+            return min(steps) + 2
+        return pathfinder.tile_distance(origin, target, positions_to_avoid=self.positions_to_avoid)
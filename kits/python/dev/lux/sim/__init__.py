@@ -0,0 +1,4 @@
+""" A Python forward model of the game rules, for rollouts and local matches without the Node engine. """
+from .engine import Observation, Simulation, game_parameters, run_match
+from .replay import find_divergence, load_replay, replay_actions, simulation_from_replay
+from .state import SimCity, SimState, SimUnit
@@ -0,0 +1,454 @@
+import math
+import re
+from copy import deepcopy
+
+import numpy as np
+
+from ..constants import GAME_CONSTANTS, Directions, ResourceTypes, UnitTypes
+from .state import NO_RESOURCE, NO_TEAM, RESOURCE_CODES, TEAMS, SimState
+
+
+MOVE = "m"
+RESEARCH = "r"
+BUILD_WORKER = "bw"
+BUILD_CART = "bc"
+BUILD_CITY = "bcity"
+TRANSFER = "t"
+PILLAGE = "p"
+
+DIRECTION_OFFSETS = {
+    Directions.NORTH: (0, -1),
+    Directions.EAST: (1, 0),
+    Directions.SOUTH: (0, 1),
+    Directions.WEST: (-1, 0),
+    Directions.CENTER: (0, 0),
+}
+MINING_ORDER = (ResourceTypes.URANIUM, ResourceTypes.COAL, ResourceTypes.WOOD)
+_LEADING_INTEGER = re.compile(r"\s*([+-]?\d+)")
+
+
+def parse_int(text):
+    """ JavaScript's `parseInt` for decimal strings: the leading integer of `text`, or None. """
+    match = _LEADING_INTEGER.match(text)
+    return int(match.group(1)) if match else None
+
+
+def game_parameters(**overrides):
+    """ The game parameters, with top-level entries replaced by `overrides`. """
+    parameters = deepcopy(GAME_CONSTANTS["PARAMETERS"])
+    parameters.update(overrides)
+    return parameters
+
+
+class Observation(dict):
+    """ A kaggle-style observation: a dict whose keys can also be read as attributes. """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class Simulation:
+    """ Plays the game rules forward from a :SimState:, the way `src/logic.ts` does.
+
+    `step` validates and applies one turn of commands for both teams,
+    in the engine's order: commands are validated team by team, moves
+    are resolved for collisions, then city tiles act, then units (in
+    the order they were created), resources are mined and deposited,
+    night upkeep is paid, forests regrow and cooldowns run down.
+    Commands the engine would reject are dropped and listed in
+    `rejected_commands`.
+
+    There is no map generation here; games start from an observation
+    (see `SimState.from_observation`), e.g. the first one of a replay.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.parameters = state.parameters
+        self.done = False
+        self.rejected_commands = []
+
+    @classmethod
+    def from_observation(cls, observation, parameters=None):
+        return cls(SimState.from_observation(observation, parameters))
+
+    def copy(self):
+        simulation = Simulation(self.state.copy())
+        simulation.done = self.done
+        return simulation
+
+    def observation(self, player):
+        """ What the engine sends `player` at this turn, as a kaggle observation. """
+        state = self.state
+        updates = state.observation_updates()
+        if state.turn == 0:
+            updates = ["0", f"{state.width} {state.height}"] + updates
+        return Observation(
+            player=player,
+            step=state.turn,
+            updates=updates,
+            width=state.width,
+            height=state.height,
+            globalUnitIDCount=state.global_unit_id_count,
+            globalCityIDCount=state.global_city_id_count,
+            reward=self.rewards()[player],
+        )
+
+    def rewards(self):
+        """ The kaggle reward of each team: city tiles first, then units to break ties. """
+        return [self.state.city_tile_count(team) * 10000 + len(self.state.units[team]) for team in TEAMS]
+
+    def step(self, actions):
+        """ Play one turn; `actions[team]` is the list of commands of `team`. Returns whether the match is over. """
+        state = self.state
+        self.rejected_commands = []
+        validated = {kind: [] for kind in (BUILD_CITY, BUILD_WORKER, BUILD_CART, PILLAGE, RESEARCH, TRANSFER, MOVE)}
+        for team in TEAMS:
+            units_built = [0]
+            placed = set()
+            for command in actions[team] or ():
+                # The environment drops annotations and empty commands before they reach the engine
+                if not command or command[0] == "d":
+                    continue
+                action = self._validate(team, command, placed, units_built)
+                if action is None:
+                    self.rejected_commands.append((team, command))
+                else:
+                    validated[action[0]].append(action)
+
+        unit_actions = {}
+        tile_actions = {}
+        for kind in (BUILD_CITY, PILLAGE, TRANSFER):
+            for action in validated[kind]:
+                unit_actions[action[2]] = action
+        for kind in (BUILD_WORKER, BUILD_CART, RESEARCH):
+            for action in validated[kind]:
+                tile_actions[action[2], action[3]] = action
+        for action in self._resolve_moves(validated[MOVE]):
+            if action[3] != Directions.CENTER:
+                unit_actions[action[2]] = action
+
+        for city in list(state.cities.values()):
+            for x, y in city.tiles:
+                self._city_tile_turn(x, y, tile_actions.get((x, y)))
+        for team in TEAMS:
+            for unit in list(state.units[team].values()):
+                self._unit_turn(unit, unit_actions.get(unit.id))
+
+        for r_type in MINING_ORDER:
+            self._distribute_resources(r_type)
+        for team in TEAMS:
+            for unit in state.units[team].values():
+                self._deposit_resources(unit)
+
+        if state.is_night():
+            self._handle_night()
+
+        depleted = state.resource_amount <= 0
+        state.resource_type[depleted] = NO_RESOURCE
+        state.resource_amount[depleted] = 0
+        self._regrow_forests()
+
+        self.done = self._match_over()
+        state.turn += 1
+        self._run_cooldowns()
+        return self.done
+
+    def _validate(self, team, command, placed, units_built):
+        """ The action of `command` if the engine accepts it, else None. """
+        state = self.state
+        units = state.units[team]
+        action, *args = command.split(" ")
+
+        if action in (PILLAGE, BUILD_CITY):
+            if len(args) != 1:
+                return None
+            unit = units.get(args[0])
+            if unit is None or unit.id in placed:
+                return None
+            if action == BUILD_CITY and (
+                state.is_city_tile(unit.x, unit.y)
+                or state.has_resource(unit.x, unit.y)
+                or sum(unit.cargo.values()) < self.parameters["CITY_BUILD_COST"]
+            ):
+                return None
+            if unit.cooldown >= 1:
+                return None
+            placed.add(unit.id)
+            return action, team, unit.id
+
+        if action in (BUILD_WORKER, BUILD_CART, RESEARCH):
+            if len(args) != 2:
+                return None
+            x, y = parse_int(args[0]), parse_int(args[1])
+            if x is None or y is None or not state.in_map(x, y) or state.city_tile_team[y, x] != team:
+                return None
+            if (x, y) in placed or state.city_tile_cooldown[y, x] >= 1:
+                return None
+            if action != RESEARCH:
+                if len(units) + units_built[0] >= state.city_tile_count(team):
+                    return None
+                units_built[0] += 1
+            placed.add((x, y))
+            return action, team, x, y
+
+        if action == MOVE:
+            if len(args) != 2:
+                return None
+            unit = units.get(args[0])
+            direction = args[1]
+            if unit is None or unit.cooldown >= 1 or unit.id in placed or direction not in DIRECTION_OFFSETS:
+                return None
+            dx, dy = DIRECTION_OFFSETS[direction]
+            x, y = unit.x + dx, unit.y + dy
+            if direction != Directions.CENTER:
+                if not state.in_map(x, y) or state.city_tile_team[y, x] not in (NO_TEAM, team):
+                    return None
+            placed.add(unit.id)
+            return action, team, unit.id, direction, (x, y)
+
+        if action == TRANSFER:
+            if len(args) != 4:
+                return None
+            source, destination = units.get(args[0]), units.get(args[1])
+            amount = parse_int(args[3])
+            if source is None or destination is None or source.cooldown >= 1 or source.id in placed:
+                return None
+            if source is destination or abs(source.x - destination.x) + abs(source.y - destination.y) > 1:
+                return None
+            if amount is None or amount < 0 or args[2] not in RESOURCE_CODES:
+                return None
+            placed.add(source.id)
+            return action, team, source.id, destination.id, args[2], amount
+
+        return None
+
+    def _resolve_moves(self, moves):
+        """ The moves left once the units that would collide, and those moving into them, stay put. """
+        state = self.state
+        moves_to = {}
+        moving_units = set()
+        for move in moves:
+            moves_to.setdefault(move[4], []).append(move)
+            moving_units.add(move[2])
+
+        occupants = {}
+        for team in TEAMS:
+            for unit in state.units[team].values():
+                occupants.setdefault((unit.x, unit.y), []).append(unit.id)
+
+        def revert(move):
+            unit = state.units[move[1]][move[2]]
+            origin = (unit.x, unit.y)
+            if not state.is_city_tile(*origin):
+                for colliding_move in moves_to.pop(origin, ()):
+                    revert(colliding_move)
+
+        for target in list(moves_to):
+            target_moves = moves_to.get(target)
+            if target_moves is None or state.is_city_tile(*target):
+                continue
+            if len(target_moves) > 1:
+                to_revert = target_moves
+            else:
+                target_occupants = occupants.get(target, ())
+                standing_still = len(target_occupants) == 1 and target_occupants[0] not in moving_units
+                to_revert = target_moves if standing_still else ()
+            for move in to_revert:
+                revert(move)
+            for move in to_revert:
+                moves_to.pop(move[4], None)
+
+        return [move for target_moves in moves_to.values() for move in target_moves]
+
+    def _city_tile_turn(self, x, y, action):
+        state = self.state
+        team = int(state.city_tile_team[y, x])
+        if action is not None:
+            if action[0] == RESEARCH:
+                state.research_points[team] += 1
+            else:
+                state.add_unit(UnitTypes.WORKER if action[0] == BUILD_WORKER else UnitTypes.CART, team, x, y)
+            state.city_tile_cooldown[y, x] = self.parameters["CITY_ACTION_COOLDOWN"]
+        if state.city_tile_cooldown[y, x] > 0:
+            state.city_tile_cooldown[y, x] -= 1
+
+    def _unit_turn(self, unit, action):
+        state = self.state
+        parameters = self.parameters
+        cooldown_multiplier = 2 if state.is_night() else 1
+        kind = action[0] if action is not None else None
+        acted = kind in (MOVE, TRANSFER) or (unit.is_worker and kind in (BUILD_CITY, PILLAGE))
+
+        if kind == MOVE:
+            dx, dy = DIRECTION_OFFSETS[action[3]]
+            unit.x += dx
+            unit.y += dy
+        elif kind == TRANSFER:
+            __, team, __, destination_id, r_type, amount = action
+            destination = state.units[team][destination_id]
+            amount = min(amount, unit.cargo[r_type], destination.cargo_space_left(parameters))
+            unit.cargo[r_type] -= amount
+            destination.cargo[r_type] += amount
+        elif kind == BUILD_CITY and unit.is_worker:
+            state.add_city_tile(unit.team, unit.x, unit.y)
+            self._spend_resources_on_city(unit)
+        elif kind == PILLAGE and unit.is_worker:
+            state.road[unit.y, unit.x] = max(state.road[unit.y, unit.x] - parameters["PILLAGE_RATE"], parameters["MIN_ROAD"])
+
+        if acted:
+            unit_type = "WORKER" if unit.is_worker else "CART"
+            unit.cooldown += parameters["UNIT_ACTION_COOLDOWN"][unit_type] * cooldown_multiplier
+
+        # Carts develop the road they end their turn on
+        if not unit.is_worker and state.road_level(unit.x, unit.y) < parameters["MAX_ROAD"]:
+            state.road[unit.y, unit.x] = min(
+                state.road[unit.y, unit.x] + parameters["CART_ROAD_DEVELOPMENT_RATE"], parameters["MAX_ROAD"]
+            )
+
+    def _spend_resources_on_city(self, unit):
+        """ Pay the city cost with wood first, then coal, then uranium. """
+        spent = 0
+        cost = self.parameters["CITY_BUILD_COST"]
+        for r_type in (ResourceTypes.WOOD, ResourceTypes.COAL, ResourceTypes.URANIUM):
+            if spent + unit.cargo[r_type] > cost:
+                unit.cargo[r_type] -= cost - spent
+                break
+            spent += unit.cargo[r_type]
+            unit.cargo[r_type] = 0
+
+    def _distribute_resources(self, r_type):
+        """ Let every worker mine `r_type` from its tile and the adjacent ones.
+
+        Follows the engine's request scheme: each worker asks every
+        tile in reach for an equal share of its free cargo space (up to
+        the collection rate), workers on a city tile ask as that city,
+        and a tile that cannot meet all its requests shares out what it
+        has evenly, wasting the remainder.
+        """
+        state = self.state
+        code = RESOURCE_CODES[r_type]
+        collection_rate = self.parameters["WORKER_COLLECTION_RATE"][r_type.upper()]
+        fuel_rate = self.parameters["RESOURCE_TO_FUEL_RATE"][r_type.upper()]
+
+        requests = {}
+        for team in TEAMS:
+            if not state.researched(team, r_type):
+                continue
+            for unit in state.units[team].values():
+                if not unit.is_worker:
+                    continue
+                reachable = [
+                    (x, y) for x, y in (
+                        (unit.x + dx, unit.y + dy) for dx, dy in DIRECTION_OFFSETS.values()
+                    )
+                    if state.in_map(x, y) and state.resource_type[y, x] == code and state.resource_amount[y, x] > 0
+                ]
+                if not reachable:
+                    continue
+                amount = min(-(-unit.cargo_space_left(self.parameters) // len(reachable)), collection_rate)
+                if state.is_city_tile(unit.x, unit.y):
+                    request = (unit.x, unit.y, team, None, amount, int(state.city_number[unit.y, unit.x]))
+                else:
+                    request = (unit.x, unit.y, team, unit.id, amount, None)
+                for position in reachable:
+                    tile_requests = requests.setdefault(position, [])
+                    if request not in tile_requests:
+                        tile_requests.append(request)
+
+        for (x, y), tile_requests in requests.items():
+            amount_left = int(state.resource_amount[y, x])
+            pending = [[request[4], request] for request in tile_requests]
+            while pending and sum(amount for amount, __ in pending) > 0 and amount_left > 0:
+                to_fill = min(min(amount for amount, __ in pending), amount_left // len(pending))
+                for __, (__, __, team, unit_id, __, city_number) in pending:
+                    if city_number is not None:
+                        state.cities[city_number].fuel += to_fill * fuel_rate
+                    else:
+                        worker = state.units[team][unit_id]
+                        worker.cargo[r_type] += min(worker.cargo_space_left(self.parameters), to_fill)
+                for entry in pending:
+                    entry[0] -= to_fill
+                amount_left -= to_fill * len(pending)
+                if amount_left < len(pending):
+                    amount_left = 0
+                pending = [entry for entry in pending if entry[0] > 0]
+            state.resource_amount[y, x] = amount_left
+
+    def _deposit_resources(self, unit):
+        state = self.state
+        if state.city_tile_team[unit.y, unit.x] != unit.team:
+            return
+        city = state.cities[int(state.city_number[unit.y, unit.x])]
+        fuel_rates = self.parameters["RESOURCE_TO_FUEL_RATE"]
+        city.fuel += sum(amount * fuel_rates[r_type.upper()] for r_type, amount in unit.cargo.items())
+        for r_type in unit.cargo:
+            unit.cargo[r_type] = 0
+
+    def _handle_night(self):
+        state = self.state
+        for city in list(state.cities.values()):
+            upkeep = state.light_upkeep(city)
+            if city.fuel < upkeep:
+                state.remove_city(city)
+            else:
+                city.fuel -= upkeep
+        for team in TEAMS:
+            for unit in list(state.units[team].values()):
+                if not state.is_city_tile(unit.x, unit.y) and not self._spend_fuel_to_survive(unit):
+                    del state.units[team][unit.id]
+
+    def _spend_fuel_to_survive(self, unit):
+        """ Burn wood, then coal, then uranium to pay the unit's upkeep; returns whether it survives. """
+        fuel_needed = self.parameters["LIGHT_UPKEEP"]["WORKER" if unit.is_worker else "CART"]
+        for r_type in (ResourceTypes.WOOD, ResourceTypes.COAL, ResourceTypes.URANIUM):
+            fuel_rate = self.parameters["RESOURCE_TO_FUEL_RATE"][r_type.upper()]
+            used = min(unit.cargo[r_type], math.ceil(fuel_needed / fuel_rate))
+            fuel_needed -= used * fuel_rate
+            unit.cargo[r_type] -= used
+            if fuel_needed <= 0:
+                return True
+        return False
+
+    def _regrow_forests(self):
+        state = self.state
+        max_wood = self.parameters["MAX_WOOD_AMOUNT"]
+        growing = (state.resource_type == RESOURCE_CODES[ResourceTypes.WOOD]) & (state.resource_amount < max_wood)
+        state.resource_amount[growing] = np.ceil(
+            np.minimum(state.resource_amount[growing] * self.parameters["WOOD_GROWTH_RATE"], max_wood)
+        )
+
+    def _match_over(self):
+        state = self.state
+        if state.turn == self.parameters["MAX_DAYS"] - 1:
+            return True
+        city_counts = [0, 0]
+        for city in state.cities.values():
+            city_counts[city.team] += 1
+        return any(len(state.units[team]) + city_counts[team] == 0 for team in TEAMS)
+
+    def _run_cooldowns(self):
+        state = self.state
+        for team in TEAMS:
+            for unit in state.units[team].values():
+                unit.cooldown = max(unit.cooldown - state.road_level(unit.x, unit.y) - 1, 0)
+
+
+def run_match(agents, simulation, configuration=None, num_steps=None):
+    """ Play `agents` (kaggle-style agent functions, one per team) against each other in `simulation`.
+
+    Runs until the match is over, or for at most `num_steps` turns.
+    Returns the actions of every turn.
+    """
+    history = []
+    while not simulation.done and (num_steps is None or len(history) < num_steps):
+        actions = [agent(simulation.observation(player), configuration) for player, agent in enumerate(agents)]
+        history.append(actions)
+        simulation.step(actions)
+    return history
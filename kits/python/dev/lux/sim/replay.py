@@ -0,0 +1,36 @@
+import json
+
+from .engine import Simulation
+
+
+def load_replay(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def replay_actions(replay, step):
+    """ The commands of both teams that led from step - 1 to `step` of a kaggle `replay`. """
+    return [agent_step["action"] or [] for agent_step in replay["steps"][step]]
+
+
+def simulation_from_replay(replay, parameters=None, step=0):
+    """ A :Simulation: starting from `step` of a kaggle `replay`. """
+    return Simulation.from_observation(replay["steps"][step][0]["observation"], parameters)
+
+
+def find_divergence(replay, parameters=None):
+    """ The first step of a kaggle `replay` where the simulation disagrees with the engine, or None.
+
+    Returns (step, expected, actual), where expected and actual are the
+    observation update strings of that step. Pass the `parameters` the
+    replay was recorded with if they differ from GAME_CONSTANTS.
+    """
+    simulation = simulation_from_replay(replay, parameters)
+    for step in range(1, len(replay["steps"])):
+        simulation.step(replay_actions(replay, step))
+        observation = replay["steps"][step][0]["observation"]
+        expected = observation["updates"]
+        actual = simulation.observation(0)["updates"]
+        if actual != expected:
+            return step, expected, actual
+    return None
@@ -0,0 +1,290 @@
+import numpy as np
+
+from ..constants import GAME_CONSTANTS, InputConstants, ResourceTypes, UnitTypes
+
+
+NO_RESOURCE = -1
+RESOURCE_TYPES_BY_CODE = (ResourceTypes.WOOD, ResourceTypes.COAL, ResourceTypes.URANIUM)
+RESOURCE_CODES = {r_type: code for code, r_type in enumerate(RESOURCE_TYPES_BY_CODE)}
+NO_TEAM = -1
+NO_CITY = -1
+TEAMS = (0, 1)
+
+
+def format_number(value):
+    """ `value` as the engine prints it: JavaScript numbers drop the fraction of whole floats. """
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def parse_number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def city_number(city_id):
+    """ The count part of a city id, e.g. 3 for "c_3". """
+    return int(city_id.split("_")[1])
+
+
+class SimUnit:
+    __slots__ = ("id", "type", "team", "x", "y", "cooldown", "cargo")
+
+    def __init__(self, unit_id, u_type, team, x, y, cooldown=0, wood=0, coal=0, uranium=0):
+        self.id = unit_id
+        self.type = u_type
+        self.team = team
+        self.x = x
+        self.y = y
+        self.cooldown = cooldown
+        self.cargo = {ResourceTypes.WOOD: wood, ResourceTypes.COAL: coal, ResourceTypes.URANIUM: uranium}
+
+    def __repr__(self):
+        return f"SimUnit({self.id}, team={self.team}, pos=({self.x}, {self.y}), cooldown={self.cooldown})"
+
+    @property
+    def is_worker(self):
+        return self.type == UnitTypes.WORKER
+
+    def cargo_space_left(self, parameters):
+        capacity = parameters["RESOURCE_CAPACITY"]["WORKER" if self.is_worker else "CART"]
+        return capacity - sum(self.cargo.values())
+
+
+class SimCity:
+    __slots__ = ("number", "team", "fuel", "tiles")
+
+    def __init__(self, number, team, fuel=0):
+        self.number = number
+        self.team = team
+        self.fuel = fuel
+        self.tiles = []
+
+    def __repr__(self):
+        return f"SimCity({self.id}, team={self.team}, fuel={self.fuel}, size={len(self.tiles)})"
+
+    @property
+    def id(self):
+        return f"c_{self.number}"
+
+
+class SimState:
+    """ The full state of a game, as the engine keeps it.
+
+    The per-tile layers are (height, width) numpy arrays, indexed
+    [y, x] like those of `GameMap`. Units and cities are kept in dicts
+    because the engine processes them in insertion order, and that
+    order decides e.g. which unit gets to collect first.
+
+    Depleted resources are stored as NO_RESOURCE; the engine keeps the
+    empty resource on the tile, but treats it as absent everywhere.
+    The engine also keeps a road level under city tiles that is never
+    observable (city tiles always count as MAX_ROAD and their road is
+    reset when the city falls), so `road` may hold anything there.
+    """
+
+    def __init__(self, width, height, parameters=None):
+        self.width = width
+        self.height = height
+        self.parameters = parameters if parameters is not None else GAME_CONSTANTS["PARAMETERS"]
+        self.turn = 0
+        self.global_unit_id_count = 0
+        self.global_city_id_count = 0
+        self.research_points = [0, 0]
+        self.resource_type = np.full((height, width), NO_RESOURCE, dtype=np.int8)
+        self.resource_amount = np.zeros((height, width), dtype=np.int64)
+        self.road = np.zeros((height, width), dtype=np.float64)
+        self.city_tile_team = np.full((height, width), NO_TEAM, dtype=np.int8)
+        self.city_number = np.full((height, width), NO_CITY, dtype=np.int32)
+        self.city_tile_cooldown = np.zeros((height, width), dtype=np.float64)
+        self.adjacent_city_tiles = np.zeros((height, width), dtype=np.int8)
+        self.units = ({}, {})
+        self.cities = {}
+
+    def copy(self):
+        """ An independent copy, e.g. to branch off a rollout. """
+        state = SimState(self.width, self.height, self.parameters)
+        state.turn = self.turn
+        state.global_unit_id_count = self.global_unit_id_count
+        state.global_city_id_count = self.global_city_id_count
+        state.research_points = list(self.research_points)
+        for name in (
+            "resource_type", "resource_amount", "road", "city_tile_team",
+            "city_number", "city_tile_cooldown", "adjacent_city_tiles"
+        ):
+            setattr(state, name, getattr(self, name).copy())
+        for team in TEAMS:
+            for unit_id, unit in self.units[team].items():
+                state.units[team][unit_id] = SimUnit(
+                    unit_id, unit.type, unit.team, unit.x, unit.y, unit.cooldown, **unit.cargo
+                )
+        for number, city in self.cities.items():
+            state.cities[number] = SimCity(number, city.team, city.fuel)
+            state.cities[number].tiles = list(city.tiles)
+        return state
+
+    def in_map(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def adjacent_positions(self, x, y):
+        """ The in-map neighbors of (x, y), in the engine's order: north, east, south, west. """
+        return [(nx, ny) for nx, ny in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)) if self.in_map(nx, ny)]
+
+    def is_city_tile(self, x, y):
+        return self.city_tile_team[y, x] != NO_TEAM
+
+    def has_resource(self, x, y):
+        return self.resource_type[y, x] != NO_RESOURCE and self.resource_amount[y, x] > 0
+
+    def road_level(self, x, y):
+        return self.parameters["MAX_ROAD"] if self.is_city_tile(x, y) else float(self.road[y, x])
+
+    def road_levels(self):
+        return np.where(self.city_tile_team != NO_TEAM, self.parameters["MAX_ROAD"], self.road)
+
+    def researched(self, team, r_type):
+        if r_type == ResourceTypes.WOOD:
+            return True
+        return self.research_points[team] >= self.parameters["RESEARCH_REQUIREMENTS"][r_type.upper()]
+
+    def is_night(self):
+        return self.turn % self.parameters["CYCLE_LENGTH"] >= self.parameters["DAY_LENGTH"]
+
+    def light_upkeep(self, city):
+        adjacency = sum(int(self.adjacent_city_tiles[y, x]) for x, y in city.tiles)
+        return (
+            len(city.tiles) * self.parameters["LIGHT_UPKEEP"]["CITY"]
+            - adjacency * self.parameters["CITY_ADJACENCY_BONUS"]
+        )
+
+    def city_tile_count(self, team):
+        return sum(len(city.tiles) for city in self.cities.values() if city.team == team)
+
+    def add_city_tile(self, team, x, y, number=None):
+        """ Found a city tile, merging the cities it touches like the engine does; returns its city.
+
+        Without `number`, a new city gets the next city id.
+        """
+        neighbors = [(nx, ny) for nx, ny in self.adjacent_positions(x, y) if self.city_tile_team[ny, nx] == team]
+        self.city_tile_team[y, x] = team
+        self.city_tile_cooldown[y, x] = 0
+        if not neighbors:
+            if number is None:
+                self.global_city_id_count += 1
+                number = self.global_city_id_count
+            city = self.cities[number] = SimCity(number, team)
+            self.city_number[y, x] = number
+            self.adjacent_city_tiles[y, x] = 0
+            city.tiles.append((x, y))
+            return city
+
+        merged_numbers = list(dict.fromkeys(int(self.city_number[ny, nx]) for nx, ny in neighbors))
+        city = self.cities[merged_numbers[0]]
+        self.city_number[y, x] = city.number
+        self.adjacent_city_tiles[y, x] = len(neighbors)
+        for nx, ny in neighbors:
+            self.adjacent_city_tiles[ny, nx] += 1
+        city.tiles.append((x, y))
+        for number in merged_numbers[1:]:
+            old_city = self.cities.pop(number)
+            for tx, ty in old_city.tiles:
+                self.city_number[ty, tx] = city.number
+                city.tiles.append((tx, ty))
+            city.fuel += old_city.fuel
+        return city
+
+    def remove_city(self, city):
+        del self.cities[city.number]
+        for x, y in city.tiles:
+            self.city_tile_team[y, x] = NO_TEAM
+            self.city_number[y, x] = NO_CITY
+            self.city_tile_cooldown[y, x] = 0
+            self.adjacent_city_tiles[y, x] = 0
+            self.road[y, x] = self.parameters["MIN_ROAD"]
+
+    def add_unit(self, u_type, team, x, y, unit_id=None):
+        if unit_id is None:
+            self.global_unit_id_count += 1
+            unit_id = f"u_{self.global_unit_id_count}"
+        unit = self.units[team][unit_id] = SimUnit(unit_id, u_type, team, x, y)
+        return unit
+
+    def resource_positions(self):
+        """ (x, y) of every resource tile, in the engine's order (by x, then y). """
+        xs, ys = np.nonzero((self.resource_type != NO_RESOURCE).T)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    @classmethod
+    def from_observation(cls, observation, parameters=None):
+        """ The state described by a kaggle `observation` of the game.
+
+        Observations carry everything the engine state holds, except the
+        global id counts on old observations; those default to the
+        highest id in play.
+        """
+        state = cls(observation["width"], observation["height"], parameters)
+        state.turn = observation["step"]
+        city_fuel = {}
+        for update in observation["updates"]:
+            strs = update.split(" ")
+            input_identifier = strs[0]
+            if input_identifier == InputConstants.RESEARCH_POINTS:
+                state.research_points[int(strs[1])] = int(strs[2])
+            elif input_identifier == InputConstants.RESOURCES:
+                x, y = int(strs[2]), int(strs[3])
+                state.resource_type[y, x] = RESOURCE_CODES[strs[1]]
+                state.resource_amount[y, x] = int(strs[4])
+            elif input_identifier == InputConstants.UNITS:
+                team = int(strs[2])
+                state.units[team][strs[3]] = SimUnit(
+                    strs[3], int(strs[1]), team, int(strs[4]), int(strs[5]), parse_number(strs[6]),
+                    int(strs[7]), int(strs[8]), int(strs[9])
+                )
+            elif input_identifier == InputConstants.CITY:
+                city_fuel[city_number(strs[2])] = parse_number(strs[3])
+            elif input_identifier == InputConstants.CITY_TILES:
+                team, number, x, y = int(strs[1]), city_number(strs[2]), int(strs[3]), int(strs[4])
+                city = state.add_city_tile(team, x, y, number)
+                state.city_tile_cooldown[y, x] = parse_number(strs[5])
+                city.fuel = city_fuel[number]
+            elif input_identifier == InputConstants.ROADS:
+                state.road[int(strs[2]), int(strs[1])] = parse_number(strs[3])
+
+        unit_numbers = [int(unit_id.split("_")[1]) for units in state.units for unit_id in units]
+        state.global_unit_id_count = observation.get("globalUnitIDCount", max(unit_numbers, default=0))
+        state.global_city_id_count = observation.get("globalCityIDCount", max(state.cities, default=0))
+        return state
+
+    def observation_updates(self):
+        """ The update strings the engine sends at this point of the game, ending with "D_DONE". """
+        updates = [f"{InputConstants.RESEARCH_POINTS} {team} {self.research_points[team]}" for team in TEAMS]
+        for x, y in self.resource_positions():
+            updates.append(
+                f"{InputConstants.RESOURCES} {RESOURCE_TYPES_BY_CODE[self.resource_type[y, x]]} "
+                f"{x} {y} {self.resource_amount[y, x]}"
+            )
+        for team in TEAMS:
+            for unit in self.units[team].values():
+                updates.append(
+                    f"{InputConstants.UNITS} {unit.type} {team} {unit.id} {unit.x} {unit.y} "
+                    f"{format_number(unit.cooldown)} {unit.cargo[ResourceTypes.WOOD]} "
+                    f"{unit.cargo[ResourceTypes.COAL]} {unit.cargo[ResourceTypes.URANIUM]}"
+                )
+        for city in self.cities.values():
+            updates.append(
+                f"{InputConstants.CITY} {city.team} {city.id} {format_number(city.fuel)} "
+                f"{format_number(self.light_upkeep(city))}"
+            )
+        for city in self.cities.values():
+            for x, y in city.tiles:
+                updates.append(
+                    f"{InputConstants.CITY_TILES} {city.team} {city.id} {x} {y} "
+                    f"{format_number(self.city_tile_cooldown[y, x])}"
+                )
+        roads = self.road_levels()
+        for y, x in zip(*np.nonzero(roads)):
+            updates.append(f"{InputConstants.ROADS} {x} {y} {format_number(roads[y, x])}")
+        updates.append(InputConstants.DONE)
+        return updates
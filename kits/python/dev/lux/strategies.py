@@ -1,7 +1,6 @@
 import sys
 import math
-import getpass
-from .constants import StrategyTypes, LogicGlobals, ValidActions, STRATEGY_HYPERPARAMETERS, ResourceTypes, print, GAME_CONSTANTS
+from .constants import StrategyTypes, LogicGlobals, ValidActions, STRATEGY_HYPERPARAMETERS, ResourceTypes, print, GAME_CONSTANTS, DETERMINISTIC
 from .game_map import Position
 from .strategy_utils import reset_unit_tasks, city_tile_to_build, compute_tbs_com, city_tile_to_build_tbs, set_rbs_rtype, find_clusters_to_colonize_rbs, city_tile_to_build_from_id, set_unit_cluster_to_defend_id
 
@@ -68,7 +67,7 @@ def set_unit_strategy(player):
                 return
             else:
                 closest_units = sorted(
-                    [u for u in player.units if u.current_strategy == StrategyTypes.STARTER], key=lambda u: (u.pos.distance_to(LogicGlobals.TBS_COM),u.id if getpass.getuser() == 'Paul' else 0)
+                    [u for u in player.units if u.current_strategy == StrategyTypes.STARTER], key=lambda u: (u.pos.distance_to(LogicGlobals.TBS_COM),u.id if DETERMINISTIC else 0)
                 )
                 # print(closest_units)
                 for unit in closest_units[:len(NEW_STRATEGY_UNITS) - num_new_strat]:
@@ -170,7 +169,7 @@ def starter_strategy(unit, player):
             LogicGlobals.player.cities[i].can_survive_until_end_of_game,
             LogicGlobals.player.cities[i].fuel - (GAME_CONSTANTS["PARAMETERS"]["NIGHT_LENGTH"] * LogicGlobals.player.cities[i].light_upkeep) + len(LogicGlobals.player.cities[i].managers) * LogicGlobals.game_state.turns_until_next_night * 20,
             min([unit.pos.distance_to(c.pos) for c in LogicGlobals.player.cities[i].citytiles]),
-            i if getpass.getuser() == 'Paul' else 0
+            i if DETERMINISTIC else 0
         )
     )
     unit.set_task(action=ValidActions.MANAGE, target=city_id_to_manage)
@@ -497,7 +496,7 @@ def research_based_strategy(unit, player):
     cluster_to_defend = LogicGlobals.game_state.map.get_cluster_by_id(unit.cluster_to_defend_id)
     cities_to_manage = sorted(
         [LogicGlobals.player.cities[id_] for id_ in cluster_to_defend.city_ids],
-        key=lambda c: (len(c.managers), c.cityid if getpass.getuser() == 'Paul' else 0)
+        key=lambda c: (len(c.managers), c.cityid if DETERMINISTIC else 0)
     )
 
     print(f"Cluster {unit.cluster_to_defend_id} city_ids:", cluster_to_defend.city_ids)
@@ -1,10 +1,11 @@
 import sys
 import numpy as np
-import statistics
 from itertools import chain
-import getpass
-from .constants import ALL_DIRECTIONS, ResourceTypes, Directions, LogicGlobals, STRATEGY_HYPERPARAMETERS, print, GAME_CONSTANTS, ValidActions
+from .constants import ALL_DIRECTIONS, ResourceTypes, Directions, LogicGlobals, STRATEGY_HYPERPARAMETERS, print, GAME_CONSTANTS, ValidActions, DETERMINISTIC
 from .game_map import Position
+from .movement import MovementResolver
+from .cooperative import CooperativePlanner
+from .budget import BudgetSteps, time_allows
 from collections import deque
 
 
@@ -48,7 +49,7 @@ def city_tile_to_build_from_id(cluster_id, game_map, pos_being_built, unit):
 def find_closest_cluster_to_colonize(unit):
     return min(
         LogicGlobals.clusters_to_colonize,
-        key=lambda c: (unit.pos.distance_to(c.center_pos), c.id if getpass.getuser() == 'Paul' else 0)
+        key=lambda c: (unit.pos.distance_to(c.center_pos), c.id if DETERMINISTIC else 0)
         # NOTE: Currently does NOT prefer unlocked resources
     )
 
@@ -174,6 +175,8 @@ def set_unit_cluster_to_defend_id(unit, player):
 
 
 def switch_builds_if_needed():
+    if not time_allows(BudgetSteps.SWITCH_BUILDS):
+        return
     units_that_should_not_switch_builds = {
         u.id for u in LogicGlobals.player.units if u.current_task and u.current_task[0] == ValidActions.BUILD and u.current_task[1] == u.pos and u.has_enough_resources_to_build
     }
@@ -251,7 +254,7 @@ def switch_builds_if_needed():
 
         for unit in units_that_should_switch_builds:
             if pos_should_be_built:
-                new_target = min(pos_should_be_built, key=lambda p: (unit.pos.distance_to(p), -sum(ap in LogicGlobals.player.city_pos for ap in p.adjacent_positions(include_center=False, include_diagonals=False)), p.x, p.y))
+                new_target = min(pos_should_be_built, key=lambda p: (unit.pos.distance_to(p), -sum(ap in LogicGlobals.player.city_pos for ap in LogicGlobals.game_state.map.adjacent_positions(p, include_center=False, include_diagonals=False)), p.x, p.y))
                 pos_should_be_built.discard(new_target)
                 # print(f"Switching BUILDER {unit.id} target to {new_target}")
                 unit.remove_next_build_action()
@@ -288,13 +291,17 @@ def select_movement_direction_for_unit(unit, target, blocked_positions, enemy_bl
             blocked_positions.add(unit.pos)
         return
 
-    unit.dirs_to_move = unit.pos.sort_directions_by_turn_distance(
-        target, LogicGlobals.game_state.map,
-        cooldown=GAME_CONSTANTS['PARAMETERS']['UNIT_ACTION_COOLDOWN'][unit.type_str],
-        pos_to_check=pos_to_check, tolerance=max(0, 2 * unit.turns_spent_waiting_to_move if (unit.current_task and (
-                    unit.current_task[0] == ValidActions.MANAGE)) else unit.turns_spent_waiting_to_move - 3),
-        avoid_own_cities=unit.should_avoid_citytiles
-    )
+    tolerance = max(0, 2 * unit.turns_spent_waiting_to_move if (unit.current_task and (
+                unit.current_task[0] == ValidActions.MANAGE)) else unit.turns_spent_waiting_to_move - 3)
+    if time_allows(BudgetSteps.TURN_DISTANCE_MOVEMENT):
+        unit.dirs_to_move = unit.pos.sort_directions_by_turn_distance(
+            target, LogicGlobals.game_state.map,
+            cooldown=GAME_CONSTANTS['PARAMETERS']['UNIT_ACTION_COOLDOWN'][unit.type_str],
+            pos_to_check=pos_to_check, tolerance=tolerance,
+            avoid_own_cities=unit.should_avoid_citytiles
+        )
+    else:
+        unit.dirs_to_move = unit.pos.sort_directions_by_distance(target, pos_to_check=pos_to_check, tolerance=tolerance)
     unit.dirs_to_move = deque((d, pos_to_check[d]) for d in unit.dirs_to_move)
     if not unit.dirs_to_move:
         unit.turns_spent_waiting_to_move += 1
@@ -305,6 +312,45 @@ def select_movement_direction_for_unit(unit, target, blocked_positions, enemy_bl
     register.add(unit)
 
 
+def plan_unit_movement(move_requests, blocked_positions, enemy_blocked_positions, register):
+    """ Pick the moves of all units in `move_requests` jointly (see `CooperativePlanner`).
+
+    Units the planner has no time left for (or all units, if the turn
+    budget is running short), and units whose planned
+    move would kill them at night, go through
+    `select_movement_direction_for_unit` instead.
+    """
+    move_requests = [(unit, target) for unit, target in move_requests if target != unit.pos]
+    for unit, __ in move_requests:
+        blocked_positions.discard(unit.pos)
+
+    if time_allows(BudgetSteps.COOPERATIVE_PLANNER):
+        planner = CooperativePlanner.from_hyperparameters(
+            LogicGlobals.game_state.map, blocked_positions | enemy_blocked_positions
+        )
+        plans, unplanned = planner.plan(move_requests)
+    else:
+        plans, unplanned = {}, list(move_requests)
+    for unit, target in move_requests:
+        if unit.id not in plans:
+            continue
+        move = plans[unit.id]
+        if move is not None and unit_will_die_after_movement(unit, move[1]):
+            unplanned.append((unit, target))
+            continue
+        if move is None:
+            unit.turns_spent_waiting_to_move += 1
+            if unit.pos not in LogicGlobals.player.city_pos:
+                blocked_positions.add(unit.pos)
+            continue
+        unit.dirs_to_move = deque([move])
+        unit.move_target = target
+        register.add(unit)
+
+    for unit, target in unplanned:
+        select_movement_direction_for_unit(unit, target, blocked_positions, enemy_blocked_positions, register)
+
+
 def unit_should_avoid_citytile_at_pos(unit, new_pos, target):
     new_pos_contains_citytile = LogicGlobals.game_state.map.get_cell_by_pos(new_pos).citytile is not None
     if new_pos_contains_citytile and unit.should_avoid_citytiles:
@@ -336,110 +382,8 @@ def unit_will_die_after_movement(unit, new_pos):
     return unit_is_on_city and is_nighttime and target_position_is_not_city and (unit.is_cart() or target_position_is_not_next_to_resources)
 
 
-def move_unit_in_direction(unit, direction, actions, debug_info, register):
-    unit.turns_spent_waiting_to_move = 0
-    actions.append(unit.move(direction, logs=debug_info))
-    register.add(unit)
-
-
 def resolve_unit_movement(player, units_wanting_to_move, blocked_positions, actions, debug_info):
-    proposed_positions = dict()
-    while any(unit.dirs_to_move for unit in units_wanting_to_move) and (not proposed_positions or any(len(units) > 2 for units in proposed_positions.values())):
-        units_with_movement_resolved = set()
-        for unit in units_wanting_to_move:
-            if not proposed_positions or not any(
-                    unit.id in [u[0].id for u in units] for units in proposed_positions.values()):
-                if not unit.dirs_to_move:
-                    units_with_movement_resolved.add(unit)
-                    unit.turns_spent_waiting_to_move += 1
-                    if unit.pos not in player.city_pos:
-                        blocked_positions.add(unit.pos)
-                    continue
-                dir_to_move, new_pos = unit.dirs_to_move.popleft()
-                proposed_positions.setdefault(new_pos, []).append((unit, dir_to_move))
-
-        pos_to_discard = []
-        for pos, units in sorted(proposed_positions.items(), key=lambda tup: (-len(tup[1]), tup[0].x, tup[0].y)):
-            # for pos, units in proposed_positions.items():
-            if pos in blocked_positions:
-                pos_to_discard.append(pos)
-                continue
-            if pos in player.city_pos:
-                for unit, direction in units:
-                    move_unit_in_direction(
-                        unit, direction, actions, debug_info,
-                        register=units_with_movement_resolved
-                    )
-                pos_to_discard.append(pos)
-            elif len(units) > 1:
-                unit, direction = max(
-                    units,
-                    key=lambda pair: (
-                        pair[0].pos in proposed_positions and any(
-                            u[0].pos == pos for u in proposed_positions[pair[0].pos]),
-                        not pos == pair[0].move_target,
-                        pair[0].turns_spent_waiting_to_move,
-                        pair[0].is_building(),
-                        pair[0].id if getpass.getuser() == 'Paul' else 0
-                    )
-                )
-                move_unit_in_direction(
-                    unit, direction, actions, debug_info,
-                    register=units_with_movement_resolved
-                )
-                blocked_positions.add(pos)
-                pos_to_discard.append(pos)
-
-        for pos in pos_to_discard:
-            proposed_positions.pop(pos)
-
-        units_wanting_to_move = units_wanting_to_move - units_with_movement_resolved
-
-    units_with_movement_resolved = set()
-    for unit in units_wanting_to_move:
-        if not proposed_positions or not any(
-                unit.id in [u[0].id for u in units] for units in proposed_positions.values()):
-            if not unit.dirs_to_move:
-                units_with_movement_resolved.add(unit)
-                unit.turns_spent_waiting_to_move += 1
-                if unit.pos not in player.city_pos:
-                    blocked_positions.add(unit.pos)
-                continue
-            dir_to_move, new_pos = unit.dirs_to_move.popleft()
-            proposed_positions.setdefault(new_pos, []).append((unit, dir_to_move))
-
-    for pos, units in proposed_positions.items():
-        if pos in blocked_positions:
-            continue
-        if pos in player.city_pos:
-            for unit, direction in units:
-                move_unit_in_direction(
-                    unit, direction, actions, debug_info,
-                    register=units_with_movement_resolved
-                )
-        else:
-            unit, direction = max(
-                units,
-                key=lambda pair: (
-                    pair[0].pos in proposed_positions and any(u[0].pos == pos for u in proposed_positions[pair[0].pos]),
-                    not pos == pair[0].move_target,
-                    pair[0].turns_spent_waiting_to_move,
-                    pair[0].is_building(),
-                    pair[0].id if getpass.getuser() == 'Paul' else 0
-                )
-            )
-            move_unit_in_direction(
-                unit, direction, actions, debug_info,
-                register=units_with_movement_resolved
-            )
-            blocked_positions.add(pos)
-
-    units_wanting_to_move = units_wanting_to_move - units_with_movement_resolved
-
-    for unit in units_wanting_to_move:
-        unit.turns_spent_waiting_to_move += 1
-
-    return actions, debug_info
+    return MovementResolver(player, blocked_positions, actions, debug_info).resolve(units_wanting_to_move)
 
 
 def compute_tbs_com(game_map):
@@ -493,6 +437,8 @@ def set_rbs_rtype():
 
 
 def med_position(positions):
+    import statistics  # Imported on first use, it pulls in fractions and decimal
+
     x_pos, y_pos = [], []
     for p in positions:
         x_pos.append(p.x)
@@ -508,9 +454,10 @@ def find_clusters_to_colonize_rbs():
         c for c in LogicGlobals.game_state.map.resource_clusters
         if c.type == LogicGlobals.RBS_rtype
     ]
+    opponent_cities = LogicGlobals.game_state.map.influence.opponent_cities
     clusters_to_colonize = set()
     for cluster in potential_clusters:
-        if any(p in LogicGlobals.opponent.city_pos for p in cluster.pos_to_defend):
+        if any(opponent_cities.item(p.y, p.x) == 0 for p in cluster.pos_to_defend):
             continue
         clusters_to_colonize.add(cluster)
 
@@ -520,7 +467,7 @@ def find_clusters_to_colonize_rbs():
         unit_med_pos = med_position([u.pos for u in LogicGlobals.player.units])
         clusters_to_colonize = sorted(
             clusters_to_colonize,
-            key=lambda c: (c.total_amount * (GAME_CONSTANTS["PARAMETERS"]["MAX_DAYS"] - LogicGlobals.game_state.turn) / (c.center_pos.distance_to(unit_med_pos) * 2.5), -c.center_pos.distance_to(unit_med_pos), c.id if getpass.getuser() == 'Paul' else 0)
+            key=lambda c: (c.total_amount * (GAME_CONSTANTS["PARAMETERS"]["MAX_DAYS"] - LogicGlobals.game_state.turn) / (c.center_pos.distance_to(unit_med_pos) * 2.5), -c.center_pos.distance_to(unit_med_pos), c.id if DETERMINISTIC else 0)
         )[:-1-max_num_clusters:-1]
 
     for c in clusters_to_colonize:
@@ -531,9 +478,9 @@ def find_clusters_to_colonize_rbs():
         cluster_to_defend = sorted(
             potential_clusters,
             key=lambda c: (sum(
-                p in LogicGlobals.opponent.city_pos
+                opponent_cities.item(p.y, p.x) == 0
                 for p in c.pos_to_defend
-            ), -c.center_pos.distance_to(unit_med_pos), c.id if getpass.getuser() == 'Paul' else 0)
+            ), -c.center_pos.distance_to(unit_med_pos), c.id if DETERMINISTIC else 0)
         )[0]
         LogicGlobals.clusters_to_colonize_rbs[cluster_to_defend.id] = set()
 
@@ -0,0 +1,90 @@
+""" Aggregate the per-turn records written by `lux.instrumentation` over a match.
+
+Usage:
+    LUX_INSTRUMENTATION=turns.jsonl python debug_agent.py
+    python summarize_instrumentation.py turns.jsonl
+"""
+import argparse
+import json
+from collections import Counter, defaultdict
+
+
+HIT_RATES = {
+    'distance field cache': ('pathfinder', 'distance_field_hits', 'distance_field_misses'),
+    'turn distance from field': ('pathfinder', 'turn_distance_from_field', 'turn_distance_searches'),
+    'tile distance from field': ('pathfinder', 'tile_distance_from_field', 'tile_distance_searches'),
+    'nearest feature cache': ('nearest_features', 'hits', 'misses'),
+}
+
+
+def read_records(paths):
+    records = []
+    for path in paths:
+        with open(path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def summarize(records):
+    """ Per-phase time and call totals, summed counters and cache hit rates of `records`. """
+    phase_times = defaultdict(list)
+    phase_calls = Counter()
+    counters = defaultdict(Counter)
+    for record in records:
+        for name, phase in record['phases'].items():
+            phase_times[name].append(phase['time'])
+            phase_calls[name] += phase['calls']
+        for group, values in record['counters'].items():
+            counters[group].update(values)
+
+    total_time = sum(record['total'] for record in records)
+    phases = {
+        name: {
+            'total': sum(times),
+            'mean': sum(times) / len(records),
+            'max': max(times),
+            'share': sum(times) / total_time if total_time else 0,
+            'calls': phase_calls[name],
+        }
+        for name, times in phase_times.items()
+    }
+    hit_rates = {}
+    for name, (group, hits, misses) in HIT_RATES.items():
+        num_queries = counters[group][hits] + counters[group][misses]
+        if num_queries:
+            hit_rates[name] = counters[group][hits] / num_queries
+    return {
+        'turns': len(records),
+        'total': total_time,
+        'slowest_turn': max(records, key=lambda record: record['total'])['turn'] if records else None,
+        'phases': phases,
+        'counters': {group: dict(values) for group, values in counters.items()},
+        'hit_rates': hit_rates,
+    }
+
+
+def print_summary(summary):
+    print(f"{summary['turns']} turns, {summary['total']:.2f} s total, slowest turn: {summary['slowest_turn']}")
+    print(f"{'phase':<28}{'total (s)':>10}{'mean (ms)':>11}{'max (ms)':>10}{'share':>8}{'calls':>9}")
+    for name, phase in sorted(summary['phases'].items(), key=lambda item: -item[1]['total']):
+        print(
+            f"{name:<28}{phase['total']:>10.3f}{1000 * phase['mean']:>11.2f}"
+            f"{1000 * phase['max']:>10.2f}{phase['share']:>8.1%}{phase['calls']:>9}"
+        )
+    for group, values in sorted(summary['counters'].items()):
+        if values:
+            print(f"{group}: " + ", ".join(f"{k}={v}" for k, v in sorted(values.items())))
+    for name, rate in summary['hit_rates'].items():
+        print(f"{name} hit rate: {rate:.1%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help="Files written with LUX_INSTRUMENTATION set")
+    parser.add_argument('--player', type=int, default=None, help="Only summarize the turns of this player")
+    args = parser.parse_args()
+
+    records = read_records(args.paths)
+    if args.player is not None:
+        records = [record for record in records if record['player'] == args.player]
+    print_summary(summarize(records))
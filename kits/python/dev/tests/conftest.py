@@ -6,14 +6,12 @@ if str((Path(__file__).parent.parent.parent / 'simple').abspath()) not in sys.pa
     sys.path.append(str((Path(__file__).parent.parent.parent / 'simple').abspath()))
 import pytest
 import lux.game_map as gm
-import lux.game_objects as go
 import lux.constants as c
 import lux.game as g
 
 
 def _reset_state():
     gm.MAP_CACHE.clear()
-    go.UNIT_CACHE.clear()
     c.LogicGlobals.reset()
 
 
@@ -0,0 +1,46 @@
+import pytest
+import lux.game_map as gm
+import lux.constants as c
+from lux.annotate import AnnotationBuilder, add_annotations, annotations_requested
+
+
+class TestAnnotations:
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_sections(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'r wood 2 2 100',
+                'u 0 0 u_1 1 1 0 0 0 0',
+                'u 0 0 u_2 9 2 0 0 0 0',
+            ], 0
+        )
+        player, game_map = c.LogicGlobals.player, c.LogicGlobals.game_state.map
+        player.get_unit_by_id('u_1').set_task(c.ValidActions.MOVE, gm.Position(3, 3))
+        player.get_unit_by_id('u_1').task_q.append((c.ValidActions.MOVE, gm.Position(3, 3)))
+        debug_info = [('u_1', 'move', gm.Position(3, 3))]
+
+        annotations = list(AnnotationBuilder(player, game_map, debug_info).annotations())
+        assert annotations[0].startswith("dst 'Current Strategy")
+        assert "dst 'u_1: move at [3; 3] '" in annotations
+        assert "dst 'u_1: move to [3; 3]'" in annotations
+        assert "dst 'u_1: move with target [3; 3]'" in annotations
+        assert annotations[-1] == "dt 15 15 16 'A'"
+
+        builder = AnnotationBuilder(player, game_map, debug_info, sections={'ACTIONS'})
+        assert list(builder.annotations()) == ["dst 'ACTIONS'", "dst 'u_1: move with target [3; 3]'"]
+
+        builder = AnnotationBuilder(player, game_map, debug_info, max_annotations=3)
+        assert builder.add_to(['m u_1 e']) == ['m u_1 e'] + annotations[:3]
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_disabled(self, initialize_game):
+        c.LogicGlobals.game_state.update(['u 0 0 u_1 1 1 0 0 0 0'], 0)
+        actions = ['m u_1 e']
+
+        assert add_annotations(actions, c.LogicGlobals.player, c.LogicGlobals.game_state.map, [], False) == ['m u_1 e']
+
+    def test_annotations_requested(self):
+        assert annotations_requested(None)
+        assert annotations_requested({'annotations': True})
+        assert not annotations_requested({'annotations': False})
+        assert not annotations_requested({'annotations': True}, include_debug_for_vis=False)
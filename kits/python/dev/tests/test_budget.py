@@ -0,0 +1,75 @@
+import pytest
+import agent as agent
+import lux.game_map as gm
+import lux.constants as c
+from lux.budget import TurnBudget, BudgetSteps, time_allows
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTurnBudget:
+    def test_remaining(self):
+        clock = FakeClock()
+        budget = TurnBudget(act_timeout=3, safety_margin=0.5, overage_share=0.1, clock=clock)
+        budget.start_turn({'remainingOverageTime': 10}, {'actTimeout': 2})
+
+        assert budget.remaining() == pytest.approx(2.5)
+        clock.now = 2
+        assert budget.remaining() == pytest.approx(0.5)
+
+    def test_fallbacks(self):
+        clock = FakeClock()
+        budget = TurnBudget(act_timeout=3, safety_margin=0, min_remaining={BudgetSteps.SWITCH_BUILDS: 1}, clock=clock)
+
+        budget.start_turn()
+        assert budget.allows(BudgetSteps.SWITCH_BUILDS)
+        clock.now = 2.5
+        assert not budget.allows(BudgetSteps.SWITCH_BUILDS)
+        assert not budget.allows(BudgetSteps.SWITCH_BUILDS)
+        assert budget.allows(BudgetSteps.MOVEMENT_ROUNDS)
+        assert budget.fallbacks == {BudgetSteps.SWITCH_BUILDS: 2}
+
+        budget.start_turn()
+        assert not budget.fallbacks
+        assert budget.total_fallbacks == {BudgetSteps.SWITCH_BUILDS: 2}
+
+    def test_no_budget_outside_of_agent(self):
+        c.LogicGlobals.reset()
+        assert time_allows(BudgetSteps.SWITCH_BUILDS)
+
+    @pytest.mark.parametrize("initialize_game", [3], indirect=['initialize_game'])
+    def test_unit_actions_when_out_of_time(self, initialize_game):
+        clock = FakeClock()
+        c.LogicGlobals.turn_budget = TurnBudget.from_hyperparameters()
+        c.LogicGlobals.turn_budget.clock = clock
+        c.LogicGlobals.turn_budget.start_turn()
+        clock.now = 10
+
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 0 0 0 0 0 0',
+                'u 0 0 u_2 1 1 0 0 0 0',
+            ], 0
+        )
+        unit_actions_this_turn = {
+            'u_1': (c.ValidActions.MOVE, gm.Position(2, 2)),
+            'u_2': (c.ValidActions.MOVE, gm.Position(0, 1))
+        }
+        for unit in c.LogicGlobals.player.units:
+            unit.set_task(*unit_actions_this_turn[unit.id])
+
+        actions, debug = agent.unit_actions(
+            c.LogicGlobals.player, c.LogicGlobals.opponent
+        )
+
+        assert len(actions) == 2
+        assert 'm u_2 w' in actions
+        assert 'm u_1 e' in actions
+        assert c.LogicGlobals.turn_budget.fallbacks[BudgetSteps.TURN_DISTANCE_MOVEMENT] == 2
+        assert c.LogicGlobals.turn_budget.fallbacks[BudgetSteps.SWITCH_BUILDS] == 1
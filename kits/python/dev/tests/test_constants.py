@@ -0,0 +1,22 @@
+import lux.constants as c
+from freeze_constants import FROZEN_CONSTANTS_PATH, render_frozen_constants
+
+
+class TestConstants:
+    def test_frozen_constants_are_up_to_date(self):
+        with open(FROZEN_CONSTANTS_PATH) as f:
+            assert f.read() == render_frozen_constants(), "Run freeze_constants.py after editing the JSON constants"
+
+    def test_derived_constants(self):
+        strategy_hyperparameters, game_constants = c.load_constants_from_json()
+        assert strategy_hyperparameters["STARTER"]["BUILDER_TO_MANAGER_RATIO_16X16"] == strategy_hyperparameters["STARTER"]["BUILDER_TO_MANAGER_STARTER_RATIO_16X16"]
+        assert game_constants["PARAMETERS"]["CYCLE_LENGTH"] == 40
+
+    def test_determinism_from_environment(self, monkeypatch):
+        monkeypatch.delenv(c.DETERMINISTIC_ENV_VAR, raising=False)
+        assert c.determinism_from_environment(True)
+        assert not c.determinism_from_environment(False)
+        monkeypatch.setenv(c.DETERMINISTIC_ENV_VAR, "1")
+        assert c.determinism_from_environment(False)
+        monkeypatch.setenv(c.DETERMINISTIC_ENV_VAR, "0")
+        assert not c.determinism_from_environment(True)
@@ -0,0 +1,87 @@
+import copy
+import pytest
+import lux.game_map as gm
+import lux.constants as c
+from lux.context import GameContext
+from agent import make_agent
+
+
+def _self_play(agents, seed, size, num_turns):
+    kaggle_environments = pytest.importorskip("kaggle_environments")
+    env = kaggle_environments.make(
+        "lux_ai_2021", configuration={"loglevel": 0, "annotations": False, "seed": seed, "width": size, "height": size}
+    )
+    env.reset(2)
+    observations, actions = [], []
+    for __ in range(num_turns):
+        turn_actions = []
+        for player_id, agent in enumerate(agents):
+            observation = copy.deepcopy(env.state[0]['observation'])
+            observation.player = observation['player'] = player_id
+            if player_id == 0:
+                observations.append(copy.deepcopy(observation))
+            turn_actions.append(agent(observation, env.configuration))
+        actions.append(turn_actions[0])
+        env.step(turn_actions)
+    return observations, actions, env.configuration
+
+
+class TestGameContext:
+    def test_bound(self, reset_agent_state):
+        reset_agent_state()
+        c.LogicGlobals.x_mult = -1
+        outer_map_cache = gm.MAP_CACHE
+        context = GameContext()
+
+        with context.bound():
+            assert c.LogicGlobals.x_mult == 1
+            assert gm.MAP_CACHE is context.map_cache
+            c.LogicGlobals.x_mult = 5
+            c.LogicGlobals.RESOURCES_BEING_COLLECTED['p'] = {'u_1'}
+            c.STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_RATIO_12X12"] = 0.5
+
+        assert c.LogicGlobals.x_mult == -1
+        assert gm.MAP_CACHE is outer_map_cache
+        assert 'p' not in c.LogicGlobals.RESOURCES_BEING_COLLECTED
+        assert c.STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_RATIO_12X12"] != 0.5
+
+        with context.bound():
+            assert c.LogicGlobals.x_mult == 5
+            assert c.LogicGlobals.RESOURCES_BEING_COLLECTED == {'p': {'u_1'}}
+            assert c.STRATEGY_HYPERPARAMETERS["STARTER"]["SPAWN_TO_RESEARCH_RATIO_12X12"] == 0.5
+        reset_agent_state()
+
+    def test_self_play_in_one_process(self, reset_agent_state):
+        observations, self_play_actions, configuration = _self_play([make_agent(), make_agent()], seed=69420, size=12, num_turns=40)
+
+        # The same observations, played by an agent that has the process to itself
+        solo_agent = make_agent()
+        solo_actions = [solo_agent(observation, configuration) for observation in observations]
+
+        assert solo_actions == self_play_actions
+        reset_agent_state()
+
+    def test_resume_from_snapshot(self, reset_agent_state):
+        observations, actions, configuration = _self_play([make_agent(), make_agent()], seed=69420, size=12, num_turns=40)
+
+        first_half = make_agent()
+        for observation in observations[:20]:
+            first_half(observation, configuration)
+        snapshot = first_half.context.snapshot()
+
+        resumed = make_agent(GameContext.from_snapshot(snapshot))
+        assert [resumed(observation, configuration) for observation in observations[20:]] == actions[20:]
+        reset_agent_state()
+
+    def test_fork(self, reset_agent_state):
+        context = GameContext()
+        with context.bound():
+            c.LogicGlobals.RESOURCES_BEING_COLLECTED['p'] = {'u_1'}
+            fork = context.fork()
+            c.LogicGlobals.RESOURCES_BEING_COLLECTED['p'].add('u_2')
+
+        with fork.bound():
+            assert c.LogicGlobals.RESOURCES_BEING_COLLECTED == {'p': {'u_1'}}
+        with context.bound():
+            assert c.LogicGlobals.RESOURCES_BEING_COLLECTED == {'p': {'u_1', 'u_2'}}
+        reset_agent_state()
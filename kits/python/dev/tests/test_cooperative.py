@@ -0,0 +1,150 @@
+from heapq import heappush, heappop
+from math import ceil
+
+import pytest
+import agent as agent
+import lux.game_map as gm
+import lux.constants as c
+from lux.cooperative import CooperativePlanner, ReservationTable
+
+
+class TestReservationTable:
+    def test_reservations(self):
+        table = ReservationTable([False, False, True])
+        table.reserve_path('u_1', [0, 1, 1], window=4)
+
+        assert not table.is_free(0, 0)
+        assert table.is_free(0, 1)
+        assert not table.is_span_free(1, 1, 4)
+        assert table.is_span_free(1, 1, 4, unit_id='u_1')
+        assert table.is_swap(1, 0, 0)
+        assert not table.is_swap(0, 1, 0)
+
+        table.reserve('u_2', 2, 0, 4)
+        assert table.is_free(2, 3)
+
+
+class TestCooperativePlanner:
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_no_collisions_in_corridor(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 2 1 0 0 0 0',
+                'u 0 0 u_2 5 1 0 0 0 0',
+                'c 1 c_1 0 23',
+            ] + [f'ct 1 c_1 {x} 0 0' for x in range(12)] + [f'ct 1 c_1 {x} 2 0' for x in range(1, 7)], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        units_by_id = {u.id: u for u in c.LogicGlobals.player.units}
+
+        # Both units want to go through the same one-tile wide corridor, in opposite directions
+        planner = CooperativePlanner(game_map, c.LogicGlobals.opponent.city_pos, window=8)
+        plans, unplanned = planner.plan([
+            (units_by_id['u_1'], gm.Position(6, 1)),
+            (units_by_id['u_2'], gm.Position(1, 1)),
+        ])
+
+        assert not unplanned
+        assert set(plans) == {'u_1', 'u_2'}
+        cells = {}
+        for (index, turn), unit_id in planner.reservations._cells.items():
+            assert cells.setdefault((index, turn), unit_id) == unit_id
+        moves = [m for m in plans.values() if m is not None]
+        assert len({pos for __, pos in moves}) == len(moves)
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_city_tiles_are_stackable(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'c 0 c_1 0 23',
+                'ct 0 c_1 5 5 0',
+                'u 0 0 u_1 4 5 0 0 0 0',
+                'u 0 0 u_2 6 5 0 0 0 0',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        units_by_id = {u.id: u for u in c.LogicGlobals.player.units}
+
+        planner = CooperativePlanner(game_map, set(), window=8)
+        plans, __ = planner.plan([
+            (units_by_id['u_1'], gm.Position(5, 5)),
+            (units_by_id['u_2'], gm.Position(5, 5)),
+        ])
+
+        assert plans == {
+            'u_1': (c.Directions.EAST, gm.Position(5, 5)),
+            'u_2': (c.Directions.WEST, gm.Position(5, 5)),
+        }
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_heuristic_is_admissible_when_leaving_own_city(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            ['c 0 c_1 0 23', 'u 0 0 u_1 5 5 0 0 0 0'] + [f'ct 0 c_1 {x} 5 0' for x in range(1, 6)], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        pathfinder = game_map.pathfinder
+        unit = c.LogicGlobals.player.units[0]
+        target = gm.Position(0, 5)
+        unit.set_task(c.ValidActions.BUILD, target)
+        assert unit.should_avoid_citytiles
+
+        # Turns from each tile to the target, with the tiles blocked as in the search of the unit
+        cooldown = c.GAME_CONSTANTS['PARAMETERS']['UNIT_ACTION_COOLDOWN'][unit.type_str]
+        costs = [ceil(cost) for cost in pathfinder.step_costs(cooldown)]
+        blocked = pathfinder.blocked_mask(unit.pos, target, avoid_own_cities=True)
+        target_index = game_map.index_of(target)
+        turns = {target_index: 0}
+        frontier = [(0, target_index)]
+        while frontier:
+            num_turns, index = heappop(frontier)
+            if num_turns > turns[index] or blocked[index]:
+                continue
+            for neighbor in pathfinder._neighbors[index]:
+                if num_turns + costs[index] < turns.get(neighbor, float('inf')):
+                    turns[neighbor] = num_turns + costs[index]
+                    heappush(frontier, (turns[neighbor], neighbor))
+
+        # The own city is open to the unit leaving it, so tiles east of it are closer than around it
+        planner = CooperativePlanner(game_map, set(), window=12)
+        heuristic = planner._heuristic(unit.pos, target, cooldown, True)
+        for index, num_turns in turns.items():
+            if not blocked[index]:
+                assert heuristic(index) <= num_turns, game_map.position_at(index)
+
+        plans, __ = planner.plan([(unit, target)])
+        assert plans == {'u_1': (c.Directions.WEST, gm.Position(4, 5))}
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_time_cap(self, initialize_game):
+        c.LogicGlobals.game_state.update(['u 0 0 u_1 4 5 0 0 0 0'], 0)
+        unit = c.LogicGlobals.player.units[0]
+
+        planner = CooperativePlanner(c.LogicGlobals.game_state.map, set(), time_cap=-1)
+        plans, unplanned = planner.plan([(unit, gm.Position(8, 5))])
+
+        assert not plans
+        assert unplanned == [(unit, gm.Position(8, 5))]
+
+    @pytest.mark.parametrize("initialize_game", [3], indirect=['initialize_game'])
+    def test_unit_actions_with_planner(self, initialize_game, monkeypatch):
+        monkeypatch.setitem(c.STRATEGY_HYPERPARAMETERS["COOPERATIVE_PLANNER"], "ENABLED", 1)
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 0 0 0 0 0 0',
+                'u 0 0 u_2 1 1 0 0 0 0',
+            ], 0
+        )
+        unit_actions_this_turn = {
+            'u_1': (c.ValidActions.MOVE, gm.Position(2, 2)),
+            'u_2': (c.ValidActions.MOVE, gm.Position(0, 1))
+        }
+        for unit in c.LogicGlobals.player.units:
+            unit.set_task(*unit_actions_this_turn[unit.id])
+
+        actions, debug = agent.unit_actions(
+            c.LogicGlobals.player, c.LogicGlobals.opponent
+        )
+
+        # u_1 is planned first and passes through (0, 1), so u_2 waits for it to clear
+        assert actions == ['m u_1 s']
+        assert c.LogicGlobals.player.get_unit_by_id('u_2').turns_spent_waiting_to_move == 1
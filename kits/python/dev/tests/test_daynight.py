@@ -0,0 +1,79 @@
+import numpy as np
+import lux.constants as c
+from lux.daynight import DAY_NIGHT
+
+
+NIGHT_LENGTH = c.GAME_CONSTANTS["PARAMETERS"]["NIGHT_LENGTH"]
+DAY_LENGTH = c.GAME_CONSTANTS["PARAMETERS"]["DAY_LENGTH"]
+CYCLE_LENGTH = c.GAME_CONSTANTS["PARAMETERS"]["CYCLE_LENGTH"]
+
+
+def _travel_turns_by_stepping(turn, num_turns, cooldown):
+    num_turns_to_add = 0
+    num_turns_left = num_turns - 1
+    turn_number = turn + 1
+    while num_turns_left > 0:
+        if c.is_turn_during_night(turn_number):
+            num_turns_to_add += cooldown
+            turn_number += cooldown
+        turn_number += cooldown
+        num_turns_left -= cooldown
+    return num_turns + num_turns_to_add
+
+
+def _night_turns_by_stepping(turns_until_next_night, num_turns):
+    num_turns_left = num_turns - turns_until_next_night
+    num_night_turns = 0
+    while num_turns_left > NIGHT_LENGTH:
+        num_night_turns += NIGHT_LENGTH
+        num_turns_left -= DAY_LENGTH
+    return num_night_turns + max(0, num_turns_left)
+
+
+def _turns_can_survive_by_stepping(turns_until_next_night, num_night_turns):
+    num_turns = turns_until_next_night
+    while num_night_turns > NIGHT_LENGTH:
+        num_turns += CYCLE_LENGTH
+        num_night_turns -= NIGHT_LENGTH
+    return num_turns + num_night_turns
+
+
+class TestDayNightCycle:
+    def test_is_night(self):
+        for turn in range(c.GAME_CONSTANTS["PARAMETERS"]["MAX_DAYS"]):
+            assert DAY_NIGHT.is_night(turn) == c.is_turn_during_night(turn)
+
+    def test_travel_turns(self):
+        for cooldown in [1, 2, 3]:
+            for turn in range(0, 360, 3):
+                for num_turns in [1, 2, 3, 4.5, 7, 20, 31, 64, 150]:
+                    assert DAY_NIGHT.travel_turns(turn, num_turns, cooldown) == _travel_turns_by_stepping(turn, num_turns, cooldown)
+
+    def test_night_turns_en_route(self):
+        for turns_until_next_night in range(0, DAY_LENGTH + 1):
+            for num_turns in [0, 1, 5, 10.5, 30, 41, 77, 150, 400]:
+                assert DAY_NIGHT.night_turns_en_route(turns_until_next_night, num_turns) == _night_turns_by_stepping(turns_until_next_night, num_turns)
+        assert DAY_NIGHT.fuel_needed(0, 15, 4) == 4 * _night_turns_by_stepping(0, 15)
+
+    def test_turns_can_survive(self):
+        for turns_until_next_night in range(0, DAY_LENGTH + 1, 5):
+            for num_night_turns in [0, 3.5, 10, 10.25, 20, 25, 99.9, 400]:
+                assert DAY_NIGHT.turns_can_survive(turns_until_next_night, num_night_turns) == _turns_can_survive_by_stepping(turns_until_next_night, num_night_turns)
+
+    def test_vectorized(self):
+        turns_until_next_night = np.array([0, 5, 30, 12])
+        num_turns = np.array([1, 17, 64, 150])
+        fuel = np.array([0.0, 12.5, 30.0, 101.0])
+
+        np.testing.assert_array_equal(
+            DAY_NIGHT.travel_turns(100, num_turns, 2),
+            [_travel_turns_by_stepping(100, n, 2) for n in num_turns]
+        )
+        np.testing.assert_array_equal(
+            DAY_NIGHT.night_turns_en_route(turns_until_next_night, num_turns),
+            [_night_turns_by_stepping(t, n) for t, n in zip(turns_until_next_night, num_turns)]
+        )
+        np.testing.assert_array_equal(
+            DAY_NIGHT.turns_can_survive(turns_until_next_night, fuel),
+            [_turns_can_survive_by_stepping(t, f) for t, f in zip(turns_until_next_night, fuel)]
+        )
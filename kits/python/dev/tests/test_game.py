@@ -56,6 +56,62 @@ class TestGame:
         c.LogicGlobals.game_state.update([], 0)
         assert c.LogicGlobals.game_state.turns_until_next_night == 30
 
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_incremental_map_update(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'r wood 1 1 400',
+                'r coal 5 5 300',
+                'c 0 c_1 0 23',
+                'ct 0 c_1 3 3 0',
+                'ccd 3 3 6',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        clusters = game_map.resource_clusters
+        assert len(clusters) == 2
+
+        c.LogicGlobals.game_state.update(
+            [
+                'r wood 1 1 380',
+                'c 0 c_1 0 23',
+                'ct 0 c_1 3 3 0',
+                'ccd 3 3 6',
+                'ccd 7 7 0.75',
+            ], 0
+        )
+
+        assert c.LogicGlobals.game_state.map is game_map
+        assert game_map.resource_clusters is not None
+        assert {cl.id for cl in game_map.resource_clusters} <= {cl.id for cl in clusters}
+        assert game_map.get_cell(1, 1).resource.amount == 380
+        assert game_map.get_cell(5, 5).resource is None
+        assert game_map.get_cell(7, 7).road == 0.75
+        assert game_map.get_cell(3, 3).citytile is c.LogicGlobals.player.cities['c_1'].citytiles[0]
+        assert game_map.resources_changed[1, 1] and game_map.resources_changed[5, 5]
+        assert game_map.resources_changed.sum() == 2
+        assert game_map.roads_changed[7, 7] and game_map.roads_changed.sum() == 1
+        assert not game_map.city_tiles_changed.any()
+
+        c.LogicGlobals.game_state.update(['r wood 1 1 380'], 0)
+
+        assert game_map.get_cell(3, 3).citytile is None
+        assert game_map.get_cell(3, 3).road == 0
+        assert game_map.city_tiles_changed[3, 3] and game_map.city_tiles_changed.sum() == 1
+        assert not game_map.resources_changed.any()
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_non_incremental_map_update(self, initialize_game):
+        c.LogicGlobals.game_state = g.Game(0, "12 12", incremental_map=False)
+        c.LogicGlobals.game_state.update(['r wood 1 1 400'], 0)
+        game_map = c.LogicGlobals.game_state.map
+        clusters = game_map.resource_clusters
+        c.LogicGlobals.game_state.update(['r wood 1 1 400'], 0)
+
+        assert c.LogicGlobals.game_state.map is not game_map
+        assert c.LogicGlobals.game_state.map.resource_clusters == clusters
+        assert c.LogicGlobals.game_state.map.get_cell(1, 1).resource.amount == 400
+
     @pytest.mark.parametrize("initialize_game", [32], indirect=['initialize_game'])
     def test_correct_turn_state(self, initialize_game):
         c.LogicGlobals.game_state.update(
@@ -1,3 +1,6 @@
+import pickle
+import warnings
+import numpy as np
 import pytest
 import lux.game as g
 import lux.game_map as gm
@@ -226,6 +229,253 @@ class TestGameMap:
         assert c.LogicGlobals.game_state.map.get_cell(0, 3).resource is not None
         assert c.LogicGlobals.game_state.map.get_cell(0, -1) is None
 
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_map_arrays(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'r coal 0 3 419',
+                'r wood 5 2 300',
+                'u 0 0 u_1 4 7 0 0 0 0',
+                'c 0 c_1 0 23',
+                'c 1 c_2 0 23',
+                'ct 0 c_1 4 7 0',
+                'ct 1 c_2 9 9 0',
+                'ccd 4 7 6',
+                'ccd 9 9 6',
+                'ccd 1 1 1.5',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+
+        assert game_map.resource_type[3, 0] == gm.RESOURCE_CODES[c.ResourceTypes.COAL]
+        assert game_map.resource_amount[3, 0] == 419
+        assert game_map.resource_type[2, 5] == gm.RESOURCE_CODES[c.ResourceTypes.WOOD]
+        assert game_map.resource_type[5, 5] == gm.NO_RESOURCE
+        assert game_map.resource_mask().sum() == 2
+        assert game_map.resource_mask(c.ResourceTypes.COAL).sum() == 1
+        assert game_map.road[1, 1] == 1.5
+        assert game_map.city_tile_team[7, 4] == 0
+        assert game_map.city_tile_team[9, 9] == 1
+        assert game_map.city_tile_team[0, 0] == gm.NO_TEAM
+        assert game_map.city_id_from_code(game_map.city_id[7, 4]) == 'c_1'
+        assert game_map.city_id_from_code(game_map.city_id[9, 9]) == 'c_2'
+        assert game_map.city_id_from_code(game_map.city_id[0, 0]) is None
+
+        cell = game_map.get_cell(0, 3)
+        assert cell.resource.type == c.ResourceTypes.COAL
+        assert cell.resource.amount == 419
+        assert game_map.get_cell(4, 7).citytile.cityid == 'c_1'
+        assert game_map.get_cell(4, 7).road == 6
+        assert game_map.get_cell(5, 5).is_empty()
+
+        cell.resource = None
+        assert game_map.resource_type[3, 0] == gm.NO_RESOURCE
+        assert not cell.has_resource()
+        assert [cell.pos for cell in game_map.resources()] == [gm.Position(5, 2)]
+
+
+    def test_neighbor_table(self):
+        game_map = gm.GameMap(5, 5)
+        corner = gm.Position(0, 0)
+        center = gm.Position(2, 2)
+
+        assert set(game_map.adjacent_positions(corner, include_center=False)) == {gm.Position(1, 0), gm.Position(0, 1)}
+        assert set(game_map.adjacent_positions(corner, include_center=True, include_diagonals=True)) == {
+            corner, gm.Position(1, 0), gm.Position(0, 1), gm.Position(1, 1)
+        }
+        assert set(game_map.adjacent_positions(center, include_center=False)) == center.adjacent_positions(include_center=False)
+        assert set(game_map.adjacent_positions(center, include_diagonals=True)) == center.adjacent_positions(include_diagonals=True)
+        assert set(game_map.adjacent_positions(gm.Position(-1, 0), include_center=True)) == {corner}
+
+        indices = game_map.neighbor_table.cardinal_indices[game_map.index_of(corner)]
+        assert sorted(indices.tolist()) == [-1, -1, 1, 5]
+        assert (game_map.neighbor_table.all_indices[game_map.index_of(center)] >= 0).all()
+        assert game_map.neighbor_table is gm.GameMap(5, 5).neighbor_table
+
+    def test_label_components(self):
+        codes = np.array([
+            [0, -1, 1, 1],
+            [-1, 0, -1, 1],
+            [0, -1, 0, -1],
+        ])
+
+        labels, components = gm.label_components(codes, connectivity=8)
+        assert labels.tolist() == [
+            [0, -1, 1, 1],
+            [-1, 0, -1, 1],
+            [0, -1, 0, -1],
+        ]
+        assert components == [[0, 8, 5, 10], [2, 3, 7]]
+
+        labels, components = gm.label_components(codes, connectivity=4)
+        assert labels.tolist() == [
+            [0, -1, 3, 3],
+            [-1, 2, -1, 3],
+            [1, -1, 4, -1],
+        ]
+        assert len(components) == 5
+
+        with pytest.raises(ValueError):
+            gm.label_components(codes, connectivity=6)
+
+    def test_label_components_of_large_field(self):
+        codes = np.zeros((32, 32), dtype=np.int8)
+        labels, components = gm.label_components(codes, connectivity=8)
+        assert (labels == 0).all()
+        assert len(components) == 1 and len(components[0]) == 32 * 32
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_find_clusters_connects_all_diagonals(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'r wood 5 5 100',
+                'r wood 4 4 100',
+                'r wood 6 6 100',
+                'r coal 7 7 100',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        game_map.find_clusters()
+
+        assert len(game_map.resource_clusters) == 2
+        wood_cluster = game_map.clusters_by_label[game_map.cluster_labels[5, 5]]
+        assert wood_cluster.type == c.ResourceTypes.WOOD
+        assert set(wood_cluster.resource_positions) == {gm.Position(4, 4), gm.Position(5, 5), gm.Position(6, 6)}
+        assert game_map.cluster_labels[6, 6] == game_map.cluster_labels[4, 4]
+        assert game_map.cluster_labels[7, 7] != game_map.cluster_labels[6, 6]
+        assert game_map.cluster_labels[0, 0] == gm.NO_CLUSTER
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_cluster_lookups(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'r wood 2 2 100',
+                'r wood 3 2 100',
+                'r wood 4 4 100',
+                'r coal 6 4 100',
+                'r uranium 10 10 100',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+
+        for cluster in game_map.resource_clusters:
+            assert game_map.get_cluster_by_id(cluster.id) is cluster
+        assert game_map.get_cluster_by_id(0) is None
+
+        for x in range(-1, 13):
+            for y in range(-1, 13):
+                pos = gm.Position(x, y)
+                expected = None
+                for cluster in game_map.resource_clusters:
+                    if (cluster.min_loc[0] - 1 <= x <= cluster.max_loc[0] + 1) and (
+                            cluster.min_loc[1] - 1 <= y <= cluster.max_loc[1] + 1) or pos in cluster.pos_to_defend:
+                        expected = cluster
+                        break
+                assert game_map.position_to_cluster(pos) is expected
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_score_clusters(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 1 u_1 3 0 0 0 0 0',
+                'r wood 0 0 300',
+                'r wood 0 1 100',
+                'r wood 6 6 250',
+                'r coal 11 11 50',
+                'c 0 c_1 0 23',
+                'ct 0 c_1 5 6 0',
+                'c 1 c_2 0 23',
+                'ct 1 c_2 10 11 0',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        player, opponent = c.LogicGlobals.player, c.LogicGlobals.opponent
+
+        def expected_score(cluster, scaling_factor, player=player, opponent=opponent):
+            score = cluster.total_amount / scaling_factor
+            score /= max(1, len(cluster.pos_defended))
+            score /= min([1] + [cluster.center_pos.distance_to(p) for p in player.city_pos])
+            score *= min(
+                [1]
+                + [cluster.center_pos.distance_to(p) for p in opponent.city_pos]
+                + [cluster.center_pos.distance_to(u.pos) for u in opponent.units]
+            )
+            return score
+
+        clusters = [cl for cl in game_map.resource_clusters if cl.center_pos not in player.city_pos]
+        scores = game_map.score_clusters(clusters, player, opponent, scaling_factor=300)
+        assert len(scores) == len(clusters) == 3
+        for cluster in clusters:
+            assert scores[cluster] == cluster.current_score == expected_score(cluster, 300)
+            assert cluster.calculate_score(player, opponent, scaling_factor=7) == expected_score(cluster, 7)
+
+        def double(scores, context):
+            return scores * 2
+
+        scores = game_map.score_clusters(clusters, player, opponent, terms=gm.CLUSTER_SCORE_TERMS + [double])
+        for cluster in clusters:
+            assert scores[cluster] == 2 * expected_score(cluster, 1)
+        assert game_map.score_clusters([], player, opponent) == {}
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_score_clusters_from_other_points_of_view(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 1 u_1 9 8 0 0 0 0',
+                'r wood 9 8 250',
+                'r wood 4 4 100',
+                'r wood 6 4 100',
+                'r wood 5 3 100',
+                'r wood 5 5 100',
+                'c 0 c_1 0 23',
+                'ct 0 c_1 5 4 0',
+                'c 1 c_2 0 23',
+                'ct 1 c_2 10 11 0',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        player, opponent = c.LogicGlobals.player, c.LogicGlobals.opponent
+        occupied = game_map.get_cluster_by_id(hash((gm.Position(9, 8),)))
+        surrounding = next(cl for cl in game_map.resource_clusters if cl.center_pos == gm.Position(5, 4))
+
+        # The opponent unit on the center of `occupied` only counts against it from the player's side
+        assert game_map.score_clusters([occupied], player, opponent)[occupied] == 0
+        assert game_map.score_clusters([occupied], opponent, player)[occupied] == 250
+        assert occupied.calculate_score(opponent, player, game_map=game_map) == 250
+
+        # A city on the center takes the cluster from either side, without dividing by zero
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            assert game_map.score_clusters([surrounding], player, opponent)[surrounding] == 0
+            assert game_map.score_clusters([surrounding], opponent, player)[surrounding] == 0
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_update_clusters_skips_unchanged_clusters(self, initialize_game):
+        updates = [
+            'u 0 0 u_1 0 0 0 0 0 0',
+            'u 0 1 u_2 11 11 0 0 0 0',
+            'r wood 2 2 100',
+            'r wood 3 2 100',
+            'r coal 8 8 100',
+        ]
+        c.LogicGlobals.game_state.update(updates, 0)
+        game_map = c.LogicGlobals.game_state.map
+        assert game_map.skipped_cluster_updates == 0
+
+        c.LogicGlobals.game_state.update(updates, 0)
+        assert game_map.skipped_cluster_updates == 2
+
+        c.LogicGlobals.game_state.update(updates[:3] + ['r wood 3 2 90', 'r coal 8 8 100', 'c 0 c_1 0 23', 'ct 0 c_1 2 3 0'], 0)
+        assert game_map.skipped_cluster_updates == 1
+        wood_cluster = game_map.position_to_cluster(gm.Position(2, 2))
+        assert wood_cluster.total_amount == 190
+        assert wood_cluster.pos_defended == [gm.Position(2, 3)]
+
+        fresh_cluster = gm.ResourceCluster(wood_cluster.type, wood_cluster.resource_positions)
+        fresh_cluster.update_state(game_map, c.LogicGlobals.opponent)
+        for attr in ['total_amount', 'pos_to_defend', 'pos_defended', 'city_ids', 'needs_defending_from_opponent']:
+            assert getattr(fresh_cluster, attr) == getattr(wood_cluster, attr)
+
 
 class TestPosition:
     def test_xy(self):
@@ -255,6 +505,32 @@ class TestPosition:
         pos = gm.Position(10, 10)
         assert pos == gm.Position(10, 10)
 
+    def test_interned(self):
+        pos = gm.Position(10, 10)
+        assert pos is gm.Position(10, 10)
+        assert pos is pos.translate(c.Directions.NORTH, 1).translate(c.Directions.SOUTH, 1)
+        assert gm.Position(-1, 3) == gm.Position(-1, 3)
+        assert gm.Position(2.5, 3) == gm.Position(2.5, 3)
+        assert hash(gm.Position(-1, 3)) == hash(gm.Position(-1, 3))
+        assert len({pos, gm.Position(10, 10), gm.Position(-1, 3), gm.Position(-1, 3)}) == 2
+        with pytest.raises(AttributeError):
+            pos.some_attribute = None
+
+    def test_pickle_keeps_interning(self):
+        pos = gm.Position(3, 4)
+        assert pickle.loads(pickle.dumps(pos)) is pos
+        assert pickle.loads(pickle.dumps(gm.Position(-3, 4))) == gm.Position(-3, 4)
+
+    def test_position_table(self):
+        table = gm.position_table(12, 12)
+        assert table is gm.position_table(12, 12)
+        assert len(table) == 144
+        assert table[5 * 12 + 3] is gm.Position(3, 5)
+
+        game_map = gm.GameMap(12, 12)
+        assert game_map.index_of(gm.Position(3, 5)) == 63
+        assert game_map.position_at(63) is gm.Position(3, 5)
+
     def test_adjacent_pos(self):
         pos = gm.Position(10, 10)
         assert gm.Position(10, 9) in pos.adjacent_positions(include_center=True)
@@ -93,3 +93,38 @@ class TestCity:
 
         for c_id, city in c.LogicGlobals.player.cities.items():
             assert city.num_turns_can_survive >= 360
+
+
+class TestUnitRegistry:
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_units_persist_between_turns(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 3 2 0 0 0 0',
+                'u 0 0 u_2 5 5 0 0 0 0',
+                'u 0 1 u_3 8 8 0 0 0 0',
+            ], 0
+        )
+        unit = c.LogicGlobals.player.get_unit_by_id('u_1')
+        unit.set_task(c.ValidActions.MOVE, gm.Position(3, 5))
+        unit.task_q.append((c.ValidActions.BUILD, gm.Position(3, 5)))
+
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 3 3 1 20 0 0',
+                'u 0 1 u_3 8 7 0 0 0 0',
+            ], 0
+        )
+
+        assert c.LogicGlobals.player.get_unit_by_id('u_1') is unit
+        assert unit.pos == gm.Position(3, 3)
+        assert unit.cooldown == 1
+        assert unit.cargo.wood == 20
+        assert list(unit.previous_pos) == [gm.Position(3, 2), gm.Position(3, 3)]
+        assert unit.current_task == (c.ValidActions.MOVE, gm.Position(3, 5))
+        assert list(unit.task_q) == [(c.ValidActions.BUILD, gm.Position(3, 5))]
+
+        units = c.LogicGlobals.game_state.units
+        assert 'u_2' not in units
+        assert units.get('u_3') is c.LogicGlobals.opponent.get_unit_by_id('u_3')
+        assert len(units) == 2
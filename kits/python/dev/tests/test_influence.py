@@ -0,0 +1,39 @@
+import pytest
+import lux.game_map as gm
+import lux.constants as c
+
+
+class TestInfluenceMaps:
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_distance_grids(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 1 1 0 0 0 0',
+                'u 0 0 u_2 9 2 0 0 0 0',
+                'u 0 1 u_3 6 6 0 0 0 0',
+                'c 1 c_1 0 23',
+                'ct 1 c_1 10 10 0',
+                'ct 1 c_1 10 11 0',
+            ], 0
+        )
+        influence = c.LogicGlobals.game_state.map.influence
+        player, opponent = c.LogicGlobals.player, c.LogicGlobals.opponent
+
+        for x in range(12):
+            for y in range(12):
+                pos = gm.Position(x, y)
+                assert influence.at('player_units', pos) == min(pos.distance_to(u.pos) for u in player.units)
+                assert influence.at('opponent_units', pos) == min(pos.distance_to(u.pos) for u in opponent.units)
+                assert influence.at('opponent_cities', pos) == min(pos.distance_to(p) for p in opponent.city_pos)
+                assert influence.at('opponent_presence', pos) == min(
+                    [pos.distance_to(u.pos) for u in opponent.units] + [pos.distance_to(p) for p in opponent.city_pos]
+                )
+                assert influence.at('player_cities', pos) == c.INFINITE_DISTANCE
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_empty_map(self, initialize_game):
+        c.LogicGlobals.game_state.update([], 0)
+        influence = c.LogicGlobals.game_state.map.influence
+
+        for layer in influence.LAYERS:
+            assert (getattr(influence, layer) == c.INFINITE_DISTANCE).all()
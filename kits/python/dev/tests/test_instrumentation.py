@@ -0,0 +1,41 @@
+import json
+from collections import Counter
+from lux.instrumentation import Instrumentation
+from summarize_instrumentation import read_records, summarize
+
+
+class TestInstrumentation:
+    def test_disabled(self, tmp_path):
+        instrumentation = Instrumentation(None)
+        instrumentation.begin_turn()
+        with instrumentation.phase('propose_action'):
+            pass
+        instrumentation.end_turn(0)
+
+        assert not instrumentation.times
+        assert instrumentation.phase('a') is instrumentation.phase('b')
+
+    def test_records(self, tmp_path):
+        path = tmp_path / 'turns.jsonl'
+        instrumentation = Instrumentation(str(path))
+        for turn in range(3):
+            instrumentation.begin_turn()
+            instrumentation.record_since_turn_start('game_update')
+            for __ in range(turn + 1):
+                with instrumentation.phase('propose_action'):
+                    pass
+            instrumentation.end_turn(
+                turn, 0, pathfinder=Counter(distance_field_hits=3, distance_field_misses=1)
+            )
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [r['turn'] for r in records] == [0, 1, 2]
+        assert records[2]['phases']['propose_action']['calls'] == 3
+        assert records[0]['counters'] == {'pathfinder': {'distance_field_hits': 3, 'distance_field_misses': 1}}
+
+        summary = summarize(read_records([str(path)]))
+        assert summary['turns'] == 3
+        assert summary['phases']['propose_action']['calls'] == 6
+        assert summary['phases']['game_update']['calls'] == 3
+        assert summary['counters']['pathfinder']['distance_field_hits'] == 9
+        assert summary['hit_rates'] == {'distance field cache': 0.75}
@@ -0,0 +1,33 @@
+import io
+from lux.logger import Logger
+
+
+class Unformattable:
+    def __str__(self):
+        raise AssertionError("Message of a disabled level was formatted")
+
+
+class TestLogger:
+    def test_levels(self):
+        stream = io.StringIO()
+        logger = Logger(stream, level="INFO")
+
+        logger.debug("Unit %s", Unformattable())
+        logger("Unit %s", Unformattable())
+        logger.info("Unit %s at %s", 'u_1', (1, 2))
+        logger.warning("no args %s")
+
+        assert stream.getvalue() == "Unit u_1 at (1, 2)\nno args %s\n"
+        assert logger.is_enabled_for("WARNING")
+        assert not logger.is_enabled_for("DEBUG")
+
+    def test_off(self):
+        stream = io.StringIO()
+        logger = Logger(stream, level="OFF")
+
+        logger.warning("Unit %s", Unformattable())
+        assert stream.getvalue() == ""
+
+        logger.set_level("DEBUG")
+        logger("Unit %s", 'u_1')
+        assert stream.getvalue() == "Unit u_1\n"
@@ -0,0 +1,78 @@
+import pytest
+import lux.game_map as gm
+import lux.constants as c
+from lux.movement import MovementResolver
+from collections import deque
+
+
+def _set_moves(units_by_id, moves, targets):
+    for unit_id, dirs in moves.items():
+        unit = units_by_id[unit_id]
+        unit.dirs_to_move = deque((d, unit.pos.translate(d, 1)) for d in dirs)
+        unit.move_target = targets[unit_id]
+
+
+class TestMovementResolver:
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_passing_through_beats_arriving(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 1 1 0 0 0 0',
+                'u 0 0 u_2 3 1 0 0 0 0',
+            ], 0
+        )
+        player = c.LogicGlobals.player
+        units_by_id = {u.id: u for u in player.units}
+
+        # u_1 only passes through (2, 1), u_2 wants to stop there
+        _set_moves(
+            units_by_id,
+            {'u_1': [c.Directions.EAST, c.Directions.SOUTH], 'u_2': [c.Directions.WEST]},
+            {'u_1': gm.Position(5, 1), 'u_2': gm.Position(2, 1)}
+        )
+        actions, __ = MovementResolver(player, set(), [], []).resolve(set(player.units))
+
+        assert actions == ['m u_1 e']
+        assert units_by_id['u_2'].turns_spent_waiting_to_move == 1
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_crowded_tile_and_city(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'c 0 c_1 0 23',
+                'ct 0 c_1 5 5 0',
+                'u 0 0 u_1 4 5 0 0 0 0',
+                'u 0 0 u_2 6 5 0 0 0 0',
+                'u 0 0 u_3 1 2 0 0 0 0',
+                'u 0 0 u_4 3 2 0 0 0 0',
+                'u 0 0 u_5 2 1 0 0 0 0',
+            ], 0
+        )
+        player = c.LogicGlobals.player
+        units_by_id = {u.id: u for u in player.units}
+
+        _set_moves(
+            units_by_id,
+            {
+                'u_1': [c.Directions.EAST], 'u_2': [c.Directions.WEST],
+                'u_3': [c.Directions.EAST], 'u_4': [c.Directions.WEST],
+                'u_5': [c.Directions.SOUTH, c.Directions.WEST],
+            },
+            {
+                'u_1': gm.Position(5, 5), 'u_2': gm.Position(5, 5),
+                'u_3': gm.Position(2, 2), 'u_4': gm.Position(2, 2), 'u_5': gm.Position(2, 5),
+            }
+        )
+        units_by_id['u_4'].turns_spent_waiting_to_move = 2
+        blocked_positions = set()
+        actions, __ = MovementResolver(player, blocked_positions, [], []).resolve(set(player.units))
+
+        # Every unit can move into an own city tile
+        assert 'm u_1 e' in actions
+        assert 'm u_2 w' in actions
+        # u_5 is passing through (2, 2), and gets it over u_3 and u_4
+        assert 'm u_5 s' in actions
+        assert len(actions) == 3
+        assert gm.Position(2, 2) in blocked_positions
+        assert units_by_id['u_3'].turns_spent_waiting_to_move == 1
+        assert units_by_id['u_4'].turns_spent_waiting_to_move == 3
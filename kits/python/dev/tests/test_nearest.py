@@ -0,0 +1,82 @@
+import pytest
+import lux.game_map as gm
+import lux.constants as c
+
+
+def _brute_force_closest(pos, positions, tie_breaker_func=None):
+    if not positions:
+        return None
+    if tie_breaker_func is None:
+        return min(positions, key=lambda p: (pos.distance_to(p), c.LogicGlobals.x_mult * p.x, c.LogicGlobals.y_mult * p.y))
+    return min(positions, key=lambda p: (pos.distance_to(p), tie_breaker_func(p), c.LogicGlobals.x_mult * p.x, c.LogicGlobals.y_mult * p.y))
+
+
+class TestNearestFeatureIndex:
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_closest_resource(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'r wood 2 2 100',
+                'r wood 6 2 100',
+                'r wood 4 6 100',
+                'r coal 9 9 100',
+                'r coal 0 11 100',
+                'r uranium 5 5 100',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        wood = [gm.Position(2, 2), gm.Position(6, 2), gm.Position(4, 6)]
+        wood_and_coal = wood + [gm.Position(9, 9), gm.Position(0, 11)]
+
+        for x_mult, y_mult in [(1, 1), (-1, 1), (1, -1)]:
+            c.LogicGlobals.x_mult, c.LogicGlobals.y_mult = x_mult, y_mult
+            for x in range(12):
+                for y in range(12):
+                    pos = gm.Position(x, y)
+                    assert pos.find_closest_resource(c.LogicGlobals.player, game_map) == _brute_force_closest(pos, wood)
+                    assert pos._find_closest_resource(
+                        [c.ResourceTypes.WOOD, c.ResourceTypes.COAL], game_map
+                    ) == _brute_force_closest(pos, wood_and_coal)
+                    assert pos._find_closest_resource(
+                        [c.ResourceTypes.WOOD, c.ResourceTypes.COAL], game_map, tie_breaker_func=lambda p: -p.y
+                    ) == _brute_force_closest(pos, wood_and_coal, tie_breaker_func=lambda p: -p.y)
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_closest_resource_for_collecting(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'r wood 2 2 100',
+                'r wood 6 2 100',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        pos = gm.Position(3, 2)
+
+        assert pos.find_closest_resource_for_collecting(c.LogicGlobals.player, game_map) == gm.Position(2, 2)
+        c.LogicGlobals.RESOURCES_BEING_COLLECTED[gm.Position(2, 2)] = {'u_1', 'u_2', 'u_3'}
+        assert pos.find_closest_resource_for_collecting(c.LogicGlobals.player, game_map) == gm.Position(2, 2)
+        c.LogicGlobals.RESOURCES_BEING_COLLECTED[gm.Position(2, 2)].add('u_4')
+        assert pos.find_closest_resource_for_collecting(c.LogicGlobals.player, game_map) == gm.Position(6, 2)
+        assert pos.find_closest_resource(c.LogicGlobals.player, game_map) == gm.Position(2, 2)
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_closest_city_tile(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'c 0 c_1 0 23',
+                'c 1 c_2 0 23',
+                'ct 0 c_1 1 1 0',
+                'ct 0 c_1 1 2 0',
+                'ct 0 c_1 8 8 0',
+                'ct 1 c_2 5 5 0',
+            ], 0
+        )
+        game_map = c.LogicGlobals.game_state.map
+        player = c.LogicGlobals.player
+
+        for x in range(12):
+            for y in range(12):
+                pos = gm.Position(x, y)
+                expected = min(player.city_pos, key=pos.distance_to)
+                assert pos.find_closest_city_tile(player, game_map) == expected
+        assert gm.Position(5, 5).find_closest_city_tile(c.LogicGlobals.opponent, game_map) == gm.Position(5, 5)
@@ -0,0 +1,165 @@
+import pytest
+import lux.game_map as gm
+import lux.constants as c
+import lux.pathfinding as pf
+
+
+class TestPathFinder:
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_turn_distance_uses_roads(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'ccd 1 0 2',
+                'ccd 2 0 2',
+            ], 0
+        )
+        pathfinder = c.LogicGlobals.game_state.map.pathfinder
+
+        assert pathfinder.turn_distance(gm.Position(0, 0), gm.Position(3, 0), 2) == 3
+        assert pathfinder.turn_distance(gm.Position(0, 0), gm.Position(3, 0), 2, include_target_road=True) == 4
+        assert pathfinder.turn_distance(gm.Position(0, 0), gm.Position(0, 3), 2) == 5
+        assert pathfinder.turn_distance(gm.Position(0, 0), gm.Position(0, 0), 2) == 0
+        assert pathfinder.turn_distance(gm.Position(0, 0), gm.Position(0, 12), 2) == c.INFINITE_DISTANCE
+        assert pathfinder.turn_distance(gm.Position(0, 0), gm.Position(11, 11), 2) == 22 * 2
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_busy_units_on_cities_block_paths(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 1 0 0 0 0 0',
+                'c 0 c_1 0 23',
+                'c 0 c_2 0 23',
+                'ct 0 c_1 1 0 0',
+                'ct 0 c_2 1 1 0',
+            ], 0
+        )
+        pathfinder = c.LogicGlobals.game_state.map.pathfinder
+        unit = c.LogicGlobals.player.units[0]
+
+        assert pathfinder.pathing_distance(gm.Position(0, 0), gm.Position(2, 0)) == 2
+
+        unit.set_task(c.ValidActions.MANAGE, gm.Position(1, 0))
+        assert pathfinder.pathing_distance(gm.Position(0, 0), gm.Position(2, 0)) == 4
+        assert pathfinder.pathing_distance(gm.Position(0, 0), gm.Position(2, 0), avoid_own_cities=True) == 6
+        assert pathfinder.pathing_distance(gm.Position(0, 0), gm.Position(1, 1)) == 2
+
+        unit.set_task(c.ValidActions.MOVE, gm.Position(5, 5))
+        assert pathfinder.pathing_distance(gm.Position(0, 0), gm.Position(2, 0)) == 2
+        assert pathfinder.pathing_distance(gm.Position(0, 0), gm.Position(2, 0), avoid_own_cities=True) == 6
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_opponent_cities_block_paths(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'c 1 c_1 0 23',
+                'ct 1 c_1 1 0 0',
+                'ct 1 c_1 1 1 0',
+                'ct 1 c_1 1 2 0',
+            ], 0
+        )
+        pathfinder = c.LogicGlobals.game_state.map.pathfinder
+
+        assert pathfinder.pathing_distance(gm.Position(0, 0), gm.Position(2, 0)) == 8
+        assert pathfinder.pathing_distance(gm.Position(0, 0), gm.Position(1, 1)) == 2
+        assert pathfinder.tile_distance(gm.Position(0, 0), gm.Position(2, 0)) == 2
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_tile_distance(self, initialize_game):
+        c.LogicGlobals.game_state.update([], 0)
+        pathfinder = c.LogicGlobals.game_state.map.pathfinder
+        corner = {gm.Position(1, 0), gm.Position(1, 1), gm.Position(0, 1)}
+        wall = {gm.Position(1, y) for y in range(12)}
+
+        assert pathfinder.tile_distance(gm.Position(0, 0), gm.Position(2, 0)) == 2
+        assert pathfinder.tile_distance(gm.Position(0, 0), gm.Position(1, 0), positions_to_avoid=wall) == 1
+        assert pathfinder.tile_distance(gm.Position(2, 0), gm.Position(0, 0), positions_to_avoid=corner) == pf.UNREACHABLE_DISTANCE
+        # The search gives up once it is as far out as the search radius
+        assert pathfinder.tile_distance(gm.Position(0, 0), gm.Position(2, 0), positions_to_avoid=wall) == pf.TILE_DISTANCE_SEARCH_RADIUS
+
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_turn_distance_from_field_matches_search(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 4 4 0 0 0 0',
+                'c 0 c_1 0 23',
+                'c 0 c_2 0 23',
+                'c 1 c_3 0 23',
+                'ct 0 c_1 4 4 0',
+                'ct 0 c_1 4 5 0',
+                'ct 0 c_2 7 2 0',
+                'ct 1 c_3 2 6 0',
+                'ct 1 c_3 3 6 0',
+                'ccd 5 5 1.5',
+                'ccd 6 5 0.75',
+                'ccd 5 6 2.25',
+            ], 0
+        )
+        c.LogicGlobals.player.units[0].set_task(c.ValidActions.MANAGE, gm.Position(4, 4))
+        pathfinder = c.LogicGlobals.game_state.map.pathfinder
+        positions = [gm.Position(x, y) for x in range(12) for y in range(12)]
+
+        for target in [gm.Position(5, 5), gm.Position(4, 5), gm.Position(1, 1)]:
+            for cooldown in [1, 2]:
+                for avoid_own_cities in [False, True]:
+                    for pos in positions:
+                        for include_target_road in [False, True]:
+                            kwargs = dict(avoid_own_cities=avoid_own_cities, include_target_road=include_target_road)
+                            assert pathfinder.turn_distance(
+                                target, pos, cooldown, field_root=target, **kwargs
+                            ) == pathfinder.turn_distance(target, pos, cooldown, **kwargs)
+                            assert pathfinder.turn_distance(
+                                pos, target, cooldown, field_root=target, **kwargs
+                            ) == pathfinder.turn_distance(pos, target, cooldown, **kwargs)
+
+
+class TestOccupancyLayer:
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_grids(self, initialize_game):
+        c.LogicGlobals.game_state.update(
+            [
+                'u 0 0 u_1 1 0 0 0 0 0',
+                'u 0 0 u_2 5 5 0 0 0 0',
+                'c 0 c_1 0 23',
+                'c 1 c_2 0 23',
+                'ct 0 c_1 1 0 0',
+                'ct 1 c_2 3 3 0',
+                'ccd 1 0 6',
+                'ccd 2 0 0.75',
+            ], 0
+        )
+        occupancy = c.LogicGlobals.game_state.map.occupancy
+
+        assert occupancy.own_cities[0, 1] and occupancy.own_cities.sum() == 1
+        assert occupancy.opponent_cities[3, 3] and occupancy.opponent_cities.sum() == 1
+        assert occupancy.road[0, 2] == 0.75
+        assert not occupancy.busy_units.any()
+
+        units = {unit.id: unit for unit in c.LogicGlobals.player.units}
+        units['u_1'].set_task(c.ValidActions.MANAGE, gm.Position(1, 0))
+        units['u_2'].set_task(c.ValidActions.MANAGE, gm.Position(1, 0))
+        assert occupancy.busy_units[0, 1] and occupancy.busy_units.sum() == 1
+
+        units['u_1'].set_task(c.ValidActions.MOVE, gm.Position(5, 5))
+        assert not occupancy.busy_units.any()
+
+
+class TestTileDistanceField:
+    @pytest.mark.parametrize("initialize_game", [12], indirect=['initialize_game'])
+    def test_matches_search(self, initialize_game):
+        c.LogicGlobals.game_state.update([], 0)
+        pathfinder = c.LogicGlobals.game_state.map.pathfinder
+        walls = [
+            frozenset(),
+            frozenset({gm.Position(1, y) for y in range(11)} | {gm.Position(3, y) for y in range(1, 12)}),
+            frozenset({gm.Position(x, y) for x in range(4, 7) for y in range(4, 7)}),
+        ]
+
+        for positions_to_avoid in walls:
+            for origin in [gm.Position(0, 0), gm.Position(5, 5), gm.Position(2, 6), gm.Position(-1, 3)]:
+                field = pf.TileDistanceField(pathfinder, origin, positions_to_avoid)
+                for x in range(-1, 13):
+                    for y in range(-1, 13):
+                        target = gm.Position(x, y)
+                        assert field.distance_to(target) == pathfinder.tile_distance(
+                            origin, target, positions_to_avoid=positions_to_avoid
+                        )
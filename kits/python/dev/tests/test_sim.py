@@ -0,0 +1,114 @@
+import pytest
+from path import Path
+from lux.sim import Simulation, SimState, find_divergence, game_parameters, load_replay, run_match
+from agent import make_agent
+from .test_context import _self_play
+
+
+ANALYSIS_REPLAY_PATH = Path(__file__).parent.parent.parent.parent.parent / 'analysis' / 'replay.json'
+
+
+def _simulation(updates, size=5, step=0):
+    return Simulation.from_observation({
+        "width": size, "height": size, "step": step, "updates": updates + ["D_DONE"],
+        "globalUnitIDCount": 9, "globalCityIDCount": 9,
+    })
+
+
+def _units(simulation, team=0):
+    return {unit.id: (unit.x, unit.y, unit.cooldown) for unit in simulation.state.units[team].values()}
+
+
+class TestSimulation:
+    def test_observation_round_trip(self):
+        replay = load_replay(ANALYSIS_REPLAY_PATH)
+        # Recorded with an early release of the engine, when a city tile burnt 30 fuel a night
+        parameters = game_parameters(LIGHT_UPKEEP={"CITY": 30, "WORKER": 4, "CART": 10})
+        for step in replay['steps']:
+            observation = step[0]['observation']
+            state = SimState.from_observation(observation, parameters)
+            assert state.observation_updates() == [u for u in observation['updates'] if u[0].isalpha()]
+
+    def test_matches_engine(self):
+        kaggle_environments = pytest.importorskip("kaggle_environments")
+        env = kaggle_environments.make(
+            "lux_ai_2021", configuration={"loglevel": 0, "annotations": False, "seed": 69420, "width": 16, "height": 16}
+        )
+        env.run(["simple_agent", "simple_agent"])
+        assert find_divergence(env.toJSON()) is None
+
+    def test_local_match(self, reset_agent_state):
+        observations, actions, configuration = _self_play([make_agent(), make_agent()], seed=69420, size=12, num_turns=40)
+
+        simulation = Simulation.from_observation(observations[0])
+        history = run_match([make_agent(), make_agent()], simulation, configuration, num_steps=40)
+
+        assert [turn_actions[0] for turn_actions in history] == actions
+        assert simulation.state.turn == 40
+        reset_agent_state()
+
+    def test_collisions(self):
+        simulation = _simulation([
+            "u 0 0 u_1 0 0 0 0 0 0", "u 0 0 u_2 2 0 0 0 0 0",
+            "u 0 1 u_3 1 2 0 0 0 0", "u 0 1 u_4 1 3 0 0 0 0", "u 0 1 u_5 3 3 0 0 0 0",
+        ])
+        simulation.step([["m u_1 e", "m u_2 w"], ["m u_4 n", "m u_5 n"]])
+        assert _units(simulation, 0) == {"u_1": (0, 0, 0), "u_2": (2, 0, 0)}
+        assert _units(simulation, 1) == {"u_3": (1, 2, 0), "u_4": (1, 3, 0), "u_5": (3, 2, 1)}
+        assert not simulation.rejected_commands
+
+    def test_city_merge(self):
+        simulation = _simulation([
+            "u 0 0 u_1 1 0 0 60 40 0", "u 0 1 u_2 4 4 0 0 0 0",
+            "c 0 c_1 10 23", "c 0 c_2 20 23", "ct 0 c_1 0 0 0", "ct 0 c_2 2 0 0",
+        ])
+        simulation.step([["bcity u_1"], []])
+        state = simulation.state
+        # The first neighbor in north, east, south, west order keeps its city
+        assert list(state.cities) == [2]
+        assert state.cities[2].tiles == [(2, 0), (1, 0), (0, 0)]
+        assert state.cities[2].fuel == 30
+        assert state.light_upkeep(state.cities[2]) == 3 * 23 - 4 * 5
+        assert state.units[0]["u_1"].cargo == {"wood": 0, "coal": 0, "uranium": 0}
+
+    def test_research_before_mining(self):
+        simulation = _simulation([
+            "rp 0 49", "r coal 2 0 100", "u 0 0 u_1 2 1 0 0 0 0", "u 0 1 u_2 3 0 0 0 0 0",
+            "c 0 c_1 0 23", "ct 0 c_1 1 0 0",
+        ])
+        simulation.step([["r 1 0"], []])
+        assert simulation.state.research_points == [50, 0]
+        assert simulation.state.units[0]["u_1"].cargo["coal"] == 5
+        assert simulation.state.units[1]["u_2"].cargo["coal"] == 0
+        assert simulation.state.resource_amount[0, 2] == 95
+
+    def test_rejected_commands(self):
+        simulation = _simulation([
+            "u 0 0 u_1 1 1 0 0 0 0", "u 0 0 u_2 1 2 0 0 0 0", "u 0 1 u_3 4 4 0 0 0 0",
+            "c 0 c_1 0 23", "ct 0 c_1 0 0 0", "ct 0 c_1 0 1 0",
+        ])
+        commands = ["bw 0 0", "m u_1 x", "t u_1 u_2 gold 5", "bcity u_2", "m u_3 n"]
+        simulation.step([commands, []])
+        assert simulation.rejected_commands == [(0, command) for command in commands]
+
+    def test_night(self):
+        simulation = _simulation([
+            "u 0 0 u_1 1 1 0 2 0 0", "u 0 0 u_2 3 3 0 0 3 0", "u 0 1 u_3 4 4 0 0 0 0",
+            "c 0 c_1 20 23", "ct 0 c_1 0 0 0", "c 1 c_2 50 23", "ct 1 c_2 4 0 0",
+        ], step=30)
+        assert not simulation.step([[], []])
+        assert _units(simulation, 0) == {"u_2": (3, 3, 0)}
+        assert simulation.state.units[0]["u_2"].cargo["coal"] == 2
+        assert list(simulation.state.cities) == [2]
+        assert simulation.state.cities[2].fuel == 27
+        assert not simulation.step([[], []])
+        assert simulation.step([[], []]), "Team 1 has nothing left"
+
+    def test_copy(self):
+        simulation = _simulation(["u 0 0 u_1 1 1 0 0 0 0", "u 0 1 u_2 4 4 0 0 0 0", "r wood 1 0 100"])
+        rollout = simulation.copy()
+        rollout.step([["m u_1 n"], []])
+        assert _units(simulation) == {"u_1": (1, 1, 0)}
+        assert simulation.state.resource_amount[0, 1] == 100
+        assert _units(rollout) == {"u_1": (1, 0, 1)}
+        assert rollout.state.resource_amount[0, 1] == 82
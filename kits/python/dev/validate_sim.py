@@ -0,0 +1,33 @@
+""" Check that `lux.sim` reproduces kaggle replays of the Node engine, turn by turn.
+
+Usage:
+    python validate_sim.py replay.json [replay.json ...]
+"""
+import argparse
+import sys
+
+from lux.sim import find_divergence, load_replay
+
+
+def print_divergence(path, divergence):
+    step, expected, actual = divergence
+    print(f"{path}: diverges at step {step}")
+    print("  engine only:     " + ", ".join(update for update in expected if update not in actual))
+    print("  simulation only: " + ", ".join(update for update in actual if update not in expected))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help="Replays saved with `env.toJSON()`")
+    args = parser.parse_args()
+
+    num_diverged = 0
+    for path in args.paths:
+        replay = load_replay(path)
+        divergence = find_divergence(replay)
+        if divergence is None:
+            print(f"{path}: all {len(replay['steps']) - 1} steps match")
+        else:
+            num_diverged += 1
+            print_divergence(path, divergence)
+    sys.exit(1 if num_diverged else 0)